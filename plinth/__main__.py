@@ -11,7 +11,7 @@ import systemd.daemon
 
 from . import __version__
 from . import app as app_module
-from . import (cfg, frontpage, glib, log, menu, module_loader, setup,
+from . import (cfg, frontpage, glib, log, menu, module_loader, profiler, setup,
                web_framework, web_server)
 
 precedence_commandline_arguments = ["server_dir", "develop"]
@@ -42,6 +42,10 @@ def parse_arguments():
                         help='list apps')
     parser.add_argument('--version', action='store_true', default=None,
                         help='show version and exit')
+    parser.add_argument(
+        '--profile-startup', metavar='FILE', default=None,
+        help=('record time and memory used by each phase of startup and '
+              'write a report to FILE'))
 
     return parser.parse_args()
 
@@ -106,6 +110,8 @@ def run_post_init_and_setup():
     app_module.apps_post_init()
     frontpage.add_custom_shortcuts()
 
+    profiler.write_report()
+
     # Handle app version updates.
     setup.run_setup_on_startup()  # Long running, retrying
 
@@ -120,6 +126,8 @@ def run_post_init_and_setup():
 def main():
     """Initialize and start the application"""
     arguments = parse_arguments()
+    if arguments.profile_startup:
+        profiler.start(arguments.profile_startup)
 
     cfg.read()
     if arguments.develop or os.getenv('FREEDOMBOX_DEVELOP', '') == '1':
@@ -147,8 +155,9 @@ def main():
 
     log.init()
 
-    web_framework.init()
-    web_framework.post_init()
+    with profiler.record('django'):
+        web_framework.init()
+        web_framework.post_init()
 
     logger.info('FreedomBox Service (Plinth) version - %s', __version__)
     for config_file in cfg.config_files:
@@ -174,12 +183,14 @@ def main():
 
     glib.run()
 
-    web_server.init()
-    web_server.run(on_web_server_stop)
+    with profiler.record('web_server'):
+        web_server.init()
+        web_server.run(on_web_server_stop)
 
     # systemd will wait until notification to proceed with other processes. We
     # have service Type=notify.
     systemd.daemon.notify('READY=1')
+    profiler.write_report()
 
     web_server.block()
 
@@ -234,6 +234,30 @@ def service_show(service_name: str) -> dict[str, str]:
     return status
 
 
+def service_show_many(service_names: list[str],
+                      properties: list[str]) -> dict[str, dict[str, str]]:
+    """Return properties of many services with a single command."""
+    command = ['systemctl', 'show', '--all']
+    command += [f'--property={property_}' for property_ in properties]
+    command += service_names
+    process = run(command, check=False)
+
+    # Properties of each service are printed in order, separated by a blank
+    # line.
+    blocks = process.stdout.decode().split('\n\n')
+    statuses = {}
+    for index, service_name in enumerate(service_names):
+        status = {property_: '' for property_ in properties}
+        if index < len(blocks):
+            for line in blocks[index].splitlines():
+                parts = line.partition('=')
+                status[parts[0]] = parts[2]
+
+        statuses[service_name] = status
+
+    return statuses
+
+
 def service_action(service_name: str, action: str, check: bool = False):
     """Perform the given action on the service_name."""
     run(['systemctl', action, service_name], check=check)
@@ -1,15 +1,19 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 """Framework to run specified actions with elevated privileges."""
 
+import concurrent.futures
 import functools
 import importlib
 import inspect
 import io
+import itertools
 import json
 import logging
 import pathlib
 import socket
+import struct
 import threading
+import time
 import traceback
 import types
 import typing
@@ -20,8 +24,38 @@ logger = logging.getLogger(__name__)
 
 socket_path = '/run/freedombox/privileged.socket'
 
+# Maximum number of long-lived connections kept open to the privileged daemon.
+# Each connection carries many concurrent requests.
+connection_pool_size = 2
+
+# When False, each call opens a new connection and uses the one-shot protocol.
+use_connection_pool = True
+
+# Sent by the client as the first bytes of a connection to switch it to
+# length-prefixed, multiplexed framing. Can't be the start of a JSON request.
+MULTIPLEX_MAGIC = b'\x00FBXMUX1'
+
+# Seconds after which the server closes a multiplexed connection that has no
+# requests in flight. Client stops using connections much earlier than that.
+MULTIPLEX_IDLE_TIMEOUT = 30
+
+# Initial and maximum number of bytes requested in a single receive when
+# reading a response until EOF.
+RECEIVE_SIZE_MIN = 64 * 1024
+RECEIVE_SIZE_MAX = 4 * 1024 * 1024
+
+# Maximum number of threads used by the server to run a parallel batch.
+batch_max_workers = 4
+
+# Frame header: request ID and length of the payload that follows.
+_frame_header = struct.Struct('!QI')
+
 thread_storage = threading.local()
 
+# Function that schedules a single call to run and returns a future for result
+_SubmitFunc: typing.TypeAlias = typing.Callable[[dict],
+                                                concurrent.futures.Future]
+
 
 # An alias for 'str' to mark some strings as sensitive. Sensitive strings are
 # not logged. Use 'type secret_str = str' when Python 3.11 support is no longer
@@ -78,16 +112,40 @@ def privileged(func):
     return wrapper
 
 
-def _read_from_server(client_socket: socket.socket) -> bytes:
-    """Read everything from a socket and return the data."""
-    response = b''
+def _read_all(client_socket: socket.socket) -> bytearray:
+    """Read from a socket until EOF and return the data.
+
+    Data is received directly into the free space at the end of a single
+    buffer that grows geometrically. So, the cost is linear in the size of
+    the data. The size of each receive grows while the server keeps filling
+    it.
+    """
+    buffer = bytearray(RECEIVE_SIZE_MIN)
+    received = 0
+    receive_size = RECEIVE_SIZE_MIN
     while True:
-        chunk = client_socket.recv(4096)
-        if not chunk:
+        if len(buffer) - received < receive_size:
+            new_size = max(2 * len(buffer), received + receive_size)
+            buffer.extend(bytes(new_size - len(buffer)))
+
+        with memoryview(buffer) as view:
+            count = client_socket.recv_into(view[received:received +
+                                                 receive_size])
+
+        if not count:
             break
 
-        response += chunk
+        received += count
+        if count == receive_size:
+            receive_size = min(2 * receive_size, RECEIVE_SIZE_MAX)
+
+    del buffer[received:]
+    return buffer
 
+
+def _read_from_server(client_socket: socket.socket):
+    """Read everything from a socket and return the decoded response."""
+    response = _read_all(client_socket)
     if not response:
         raise ConnectionError('Server returned empty response')
 
@@ -111,8 +169,215 @@ def _request_to_server(request: dict) -> socket.socket:
     return client_socket
 
 
+def recv_exactly(sock: socket.socket, size: int) -> bytearray:
+    """Read exactly size bytes from a socket.
+
+    Fewer bytes are returned only if the peer closed the connection. Data is
+    received directly into a buffer allocated once.
+    """
+    buffer = bytearray(size)
+    received = 0
+    with memoryview(buffer) as view:
+        while received < size:
+            count = sock.recv_into(view[received:])
+            if not count:
+                break
+
+            received += count
+
+    del buffer[received:]
+    return buffer
+
+
+def read_frame(sock: socket.socket,
+               max_length: int | None = None) -> tuple[int, bytearray] | None:
+    """Read a single frame from a multiplexed connection.
+
+    Return a tuple of request ID and payload. Return None if the peer closed
+    the connection cleanly between frames.
+    """
+    header = recv_exactly(sock, _frame_header.size)
+    if not header:
+        return None
+
+    if len(header) < _frame_header.size:
+        raise ConnectionError('Connection closed in the middle of a frame')
+
+    request_id, length = _frame_header.unpack(header)
+    if max_length is not None and length > max_length:
+        raise ValueError('Request too large')
+
+    payload = recv_exactly(sock, length)
+    if len(payload) < length:
+        raise ConnectionError('Connection closed in the middle of a frame')
+
+    return request_id, payload
+
+
+def write_frame(sock: socket.socket, request_id: int, payload: bytes):
+    """Write a single frame to a multiplexed connection."""
+    sock.sendall(_frame_header.pack(request_id, len(payload)) + payload)
+
+
+class _MultiplexedConnection:
+    """A long-lived connection to the privileged daemon shared by many calls.
+
+    Each request is sent as a frame tagged with a unique ID. A reader thread
+    receives response frames in whatever order the server finishes them and
+    resolves the future waiting for that ID.
+    """
+
+    def __init__(self):
+        """Connect to the server and start reading responses."""
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._socket.connect(socket_path)
+            self._socket.sendall(MULTIPLEX_MAGIC)
+        except Exception:
+            self._socket.close()
+            raise
+
+        self._lock = threading.Lock()
+        self._request_ids = itertools.count(1)
+        self.pending: dict[int, concurrent.futures.Future] = {}
+        self.closed = False
+        self.last_used = time.monotonic()
+        threading.Thread(target=self._read_responses, daemon=True).start()
+
+    def is_usable(self) -> bool:
+        """Return whether new requests may be sent on this connection.
+
+        Connections idle for long are abandoned well before the server closes
+        them so that a request is never sent on a connection being closed.
+        """
+        if self.closed:
+            return False
+
+        idle_time = time.monotonic() - self.last_used
+        return bool(self.pending) or idle_time < MULTIPLEX_IDLE_TIMEOUT / 2
+
+    def submit(self, payload: bytes) -> concurrent.futures.Future:
+        """Send a request and return a future for its raw response."""
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        with self._lock:
+            if self.closed:
+                raise ConnectionError('Connection to server is closed')
+
+            request_id = next(self._request_ids)
+            self.pending[request_id] = future
+            self.last_used = time.monotonic()
+            try:
+                write_frame(self._socket, request_id, payload)
+            except Exception:
+                del self.pending[request_id]
+                self._close_locked(None)
+                raise
+
+        return future
+
+    def close(self):
+        """Close the connection failing any requests still in flight."""
+        with self._lock:
+            self._close_locked(
+                ConnectionError('Connection to server was closed'))
+
+    def _close_locked(self, exception: Exception | None):
+        """Close the socket and fail pending requests, lock must be held."""
+        if not self.closed:
+            self.closed = True
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+            self._socket.close()
+
+        pending, self.pending = self.pending, {}
+        for future in pending.values():
+            future.set_exception(
+                exception
+                or ConnectionError('Connection to server was closed'))
+
+    def _read_responses(self):
+        """Read response frames and hand them to the waiting callers."""
+        exception: Exception = ConnectionError('Server closed the connection')
+        try:
+            while True:
+                frame = read_frame(self._socket)
+                if not frame:
+                    break
+
+                request_id, payload = frame
+                with self._lock:
+                    future = self.pending.pop(request_id, None)
+                    self.last_used = time.monotonic()
+
+                if future:
+                    future.set_result(payload)
+        except Exception as error:
+            exception = error
+
+        with self._lock:
+            self._close_locked(exception)
+
+
+class _ConnectionPool:
+    """A small pool of multiplexed connections to the privileged daemon."""
+
+    def __init__(self):
+        """Initialize the pool."""
+        self._lock = threading.Lock()
+        self._connections: list[_MultiplexedConnection] = []
+
+    def submit(self, request: dict) -> concurrent.futures.Future:
+        """Send a request on a pooled connection, return future response.
+
+        If the chosen connection turns out to be closed while sending, the
+        request could not have been received by the server. Retry once on a
+        fresh connection.
+        """
+        payload = json.dumps(request).encode('utf-8')
+        try:
+            return self._get_connection().submit(payload)
+        except OSError:
+            return self._get_connection().submit(payload)
+
+    def close(self):
+        """Close all the connections in the pool."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+
+        for connection in connections:
+            connection.close()
+
+    def _get_connection(self) -> _MultiplexedConnection:
+        """Return the least busy connection, open a new one if needed."""
+        with self._lock:
+            connections = []
+            for connection in self._connections:
+                if connection.is_usable():
+                    connections.append(connection)
+                elif not connection.closed:
+                    connection.close()
+
+            self._connections = connections
+            if len(connections) < connection_pool_size and all(
+                    connection.pending for connection in connections):
+                connections.append(_MultiplexedConnection())
+
+            return min(connections,
+                       key=lambda connection: len(connection.pending))
+
+
+_connection_pool = _ConnectionPool()
+
+
 def run_privileged_method(func, module_name, action_name, args, kwargs):
-    """Execute a privileged method using a server."""
+    """Execute a privileged method using a server.
+
+    Regular calls share the pooled multiplexed connections. Calls with raw
+    output stream data until EOF and need a connection of their own.
+    """
     run_in_background = kwargs.pop('_run_in_background', False)
     raw_output = kwargs.pop('_raw_output', False)
     log_error = kwargs.pop('_log_error', True)
@@ -133,9 +398,8 @@ def run_privileged_method(func, module_name, action_name, args, kwargs):
     if not log_error:
         request['log_error'] = False
 
-    client_socket = _request_to_server(request)
-
     if raw_output:
+        client_socket = _request_to_server(request)
 
         def _reader_func():
             while True:
@@ -149,8 +413,15 @@ def run_privileged_method(func, module_name, action_name, args, kwargs):
 
         return _reader_func()
 
+    client_socket = None
+    future = None
+    if use_connection_pool:
+        future = _connection_pool.submit(request)
+    else:
+        client_socket = _request_to_server(request)
+
     args = (func, module_name, action_name, args, kwargs, log_error,
-            client_socket)
+            client_socket, future)
     if not run_in_background:
         return _wait_for_server_response(*args)
 
@@ -159,17 +430,28 @@ def run_privileged_method(func, module_name, action_name, args, kwargs):
 
 
 def _wait_for_server_response(func, module_name, action_name, args, kwargs,
-                              log_error, client_socket):
+                              log_error, client_socket, future=None):
     """Wait for the server to respond and process the response."""
     try:
-        return_value = _read_from_server(client_socket)
+        if future:
+            return_value = json.loads(future.result())
+        else:
+            return_value = _read_from_server(client_socket)
     except json.JSONDecodeError:
         logger.error('Error decoding action return value %s..%s(*%s, **%s)',
                      module_name, action_name, args, kwargs)
         raise
     finally:
-        client_socket.close()
+        if client_socket is not None:
+            client_socket.close()
 
+    return _process_return_value(func, module_name, action_name, args, kwargs,
+                                 log_error, return_value)
+
+
+def _process_return_value(func, module_name, action_name, args, kwargs,
+                          log_error, return_value):
+    """Return the value of a call or raise the exception it resulted in."""
     if return_value['result'] == 'success':
         return return_value['return']
 
@@ -206,6 +488,152 @@ def _wait_for_server_response(func, module_name, action_name, args, kwargs,
     raise exception
 
 
+class Batch:
+    """Collect privileged calls and send them to the server as one request.
+
+    Calls made on the batch within the context manager are not sent right
+    away. When the context manager exits, all the calls are sent together and
+    run by the server. Each call returns a future that is resolved with the
+    return value or the exception of that call. Results are also available
+    in order as a list of values or exception objects::
+
+        with actions.Batch(parallel=True) as batch:
+            status = batch.call(privileged.get_status)
+            groups = [batch.call(privileged.get_user_groups, user)
+                      for user in users]
+
+        status.result()
+
+    By default, the server runs the calls one after another in the given
+    order. If parallel is True, the caller asserts that the calls are
+    independent of each other and the server may run them concurrently.
+
+    Decorators applied on top of a privileged method, such as those that
+    convert exceptions or forget remembered values, don't run for batched
+    calls. Callers must do such work themselves after the batch.
+    """
+
+    def __init__(self, parallel: bool = False):
+        """Initialize the batch."""
+        self.parallel = parallel
+        self.results: list = []
+        self._calls: list[tuple] = []
+
+    def __enter__(self) -> 'Batch':
+        """Start collecting calls."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        """Send all the collected calls unless an exception occurred."""
+        if exc_type:
+            for *_, future in self._calls:
+                future.cancel()
+
+            return
+
+        self.run()
+
+    def call(self, func, *args, **kwargs) -> concurrent.futures.Future:
+        """Add a call to a privileged method to the batch."""
+        if not getattr(func, '_privileged', False):
+            raise SyntaxError('Only privileged methods can be batched')
+
+        if kwargs.get('_raw_output') or kwargs.get('_run_in_background'):
+            raise TypeError('Raw output and background calls can\'t be '
+                            'batched')
+
+        # Get the original function that may have been wrapped/decorated
+        # multiple times. Wrappers outside of @privileged are skipped.
+        while getattr(func, '__wrapped__', None):
+            func = func.__wrapped__
+
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        self._calls.append((func, args, kwargs, future))
+        return future
+
+    def run(self) -> list:
+        """Send the collected calls to the server and return the results."""
+        calls, self._calls = self._calls, []
+        requests = []
+        remote_calls = []
+        for func, args, kwargs, future in calls:
+            log_error = kwargs.pop('_log_error', True)
+            if getattr(func, '_skip_privileged_call', False):
+                try:
+                    future.set_result(func(*args, **kwargs))
+                except Exception as exception:
+                    future.set_exception(exception)
+
+                continue
+
+            module_name = _get_privileged_action_module_name(func)
+            _log_action(func, module_name, func.__name__, args, kwargs,
+                        run_in_background=False)
+            request = {
+                'module': module_name,
+                'action': func.__name__,
+                'args': args,
+                'kwargs': kwargs,
+            }
+            if not log_error:
+                request['log_error'] = False
+
+            requests.append(request)
+            remote_calls.append(
+                (func, module_name, args, kwargs, log_error, future))
+
+        if requests:
+            try:
+                return_values = _run_batch_on_server(requests, self.parallel)
+            except Exception as exception:
+                # Don't leave callers waiting on the futures
+                for *_, future in remote_calls:
+                    future.set_exception(exception)
+
+                raise
+
+            for return_value, remote_call in zip(return_values, remote_calls):
+                func, module_name, args, kwargs, log_error, future = \
+                    remote_call
+                try:
+                    future.set_result(
+                        _process_return_value(func, module_name, func.__name__,
+                                              args, kwargs, log_error,
+                                              return_value))
+                except Exception as exception:
+                    future.set_exception(exception)
+
+        self.results = []
+        for *_, future in calls:
+            exception = future.exception()
+            self.results.append(exception if exception else future.result())
+
+        return self.results
+
+
+def _run_batch_on_server(requests: list[dict], parallel: bool) -> list[dict]:
+    """Send a batch request to the server and return the list of results."""
+    request = {'batch': requests, 'parallel': parallel}
+    if use_connection_pool:
+        return_value = json.loads(_connection_pool.submit(request).result())
+    else:
+        client_socket = _request_to_server(request)
+        try:
+            return_value = _read_from_server(client_socket)
+        finally:
+            client_socket.close()
+
+    if return_value['result'] != 'batch':
+        # The batch request as a whole has failed
+        _process_return_value(None, 'batch', 'batch', [], {}, False,
+                              return_value)
+
+    if len(return_value['return']) != len(requests):
+        raise ConnectionError('Server returned incorrect batch response')
+
+    return return_value['return']
+
+
 class ProcessBufferedReader(io.BufferedReader):
     """Improve performance of buffered binary streaming.
 
@@ -379,8 +807,10 @@ def _clear_thread_storage():
     Python documentation is silent on whether thread local storage will be
     cleaned up after a thread terminates.
     """
-    thread_storage.stdout = None
-    thread_storage.stderr = None
+    # Processes run later in this thread, outside of a call, must not try to
+    # collect their output.
+    thread_storage.__dict__.pop('stdout', None)
+    thread_storage.__dict__.pop('stderr', None)
 
 
 def get_return_value_from_exception(exception):
@@ -388,73 +818,238 @@ def get_return_value_from_exception(exception):
     return_value = {
         'result': 'exception',
         'exception': {
-            'module': type(exception).__module__,
-            'name': type(exception).__name__,
-            'args': exception.args,
-            'traceback': traceback.format_tb(exception.__traceback__),
-            'stdout': getattr(thread_storage, 'stdout', b'').decode(),
-            'stderr': getattr(thread_storage, 'stderr', b'').decode(),
+            'module':
+                type(exception).__module__,
+            'name':
+                type(exception).__name__,
+            'args':
+                exception.args,
+            'traceback':
+                traceback.format_tb(exception.__traceback__),
+            'stdout': (getattr(thread_storage, 'stdout', None)
+                       or b'').decode(),
+            'stderr': (getattr(thread_storage, 'stderr', None)
+                       or b'').decode(),
         }
     }
     return return_value
 
 
-def privileged_handle_json_request(
-        request_string: str) -> str | io.BufferedReader:
-    """Parse arguments for the program spawned as a privileged action."""
+def _validate_request(request: dict, allow_raw_output: bool):
+    """Check that a single call in the request is valid."""
+    if not isinstance(request, dict):
+        raise TypeError('Request must be an object')
 
-    def _parse_request() -> dict:
-        """Return a JSON parsed and validated request."""
-        try:
-            request = json.loads(request_string)
-        except json.JSONDecodeError:
-            raise SyntaxError('Invalid JSON in request')
+    required_parameters = [('module', str), ('action', str), ('args', list),
+                           ('kwargs', dict)]
+
+    for parameter, expected_type in required_parameters:
+        if parameter not in request:
+            raise TypeError(f'Missing required parameter "{parameter}"')
+        if not isinstance(request[parameter], expected_type):
+            raise TypeError(f'Parameter "{parameter}" must be of type'
+                            f'{expected_type.__name__}')
 
-        required_parameters = [('module', str), ('action', str),
-                               ('args', list), ('kwargs', dict)]
+    if 'raw_output' in request and not isinstance(request['raw_output'], bool):
+        raise TypeError('Incorrect "raw_output" parameter')
 
-        for parameter, expected_type in required_parameters:
-            if parameter not in request:
-                raise TypeError(f'Missing required parameter "{parameter}"')
-            if not isinstance(request[parameter], expected_type):
-                raise TypeError(f'Parameter "{parameter}" must be of type'
-                                f'{expected_type.__name__}')
+    if request.get('raw_output') and not allow_raw_output:
+        raise TypeError('Raw output not allowed on this connection')
 
-        if 'raw_output' in request and not isinstance(request['raw_output'],
-                                                      bool):
-            raise TypeError('Incorrect "raw_output" parameter')
+    if 'log_error' in request and not isinstance(request['log_error'], bool):
+        raise TypeError('Incorrect "log_error" parameter')
 
-        if 'log_error' in request and not isinstance(request['log_error'],
-                                                     bool):
-            raise TypeError('Incorrect "log_error" parameter')
 
+def _parse_request(request_string: str, allow_raw_output: bool) -> dict:
+    """Return a JSON parsed and validated request."""
+    try:
+        request = json.loads(request_string)
+    except json.JSONDecodeError:
+        raise SyntaxError('Invalid JSON in request')
+
+    if not isinstance(request, dict) or 'batch' not in request:
+        _validate_request(request, allow_raw_output)
         return request
 
+    if not isinstance(request['batch'], list):
+        raise TypeError('Parameter "batch" must be of type list')
+
+    if not isinstance(request.get('parallel', False), bool):
+        raise TypeError('Incorrect "parallel" parameter')
+
+    for batch_request in request['batch']:
+        _validate_request(batch_request, allow_raw_output=False)
+
+    return request
+
+
+def _get_parse_error_response(exception: Exception) -> str:
+    """Log an error in parsing a request and return the response for it."""
+    if isinstance(exception, (PermissionError, SyntaxError, TypeError)):
+        logger.error(exception.args[0])
+    else:
+        logger.exception(exception)
+
+    return_value = get_return_value_from_exception(exception)
+    return json.dumps(return_value, cls=JSONEncoder)
+
+
+def privileged_handle_json_request(
+        request_string: str, allow_raw_output: bool = True,
+        submit: _SubmitFunc | None = None) -> str | io.BufferedReader:
+    """Parse arguments for the program spawned as a privileged action.
+
+    Raw output streams until the connection is closed. It is not allowed on
+    connections that carry multiple requests.
+
+    If submit is given, it is called with each validated call in the request
+    and must return a future resolving to the result of
+    privileged_run_request() for that call. The server uses this to run calls
+    on a bounded pool of workers.
+    """
+    try:
+        request = _parse_request(request_string, allow_raw_output)
+        cfg.read()
+    except Exception as exception:
+        return _get_parse_error_response(exception)
+
+    if 'batch' in request:
+        return_value = _privileged_batch_call(request['batch'],
+                                              request.get('parallel', False),
+                                              submit)
+    elif submit:
+        return_value = submit(request).result()
+    else:
+        return_value = privileged_run_request(request)
+
+    if isinstance(return_value, io.BufferedReader):
+        return return_value
+
+    return json.dumps(return_value, cls=JSONEncoder)
+
+
+def privileged_submit_json_request(
+        request_string: str, submit: _SubmitFunc) -> concurrent.futures.Future:
+    """Hand over the calls in a request to submit() without waiting for them.
+
+    Return a future resolving to the response string. Raw output is not
+    allowed. The server uses this for connections that carry multiple
+    requests so that no thread has to wait for each request to finish.
+    """
+    response: concurrent.futures.Future = concurrent.futures.Future()
+    try:
+        request = _parse_request(request_string, allow_raw_output=False)
+        cfg.read()
+    except Exception as exception:
+        response.set_result(_get_parse_error_response(exception))
+        return response
+
+    def _respond(return_value: dict):
+        response.set_result(json.dumps(return_value, cls=JSONEncoder))
+
+    if 'batch' not in request:
+        submit(request).add_done_callback(
+            lambda future: _respond(_get_future_return_value(future)))
+        return response
+
+    requests = request['batch']
+    return_values: list[dict | None] = [None] * len(requests)
+    lock = threading.Lock()
+    remaining = len(requests)
+
+    def _respond_batch():
+        _respond({'result': 'batch', 'return': return_values})
+
+    def _on_done(index: int, future: concurrent.futures.Future):
+        nonlocal remaining
+        return_values[index] = _get_future_return_value(future)
+        with lock:
+            remaining -= 1
+            done = not remaining
+
+        if done:
+            _respond_batch()
+        elif not request.get('parallel', False):
+            _submit_call(index + 1)
+
+    def _submit_call(index: int):
+        submit(requests[index]).add_done_callback(
+            functools.partial(_on_done, index))
+
+    if not requests:
+        _respond_batch()
+    elif request.get('parallel', False):
+        for index in range(len(requests)):
+            _submit_call(index)
+    else:
+        _submit_call(0)  # Each call is submitted after the previous is done
+
+    return response
+
+
+def _get_future_return_value(future: concurrent.futures.Future) -> dict:
+    """Return the result of a submitted call or the exception it raised."""
+    try:
+        return future.result()
+    except Exception as exception:
+        return get_return_value_from_exception(exception)
+
+
+def privileged_run_request(request: dict) -> dict | io.BufferedReader:
+    """Run a single validated call and return its result or exception.
+
+    Output of the processes run by the call is collected in the storage of
+    the current thread.
+    """
+    _setup_thread_storage()
     try:
-        request = _parse_request()
-        log_error = request.get('log_error', True)
         arguments = {'args': request['args'], 'kwargs': request['kwargs']}
-        _setup_thread_storage()
         return_value = _privileged_call(request['module'], request['action'],
-                                        arguments, log_error)
+                                        arguments,
+                                        request.get('log_error', True))
 
         if isinstance(return_value, io.BufferedReader):
             raw_output = request.get('raw_output', False)
             if not raw_output:
+                return_value.close()
                 raise TypeError('Invalid call to raw output API.')
-
-            return return_value
-    except (PermissionError, SyntaxError, TypeError, Exception) as exception:
+    except Exception as exception:
         if isinstance(exception, (PermissionError, SyntaxError, TypeError)):
             logger.error(exception.args[0])
         else:
             logger.exception(exception)
 
         return_value = get_return_value_from_exception(exception)
+    finally:
+        _clear_thread_storage()
 
-    _clear_thread_storage()
+    return return_value
 
-    return json.dumps(return_value, cls=JSONEncoder)
+
+def _privileged_batch_call(requests: list[dict], parallel: bool,
+                           submit: _SubmitFunc | None = None) -> dict:
+    """Run a batch of calls and return the list of their results.
+
+    Failure of one call does not affect the others. If submit is given, calls
+    are handed over to it and run by the server's workers.
+    """
+    if submit:
+        if parallel:
+            futures = [submit(request) for request in requests]
+            return_values = [future.result() for future in futures]
+        else:
+            return_values = [submit(request).result() for request in requests]
+    elif parallel and len(requests) > 1:
+        max_workers = min(len(requests), batch_max_workers)
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            return_values = list(executor.map(privileged_run_request,
+                                              requests))
+    else:
+        return_values = [
+            privileged_run_request(request) for request in requests
+        ]
+
+    return {'result': 'batch', 'return': return_values}
 
 
 def _privileged_call(module_name, action_name, arguments, log_error=True):
@@ -462,7 +1057,6 @@ def _privileged_call(module_name, action_name, arguments, log_error=True):
     if '.' in module_name:
         raise SyntaxError('Invalid module name')
 
-    cfg.read()
     if module_name == 'plinth':
         import_path = 'plinth'
     else:
@@ -4,12 +4,14 @@ Base class for all Freedombox applications.
 """
 
 import collections
+import concurrent.futures
 import enum
 import inspect
 import logging
-from typing import ClassVar, TypeAlias
+import threading
+from typing import Callable, ClassVar, TypeAlias
 
-from plinth import cfg
+from plinth import cfg, diagnostic_check, profiler, signals
 from plinth.diagnostic_check import DiagnosticCheck
 from plinth.signals import post_app_loading
 
@@ -20,6 +22,19 @@ logger = logging.getLogger(__name__)
 
 _list_type: TypeAlias = list
 
+# Maximum number of apps whose post initialization runs at the same time
+post_init_workers = 4
+
+# When apps are initialized lazily, this is called to initialize all of them
+# the first time they are looked up.
+_apps_loader: Callable[[], None] | None = None
+_apps_loader_running = False
+_apps_loader_lock = threading.RLock()
+
+# Setup versions of all the apps, loaded from the database when first needed.
+# Only set_setup_version() changes the versions afterwards.
+_setup_versions: dict[str, int] | None = None
+
 
 class App:
     """Implement common functionality for an app.
@@ -96,11 +111,13 @@ class App:
     @classmethod
     def get(cls, app_id):
         """Return an app with given ID."""
+        _load_apps_if_needed()
         return cls._all_apps[app_id]
 
     @classmethod
     def list(cls):
         """Return a list of all apps."""
+        _load_apps_if_needed()
         return cls._all_apps.values()
 
     def add(self, component):
@@ -126,6 +143,18 @@ class App:
             if isinstance(component, component_type):
                 yield component
 
+    def get_resources(self) -> _list_type[str]:
+        """Return the shared resources modified by operations on the app.
+
+        Operations such as setup, repair and uninstall of apps that don't share
+        any resources can run at the same time.
+        """
+        resources = {f'app:{self.app_id}'}
+        for component in self.components.values():
+            resources.update(component.resources)
+
+        return sorted(resources)
+
     @property
     def info(self):
         """Return the information component of the app.
@@ -173,15 +202,7 @@ class App:
 
     def get_setup_version(self) -> int:
         """Return the setup version of the app."""
-        # XXX: Optimize version gets
-        from . import models
-
-        try:
-            with db.lock:
-                app_entry = models.Module.objects.get(pk=self.app_id)
-                return app_entry.setup_version
-        except models.Module.DoesNotExist:
-            return 0
+        return _get_setup_versions().get(self.app_id, 0)
 
     def needs_setup(self) -> bool:
         """Return whether the app needs to be setup.
@@ -195,27 +216,37 @@ class App:
         from . import models
 
         with db.lock:
+            setup_versions = _get_setup_versions()
             models.Module.objects.update_or_create(
                 pk=self.app_id, defaults={'setup_version': version})
+            setup_versions[self.app_id] = version
 
     def enable(self):
         """Enable all the components of the app."""
-        for component in self.components.values():
-            component.enable()
+        try:
+            for component in self.components.values():
+                component.enable()
+        finally:
+            _invalidate_cache()
 
     def disable(self):
         """Enable all the components of the app."""
-        for component in reversed(self.components.values()):
-            component.disable()
+        try:
+            for component in reversed(self.components.values()):
+                component.disable()
+        finally:
+            _invalidate_cache()
 
     def is_enabled(self):
         """Return whether all the leader components are enabled.
 
         Return True when there are no leader components.
         """
-        return all((component.is_enabled()
-                    for component in self.components.values()
-                    if component.is_leader))
+        from plinth import daemon
+        with daemon.prefetch_units_state(daemon.get_app_units(self)):
+            return all((component.is_enabled()
+                        for component in self.components.values()
+                        if component.is_leader))
 
     def set_enabled(self, enabled):
         """Update the status of all follower components.
@@ -226,6 +257,8 @@ class App:
             if not component.is_leader:
                 component.set_enabled(enabled)
 
+        _invalidate_cache()
+
     def diagnose(self) -> _list_type[DiagnosticCheck]:
         """Run diagnostics and return results.
 
@@ -237,14 +270,11 @@ class App:
 
         Results are typically collected by diagnosing each component of the app
         and then supplementing the results with any app level diagnostic tests.
+        Components are diagnosed in parallel.
 
         Also see :meth:`.has_diagnostics`.
         """
-        results = []
-        for component in self.components.values():
-            results.extend(component.diagnose())
-
-        return results
+        return diagnostic_check.diagnose_components(self.components.values())
 
     def has_diagnostics(self):
         """Return whether at least one diagnostic test is implemented.
@@ -343,6 +373,9 @@ class Component:
 
     is_leader = False
 
+    # Shared resources, other than the app itself, modified during setup
+    resources: list[str] = []
+
     def __init__(self, component_id):
         """Initialize the component."""
         if not component_id:
@@ -625,14 +658,82 @@ class EnableState(LeaderComponent):
         kvstore.set(self.key, False)
 
 
+def _invalidate_cache():
+    """Stop using cached values that depend on which apps are enabled."""
+    from plinth import cache
+    cache.invalidate('apps')
+
+
+def _get_setup_versions() -> dict[str, int]:
+    """Return the setup versions of all apps, loading them if needed."""
+    global _setup_versions
+
+    setup_versions = _setup_versions
+    if setup_versions is not None:
+        return setup_versions
+
+    from . import models
+
+    with db.lock:
+        if _setup_versions is None:
+            _setup_versions = {
+                module.name: module.setup_version
+                for module in models.Module.objects.all()
+            }
+
+        return _setup_versions
+
+
+def clear_setup_versions():
+    """Forget the loaded setup versions and load them again when needed."""
+    global _setup_versions
+
+    with db.lock:
+        _setup_versions = None
+
+
+def set_apps_loader(loader: Callable[[], None]):
+    """Initialize apps using loader only when they are first looked up.
+
+    Processes that seldom need the apps, such as the privileged daemon, can
+    avoid importing all the app modules and constructing all the apps at
+    startup.
+    """
+    global _apps_loader
+    _apps_loader = loader
+
+
+def _load_apps_if_needed():
+    """Run the lazy apps loader if it has not been run yet.
+
+    Other threads wait until loading is complete. Lookups by the loading
+    thread itself, from within app constructors, see the apps loaded so far.
+    """
+    global _apps_loader, _apps_loader_running
+    if not _apps_loader:
+        return
+
+    with _apps_loader_lock:
+        if not _apps_loader or _apps_loader_running:
+            return
+
+        _apps_loader_running = True
+        try:
+            _apps_loader()
+        finally:
+            _apps_loader = None
+            _apps_loader_running = False
+
+
 def apps_init():
     """Create apps by constructing them with components."""
-    if App.list():
+    if App._all_apps:
         return  # Apps have already been initialized
 
     from . import module_loader  # noqa  # Avoid circular import
     for module_name, module in module_loader.loaded_modules.items():
-        _initialize_module(module_name, module)
+        with profiler.record('init', module_name):
+            _initialize_module(module_name, module)
 
     _sort_apps()
 
@@ -703,17 +804,71 @@ def _initialize_module(module_name, module):
 
 
 def apps_post_init():
-    """Run post initialization on each app."""
-    for app in App.list():
+    """Run post initialization on each app.
+
+    Essential apps are initialized one after another in their sorted order.
+    Other apps are then initialized concurrently, each only after the apps it
+    depends on. Apps connect to signals sent by other apps during post
+    initialization. So, signals sent by these apps are delivered only after
+    all of them are initialized, in the sorted order of the apps.
+    """
+    apps = App.list()
+    for app in apps:
+        if app.info.is_essential:
+            _post_init_app(app)
+
+    futures: dict[str, concurrent.futures.Future] = {}
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=post_init_workers,
+            thread_name_prefix='post-init') as executor:
+        # Apps are sorted so that dependencies are submitted, and hence
+        # started, before the apps depending on them.
+        for app in apps:
+            if app.info.is_essential:
+                continue
+
+            dependencies = [
+                futures[app_id] for app_id in app.info.depends
+                if app_id in futures
+            ]
+            futures[app.app_id] = executor.submit(
+                _post_init_app_deferring_signals, app, dependencies)
+
+    for app_id, future in futures.items():
+        # Raise exceptions in develop mode
+        deferred_signals = future.result()
         try:
-            app.post_init()
-            if not app.needs_setup() and app.is_enabled():
-                app.set_enabled(True)
+            signals.send_deferred(deferred_signals)
         except Exception as exception:
-            logger.exception('Exception while running post init for %s: %s',
-                             app.app_id, exception)
+            logger.exception('Exception while sending signals of %s: %s',
+                             app_id, exception)
             if cfg.develop:
                 raise
 
     logger.debug('App initialization completed.')
     post_app_loading.send_robust(sender="app")
+
+
+def _post_init_app_deferring_signals(
+        app: App, dependencies: list[concurrent.futures.Future]) -> list:
+    """Run post initialization of an app and return signals it sent."""
+    with signals.defer() as deferred_signals:
+        _post_init_app(app, dependencies)
+
+    return deferred_signals
+
+
+def _post_init_app(app: App, dependencies: list[concurrent.futures.Future]
+                   | None = None):
+    """Run post initialization of an app after its dependencies."""
+    concurrent.futures.wait(dependencies or [])
+    try:
+        with profiler.record('post_init', app.app_id):
+            app.post_init()
+            if not app.needs_setup() and app.is_enabled():
+                app.set_enabled(True)
+    except Exception as exception:
+        logger.exception('Exception while running post init for %s: %s',
+                         app.app_id, exception)
+        if cfg.develop:
+            raise
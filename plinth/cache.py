@@ -0,0 +1,57 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Cache values computed while rendering pages.
+
+Values are kept in Django's cache and are grouped by their kind, such as
+'apps' or 'menu'. Each kind has a version that is part of the cache key.
+Invalidating a kind increments its version so that values stored earlier are
+no longer used. Keys also include the current language so that translated
+values are never shown in another language.
+"""
+
+import hashlib
+import threading
+from typing import Any, Callable
+
+from django.core.cache import cache
+from django.utils import translation
+
+# Seconds for which a computed value is kept
+timeout = 300
+
+_versions: dict[str, int] = {}
+_versions_lock = threading.Lock()
+_MISSING = object()
+
+
+def get_version(kind: str) -> int:
+    """Return the current version of a kind of cached values."""
+    return _versions.get(kind, 1)
+
+
+def invalidate(kind: str):
+    """Stop using all the values of a kind that were cached so far."""
+    with _versions_lock:
+        _versions[kind] = get_version(kind) + 1
+
+
+def make_key(kind: str, *parts: str) -> str:
+    """Return the cache key for a value in the current language."""
+    language = translation.get_language() or ''
+    digest = hashlib.md5(':'.join(parts).encode(),
+                         usedforsecurity=False).hexdigest()
+    return f'plinth.{kind}.{language}.{digest}'
+
+
+def get_or_set(kind: str, parts: list[str], func: Callable[[], Any]) -> Any:
+    """Return a cached value or compute it with func() and cache it."""
+    key = make_key(kind, *parts)
+    # Take the version before computing. If values are invalidated meanwhile,
+    # the result is stored under the older version and never used.
+    version = get_version(kind)
+    value = cache.get(key, _MISSING, version=version)
+    if value is _MISSING:
+        value = func()
+        cache.set(key, value, timeout, version=version)
+
+    return value
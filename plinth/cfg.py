@@ -7,6 +7,7 @@ import configparser
 import logging
 import os
 import pathlib
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +48,14 @@ develop = False
 
 config_files: list[str] = []
 
+# Number of times read() actually parsed the configuration files
+reload_count = 0
+
+# State of configuration files when they were last parsed by read()
+_read_state: tuple | None = None
+_read_paths: list[str] = []
+_read_lock = threading.Lock()
+
 
 def expand_to_dot_d_paths(file_paths: list[str]) -> list[str]:
     """Expand a list of file paths to include file.d/* also."""
@@ -82,20 +91,71 @@ def get_config_paths() -> list[str]:
     ]
 
 
+def _get_files_state(config_paths: list[str], file_paths: list[str]) -> tuple:
+    """Return the modification state of the configuration files.
+
+    Stat information of the .d directories is included so that addition or
+    removal of files in them is noticed.
+    """
+    paths = []
+    for config_path in config_paths:
+        path = pathlib.Path(config_path)
+        paths += [str(path), str(path.with_suffix(path.suffix + '.d'))]
+
+    state = []
+    for path in paths + file_paths:
+        try:
+            stat = os.stat(path)
+            state.append((path, stat.st_ino, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            state.append((path, None))
+
+    return tuple(state)
+
+
 def read() -> None:
-    """Read all configuration files."""
+    """Read all configuration files.
+
+    Long running processes call this often. Files are only parsed again if
+    any of them has been modified, added or removed since the last read.
+    Otherwise, the cost is that of a few stat() calls.
+    """
+    global _read_state, _read_paths, reload_count
+
     config_paths = get_config_paths()
-    for config_path in expand_to_dot_d_paths(config_paths):
-        read_file(config_path)
+    with _read_lock:
+        if _read_state and _read_state == _get_files_state(
+                config_paths, _read_paths):
+            return
+
+        read_paths = expand_to_dot_d_paths(config_paths)
+        # Take the state before parsing so that changes made during parsing
+        # are picked up next time.
+        state = _get_files_state(config_paths, read_paths)
+        for config_path in read_paths:
+            read_file(config_path)
+
+        _read_state = state
+        _read_paths = read_paths
+        reload_count += 1
+        logger.debug('Configuration files parsed, count = %s', reload_count)
 
 
 def read_file(config_path: str):
     """Read and merge into defaults a single configuration file."""
+    global _read_state
+
+    # Values may now differ from what the files say, parse them next time.
+    _read_state = None
+
     if not os.path.isfile(config_path):  # Does not throw exceptions
         # Ignore missing configuration files
         return
 
     # Keep a note of configuration files read.
+    if config_path in config_files:
+        config_files.remove(config_path)
+
     config_files.append(config_path)
 
     parser = configparser.ConfigParser(
@@ -145,6 +145,32 @@ def splinter_browser_load_condition():
     return _load_condition
 
 
+@pytest.fixture(autouse=True)
+def fixture_clear_database_caches():
+    """Don't keep values loaded from database in memory across tests.
+
+    Database changes are rolled back after each test.
+    """
+    from plinth import app as app_module
+    from plinth import kvstore
+    app_module.clear_setup_versions()
+    kvstore.invalidate()
+
+
+@pytest.fixture(name='local_memory_cache')
+def fixture_local_memory_cache(settings):
+    """Use a real cache instead of the dummy cache used in tests."""
+    from django.core.cache import cache
+
+    settings.CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'plinth-tests'
+        }
+    }
+    cache.clear()
+
+
 @pytest.fixture(name='mock_privileged')
 def fixture_mock_privileged(request):
     """Mock the privileged decorator to nullify its effects."""
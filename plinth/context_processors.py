@@ -6,7 +6,7 @@ Django context processors to provide common data to templates.
 from django.utils.translation import gettext as _
 from django.utils.translation import gettext_noop
 
-from plinth import cfg, views, web_server
+from plinth import cache, cfg, views, web_server
 from plinth.utils import is_user_admin
 
 
@@ -24,7 +24,7 @@ def common(request):
     notifications_context = Notification.get_display_context(
         request, user=request.user)
 
-    breadcrumbs = views.get_breadcrumbs(request)
+    breadcrumbs = _get_breadcrumbs(request)
     active_section_url = [
         key for key, value in breadcrumbs.items()
         if value.get('is_active_section')
@@ -39,3 +39,17 @@ def common(request):
         'notifications': notifications_context['notifications'],
         'notifications_max_severity': notifications_context['max_severity']
     }
+
+
+def _get_breadcrumbs(request):
+    """Return the breadcrumbs for the request, computed once for each URL."""
+
+    def _compute():
+        breadcrumbs = views.get_breadcrumbs(request)
+        for crumb in breadcrumbs.values():
+            if crumb['name'] is not None:
+                crumb['name'] = str(crumb['name'])  # Translate lazy strings
+
+        return breadcrumbs
+
+    return cache.get_or_set('menu', [request.path], _compute)
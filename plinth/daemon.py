@@ -2,8 +2,11 @@
 """Component for managing a background daemon or any systemd unit."""
 
 import contextlib
+import logging
 import socket
 import subprocess
+import threading
+import time
 
 import psutil
 from django.utils.translation import gettext_noop
@@ -11,6 +14,46 @@ from django.utils.translation import gettext_noop
 from plinth import action_utils, app, log
 from plinth.diagnostic_check import (DiagnosticCheck,
                                      DiagnosticCheckParameters, Result)
+from plinth.utils import import_from_gi
+
+gio = import_from_gi('Gio', '2.0')
+glib = import_from_gi('GLib', '2.0')
+
+logger = logging.getLogger(__name__)
+
+SYSTEMD_BUS_NAME = 'org.freedesktop.systemd1'
+SYSTEMD_PATH = '/org/freedesktop/systemd1'
+SYSTEMD_MANAGER_INTERFACE = 'org.freedesktop.systemd1.Manager'
+SYSTEMD_UNIT_INTERFACE = 'org.freedesktop.systemd1.Unit'
+
+# Unit file states for which 'systemctl is-enabled' exits successfully
+_ENABLED_UNIT_FILE_STATES = {
+    'enabled', 'enabled-runtime', 'static', 'alias', 'indirect', 'generated',
+    'transient'
+}
+
+# Active states for which 'systemctl status' exits successfully
+_RUNNING_ACTIVE_STATES = {'active', 'reloading', 'refreshing'}
+
+# Properties of units returned by get_units_state() by default
+UNIT_STATE_PROPERTIES = ['LoadState', 'ActiveState', 'UnitFileState']
+
+# Suffixes of unit names for each type of unit. Names without one of these
+# suffixes are taken to be services, as done by systemctl.
+_UNIT_SUFFIXES = {
+    '.service', '.socket', '.device', '.mount', '.automount', '.swap',
+    '.target', '.path', '.timer', '.slice', '.scope'
+}
+
+# States of units queried together, to be used instead of querying each unit
+_units_state_snapshot = threading.local()
+
+# Seconds for which a snapshot of listening sockets is reused
+listening_sockets_max_age = 5
+
+_listening_sockets: dict[tuple[str, int, int], set[str]] = {}
+_listening_sockets_time: float | None = None
+_listening_sockets_lock = threading.Lock()
 
 
 class Daemon(app.LeaderComponent, log.LogEmitter):
@@ -62,51 +105,70 @@ class Daemon(app.LeaderComponent, log.LogEmitter):
             # https://github.com/systemd/systemd/issues/18134 also currently
             # gives incorrect exit code for 'alias' case. See:
             # https://salsa.debian.org/freedombox-team/freedombox/-/merge_requests/1980
-            if action_utils.service_is_enabled(self.alias,
-                                               strict_check=self.strict_check):
+            if _service_is_enabled(self.alias, self.strict_check):
                 return True
 
-        return action_utils.service_is_enabled(self.unit,
-                                               strict_check=self.strict_check)
+        return _service_is_enabled(self.unit, self.strict_check)
 
     def enable(self):
         """Run operations to enable the daemon/unit."""
         from plinth.privileged import service as service_privileged
-        service_privileged.enable(self.unit)
-        if self.alias:
-            service_privileged.enable(self.alias)
+        try:
+            service_privileged.enable(self.unit)
+            if self.alias:
+                service_privileged.enable(self.alias)
+        finally:
+            self._invalidate_unit_state()
 
     def disable(self):
         """Run operations to disable the daemon/unit."""
         from plinth.privileged import service as service_privileged
-        service_privileged.disable(self.unit)
-        if self.alias:
-            service_privileged.disable(self.alias)
+        try:
+            service_privileged.disable(self.unit)
+            if self.alias:
+                service_privileged.disable(self.alias)
+        finally:
+            self._invalidate_unit_state()
 
     def is_running(self):
         """Return whether the daemon/unit is running."""
-        return action_utils.service_is_running(self.unit)
+        return _service_is_running(self.unit)
+
+    def _invalidate_unit_state(self):
+        """Forget cached state of the units after changing them.
+
+        D-Bus signals from systemd will also invalidate the state but they may
+        not have been processed yet by the time the caller queries the state.
+        """
+        _unit_state_cache.invalidate(self.unit)
+        if self.alias:
+            _unit_state_cache.invalidate(self.alias)
 
     @contextlib.contextmanager
     def ensure_running(self):
         """Ensure a service is running and return to previous state."""
         from plinth.privileged import service as service_privileged
 
-        if action_utils.service_show(self.unit)['LoadState'] == 'not-found':
+        with prefetch_units_state([self.unit]) as units_state:
+            load_state = units_state[self.unit]['LoadState']
+            starting_state = self.is_running()
+
+        if load_state == 'not-found':
             # The service's package not installed yet, don't try to start it
             # and later stop it after it is installed.
             yield False  # Not running
             return
 
-        starting_state = self.is_running()
         if not starting_state:
             service_privileged.enable(self.unit)
+            _unit_state_cache.invalidate(self.unit)
 
         try:
             yield starting_state
         finally:
             if not starting_state:
                 service_privileged.disable(self.unit)
+                _unit_state_cache.invalidate(self.unit)
 
     def diagnose(self) -> list[DiagnosticCheck]:
         """Check if the daemon is running and listening on expected ports.
@@ -199,11 +261,390 @@ class SharedDaemon(Daemon):
             super().disable()
 
 
+class UnitStateCache:
+    """Cache of systemd unit states kept current using D-Bus signals.
+
+    systemd is asked to emit signals for all changes to units. A unit's active
+    state is updated or forgotten when its properties change. All unit file
+    states are forgotten when unit files change and everything is forgotten
+    when systemd reloads. States not yet known are retrieved over D-Bus and
+    remembered.
+
+    Units may be named without a suffix or by an alias. Active states are
+    remembered by the primary name of the unit, which is also the name that
+    signals are received for. Unit file states are remembered by full name
+    as each alias has its own unit file state.
+    """
+
+    timeout = 25000  # milliseconds
+
+    def __init__(self):
+        """Initialize the cache."""
+        self._connection = None
+        self._ready = False
+        self._lock = threading.Lock()
+        self._unit_file_states: dict[str, str] = {}
+        self._unit_states: dict[str, dict[str, str]] = {}
+        # Full name of a unit -> primary name of the unit
+        self._unit_ids: dict[str, str] = {}
+        # Incremented on every invalidation. A state retrieved over D-Bus is
+        # not stored if a signal was processed during the retrieval.
+        self._generation = 0
+
+    @property
+    def is_ready(self) -> bool:
+        """Return whether unit states can be answered by the cache."""
+        return self._ready
+
+    def connect(self, connection):
+        """Subscribe to systemd signals. Must be run from glib thread."""
+        self._connection = connection
+        connection.connect('closed', self._on_closed)
+        connection.signal_subscribe(SYSTEMD_BUS_NAME,
+                                    'org.freedesktop.DBus.Properties',
+                                    'PropertiesChanged', None,
+                                    SYSTEMD_UNIT_INTERFACE,
+                                    gio.DBusSignalFlags.NONE,
+                                    self._on_properties_changed)
+        for member in ('UnitFilesChanged', 'Reloading'):
+            connection.signal_subscribe(SYSTEMD_BUS_NAME,
+                                        SYSTEMD_MANAGER_INTERFACE, member,
+                                        SYSTEMD_PATH, None,
+                                        gio.DBusSignalFlags.NONE,
+                                        self._on_manager_signal)
+
+        connection.signal_subscribe('org.freedesktop.DBus',
+                                    'org.freedesktop.DBus', 'NameOwnerChanged',
+                                    '/org/freedesktop/DBus', SYSTEMD_BUS_NAME,
+                                    gio.DBusSignalFlags.NONE,
+                                    self._on_name_owner_changed)
+        self._subscribe()
+
+    def _subscribe(self):
+        """Ask systemd to emit signals for changes to all units."""
+
+        def _callback(connection, result):
+            try:
+                connection.call_finish(result)
+            except glib.Error as exception:
+                logger.warning('Unable to subscribe to systemd signals: %s',
+                               exception)
+                return
+
+            self.invalidate()
+            self._ready = True
+            logger.info('Tracking systemd unit states')
+
+        self._connection.call(SYSTEMD_BUS_NAME, SYSTEMD_PATH,
+                              SYSTEMD_MANAGER_INTERFACE, 'Subscribe', None,
+                              None, gio.DBusCallFlags.NONE, self.timeout, None,
+                              _callback)
+
+    def invalidate(self, unit: str | None = None):
+        """Forget the state of a unit or of all units."""
+        with self._lock:
+            self._generation += 1
+            if unit:
+                name = get_unit_full_name(unit)
+                self._unit_file_states.pop(name, None)
+                self._unit_states.pop(self._unit_ids.get(name, name), None)
+            else:
+                self._unit_file_states.clear()
+                self._unit_states.clear()
+                self._unit_ids.clear()
+
+    def get_units_state(self, units: list[str]) -> dict[str, dict[str, str]]:
+        """Return load, active and unit file states of units.
+
+        States not known yet are retrieved for all the units together.
+        """
+        names = {unit: get_unit_full_name(unit) for unit in units}
+        with self._lock:
+            generation = self._generation
+            unit_states = {}
+            for name in names.values():
+                unit_id = self._unit_ids.get(name)
+                if unit_id in self._unit_states:
+                    unit_states[name] = self._unit_states[unit_id]
+
+            unit_file_states = {
+                name: self._unit_file_states[name]
+                for name in names.values() if name in self._unit_file_states
+            }
+
+        fetched = self._fetch_unit_states(
+            [name for name in names.values() if name not in unit_states])
+        fetched_unit_file_states = {
+            name: self._fetch_unit_file_state(name)
+            for name in names.values() if name not in unit_file_states
+        }
+        with self._lock:
+            if generation == self._generation:
+                for name, (unit_id, state) in fetched.items():
+                    self._unit_ids[name] = unit_id
+                    self._unit_states[unit_id] = state
+
+                self._unit_file_states.update(fetched_unit_file_states)
+
+        unit_states.update({
+            name: state
+            for name, (_, state) in fetched.items()
+        })
+        unit_file_states.update(fetched_unit_file_states)
+        return {
+            unit: dict(unit_states[name], UnitFileState=unit_file_states[name])
+            for unit, name in names.items()
+        }
+
+    def _call(self, object_path: str, interface: str, method: str, parameters,
+              reply_type: str):
+        """Call a systemd method and return the unpacked reply."""
+        reply = self._connection.call_sync(SYSTEMD_BUS_NAME, object_path,
+                                           interface, method, parameters,
+                                           glib.VariantType(reply_type),
+                                           gio.DBusCallFlags.NONE,
+                                           self.timeout, None)
+        return reply.unpack()
+
+    def _fetch_unit_file_state(self, unit: str) -> str:
+        """Retrieve the unit file state of a unit from systemd."""
+        try:
+            return self._call(SYSTEMD_PATH,
+                              SYSTEMD_MANAGER_INTERFACE, 'GetUnitFileState',
+                              glib.Variant('(s)', (unit, )), '(s)')[0]
+        except glib.Error as exception:
+            if gio.DBusError.get_remote_error(exception) in (
+                    'org.freedesktop.DBus.Error.FileNotFound',
+                    'org.freedesktop.systemd1.NoSuchUnit'):
+                return 'not-found'
+
+            raise
+
+    def _fetch_unit_states(
+            self, units: list[str]) -> dict[str, tuple[str, dict[str, str]]]:
+        """Retrieve primary names, load and active states of units."""
+        if not units:
+            return {}
+
+        reply = self._call(SYSTEMD_PATH,
+                           SYSTEMD_MANAGER_INTERFACE, 'ListUnitsByNames',
+                           glib.Variant('(as)',
+                                        (units, )), '(a(ssssssouso))')[0]
+        if len(reply) != len(units):
+            # Invalid unit names are skipped in the reply
+            names = [info[0] for info in reply]
+            reply = [
+                reply[names.index(unit)] if unit in names else
+                (unit, '', 'not-found', 'inactive') for unit in units
+            ]
+
+        states = {}
+        for unit, info in zip(units, reply):
+            states[unit] = (info[0] or unit, {
+                'LoadState': info[2],
+                'ActiveState': info[3]
+            })
+
+        return states
+
+    def _on_properties_changed(self, _connection, _sender, object_path,
+                               _interface, _signal, parameters):
+        """Update the states of a unit when its properties change."""
+        unit = get_unit_name(object_path)
+        _, changed, invalidated = parameters.unpack()
+        with self._lock:
+            self._generation += 1
+            state = self._unit_states.get(unit)
+            if state is not None:
+                for name in ('LoadState', 'ActiveState'):
+                    if name in changed:
+                        state[name] = changed[name]
+                    elif name in invalidated:
+                        self._unit_states.pop(unit, None)
+
+            if 'UnitFileState' in changed or 'UnitFileState' in invalidated:
+                self._unit_file_states.pop(unit, None)
+
+    def _on_manager_signal(self, _connection, _sender, _object_path,
+                           _interface, signal, _parameters):
+        """Forget states when unit files change or systemd reloads."""
+        if signal == 'UnitFilesChanged':
+            with self._lock:
+                self._generation += 1
+                self._unit_file_states.clear()
+        else:
+            self.invalidate()
+
+    def _on_name_owner_changed(self, _connection, _sender, _object_path,
+                               _interface, _signal, parameters):
+        """Subscribe again when systemd reconnects to the bus."""
+        self._ready = False
+        self.invalidate()
+        _, _, new_owner = parameters.unpack()
+        if new_owner:
+            self._subscribe()
+
+    def _on_closed(self, _connection, _remote_peer_vanished, _error):
+        """Stop using the cache when the bus connection is lost."""
+        logger.warning('Lost D-Bus connection, not tracking unit states')
+        self._ready = False
+        self.invalidate()
+
+
+_unit_state_cache = UnitStateCache()
+
+
+def init():
+    """Start tracking systemd unit states. Must be run from glib thread."""
+    if not action_utils.is_systemd_running():
+        return
+
+    try:
+        connection = gio.bus_get_sync(gio.BusType.SYSTEM, None)
+    except glib.Error as exception:
+        logger.warning('Unable to connect to system bus: %s', exception)
+        return
+
+    _unit_state_cache.connect(connection)
+
+
+def get_unit_full_name(unit: str) -> str:
+    """Return the name of a unit with a suffix for its type.
+
+    Names without a suffix are taken to be services, as done by systemctl.
+    """
+    if any(unit.endswith(suffix) for suffix in _UNIT_SUFFIXES):
+        return unit
+
+    return unit + '.service'
+
+
+def get_unit_object_path(unit: str) -> str:
+    """Return the D-Bus object path of a systemd unit."""
+    label = ''
+    for index, character in enumerate(unit):
+        if character.isascii() and (character.isalpha() or
+                                    (character.isdigit() and index > 0)):
+            label += character
+        else:
+            label += ''.join(f'_{byte:02x}' for byte in character.encode())
+
+    return f'{SYSTEMD_PATH}/unit/{label or "_"}'
+
+
+def get_unit_name(object_path: str) -> str:
+    """Return the name of a systemd unit from its D-Bus object path."""
+    label = object_path.rpartition('/')[2]
+    if label == '_':
+        return ''
+
+    name = bytearray()
+    index = 0
+    while index < len(label):
+        if label[index] == '_':
+            name.append(int(label[index + 1:index + 3], 16))
+            index += 3
+        else:
+            name += label[index].encode()
+            index += 1
+
+    return name.decode()
+
+
+def get_units_state(
+        units: list[str],
+        properties: list[str] | None = None) -> dict[str, dict[str, str]]:
+    """Return properties such as the states of many units with one query.
+
+    By default, 'LoadState', 'ActiveState' and 'UnitFileState' properties are
+    returned. Return a dictionary mapping each unit to a dictionary of its
+    properties.
+    """
+    units = list(dict.fromkeys(units))
+    properties = properties or UNIT_STATE_PROPERTIES
+    if not units:
+        return {}
+
+    if _unit_state_cache.is_ready and set(properties) <= set(
+            UNIT_STATE_PROPERTIES):
+        try:
+            return _unit_state_cache.get_units_state(units)
+        except glib.Error as exception:
+            logger.warning('Unable to get state of units: %s', exception)
+
+    return action_utils.service_show_many(units, properties)
+
+
+@contextlib.contextmanager
+def prefetch_units_state(units: list[str]):
+    """Query the states of units together and use them within the context.
+
+    Checking if a unit is enabled or running answers from the results instead
+    of querying the unit again. Yield the result of get_units_state().
+    """
+    units_state = get_units_state(units)
+    previous = getattr(_units_state_snapshot, 'states', None)
+    _units_state_snapshot.states = dict(previous or {}, **units_state)
+    try:
+        yield units_state
+    finally:
+        _units_state_snapshot.states = previous
+
+
+def get_app_units(app_) -> list[str]:
+    """Return the units, including aliases, of daemons in an app."""
+    units = []
+    for component in app_.get_components_of_type(Daemon):
+        units.append(component.unit)
+        if component.alias:
+            units.append(component.alias)
+
+    return units
+
+
+def _get_unit_state(unit: str) -> dict[str, str] | None:
+    """Return the known state of a unit without running systemctl."""
+    snapshot = getattr(_units_state_snapshot, 'states', None)
+    if snapshot and unit in snapshot:
+        return snapshot[unit]
+
+    if _unit_state_cache.is_ready:
+        try:
+            return _unit_state_cache.get_units_state([unit])[unit]
+        except glib.Error as exception:
+            logger.warning('Unable to get state of unit %s: %s', unit,
+                           exception)
+
+    return None
+
+
+def _service_is_enabled(unit: str, strict_check: bool = False) -> bool:
+    """Return if a unit is enabled, using known state if possible."""
+    state = _get_unit_state(unit)
+    if state is None:
+        return action_utils.service_is_enabled(unit, strict_check=strict_check)
+
+    if strict_check:
+        return state['UnitFileState'] == 'enabled'
+
+    return state['UnitFileState'] in _ENABLED_UNIT_FILE_STATES
+
+
+def _service_is_running(unit: str) -> bool:
+    """Return if a unit is running, using known state if possible."""
+    state = _get_unit_state(unit)
+    if state is None:
+        return action_utils.service_is_running(unit)
+
+    return state['ActiveState'] in _RUNNING_ACTIVE_STATES
+
+
 def app_is_running(app_):
     """Return whether all the daemons in the app are running."""
-    for component in app_.components.values():
-        if hasattr(component, 'is_running') and not component.is_running():
-            return False
+    with prefetch_units_state(get_app_units(app_)):
+        for component in app_.components.values():
+            if hasattr(component, 'is_running') and not component.is_running():
+                return False
 
     return True
 
@@ -213,9 +654,8 @@ def diagnose_port_listening(
         component_id: str | None = None) -> DiagnosticCheck:
     """Run a diagnostic on whether a port is being listened on.
 
-    Kind must be one of inet, inet4, inet6, tcp, tcp4, tcp6, udp,
-    udp4, udp6, unix, all.  See psutil.net_connection() for more
-    information.
+    Kind must be one of tcp, tcp4, tcp6, udp, udp4, udp6. A snapshot of
+    listening sockets that is a few seconds old may be used.
 
     """
     result = _check_port(port, kind, listen_address)
@@ -235,47 +675,64 @@ def diagnose_port_listening(
                            parameters, component_id)
 
 
-def _check_port(port: int, kind: str = 'tcp',
-                listen_address: str | None = None) -> bool:
-    """Return whether a port is being listened on."""
-    run_kind = kind
+def _get_listening_sockets() -> dict[tuple[str, int, int], set[str]]:
+    """Return addresses of listening sockets indexed by protocol, family, port.
 
-    if kind == 'tcp4':
-        run_kind = 'tcp'
+    Listing sockets is expensive when there are many connections. A snapshot is
+    taken and reused for a few seconds so that diagnosing many ports needs only
+    a single listing.
+    """
+    global _listening_sockets, _listening_sockets_time
+
+    with _listening_sockets_lock:
+        now = time.monotonic()
+        if _listening_sockets_time is not None and \
+           now - _listening_sockets_time < listening_sockets_max_age:
+            return _listening_sockets
+
+        listening_sockets: dict[tuple[str, int, int], set[str]] = {}
+        for connection in psutil.net_connections('inet'):
+            if connection.type == socket.SOCK_STREAM:
+                # TCP connections must have status='listen'
+                if connection.status != psutil.CONN_LISTEN:
+                    continue
+
+                protocol = 'tcp'
+            elif connection.type == socket.SOCK_DGRAM:
+                # UDP connections must have empty remote address
+                if connection.raddr != ():
+                    continue
+
+                protocol = 'udp'
+            else:
+                continue
 
-    if kind == 'udp4':
-        run_kind = 'udp'
+            address, port = connection.laddr  # type: ignore[misc]
+            key = (protocol, connection.family, port)
+            listening_sockets.setdefault(key, set()).add(address)
 
-    for connection in psutil.net_connections(run_kind):
-        # TCP connections must have status='listen'
-        if kind in ('tcp', 'tcp4', 'tcp6') and \
-           connection.status != psutil.CONN_LISTEN:
-            continue
+        _listening_sockets = listening_sockets
+        _listening_sockets_time = now
+        return _listening_sockets
 
-        # UDP connections must have empty remote address
-        if kind in ('udp', 'udp4', 'udp6') and \
-           connection.raddr != ():
-            continue
 
-        # Port should match
-        if connection.laddr[1] != port:  # type: ignore[misc]
+def _check_port(port: int, kind: str = 'tcp',
+                listen_address: str | None = None) -> bool:
+    """Return whether a port is being listened on."""
+    listening_sockets = _get_listening_sockets()
+    protocol = kind[:3]
+    for family in (socket.AF_INET, socket.AF_INET6):
+        if kind.endswith('4') and family == socket.AF_INET6:
+            # Full IPv6 address range includes mapped IPv4 address also
+            addresses = listening_sockets.get(
+                (protocol, family, port), set()) & {'::'}
+        elif kind.endswith('6') and family == socket.AF_INET:
             continue
+        else:
+            addresses = listening_sockets.get((protocol, family, port), set())
 
         # Listen address if requested should match
-        if listen_address and connection.laddr[
-                0] != listen_address:  # type: ignore[misc]
-            continue
-
-        # Special additional checks only for IPv4
-        if kind not in ('tcp4', 'udp4'):
-            return True
-
-        # Found socket is IPv4
-        if connection.family == socket.AF_INET:
-            return True
-
-        # Full IPv6 address range includes mapped IPv4 address also
-        if connection.laddr[0] == '::':  # type: ignore[misc]
+        if listen_address in addresses or (addresses and not listen_address):
             return True
 
     return False
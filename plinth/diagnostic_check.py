@@ -1,17 +1,31 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 """Diagnostic check data type."""
 
+import collections
+import concurrent.futures
 import dataclasses
 import json
+import threading
+import time
 from dataclasses import dataclass, field
 from enum import StrEnum
-from typing import TypeAlias
+from typing import Any, Callable, Iterable, TypeAlias
 
-from django.utils.translation import gettext
+from django.utils.translation import gettext, gettext_noop
 
 from plinth.utils import SafeFormatter
 
 DiagnosticCheckParameters: TypeAlias = dict[str, str | int | bool | None]
+_DoneCallback: TypeAlias = Callable[[int, concurrent.futures.Future | None],
+                                    None]
+
+# Maximum number of components whose diagnostic checks run at the same time
+# in a single run
+max_workers = 8
+
+# Seconds after which checks of a component that are still running are
+# abandoned and reported as an error
+check_timeout = 120
 
 
 class Result(StrEnum):
@@ -71,3 +85,94 @@ class CheckJSONDecoder(json.JSONDecoder):
                                    data.get('component_id'))
 
         return data
+
+
+def run_in_parallel(
+    functions: list[Callable[[], Any]], timeout: float,
+    workers: int | None = None, on_done: _DoneCallback | None = None
+) -> list[concurrent.futures.Future | None]:
+    """Run functions on separate threads and wait for them to finish.
+
+    Return the finished future of each function in order. A function that is
+    still running timeout seconds after it started is abandoned and None is
+    returned in its place. As each function finishes or is abandoned, on_done
+    is called with its index and its future or None.
+
+    At most workers functions (max_workers by default) run at the same time.
+    Each function runs on a new daemon thread. So, an abandoned function keeps
+    running without holding up later functions or the exit of the service.
+    """
+    workers = workers or max_workers
+    futures = [concurrent.futures.Future() for _ in functions]
+    results: list[concurrent.futures.Future | None] = [None] * len(functions)
+    waiting = collections.deque(range(len(functions)))
+    running: dict[concurrent.futures.Future, tuple[int, float]] = {}
+    while waiting or running:
+        while waiting and len(running) < workers:
+            index = waiting.popleft()
+            running[futures[index]] = (index, time.monotonic())
+            _start_thread(functions[index], futures[index], index)
+
+        done, _ = concurrent.futures.wait(
+            running, timeout=min(timeout, 1),
+            return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            index, _ = running.pop(future)
+            results[index] = future
+            if on_done:
+                on_done(index, future)
+
+        now = time.monotonic()
+        for future, (index, start) in list(running.items()):
+            if now - start > timeout:
+                del running[future]
+                if on_done:
+                    on_done(index, None)
+
+    return results
+
+
+def _start_thread(function: Callable[[], Any],
+                  future: concurrent.futures.Future, index: int):
+    """Run a function on a daemon thread and set its result on a future."""
+
+    def _run():
+        future.set_running_or_notify_cancel()
+        try:
+            result = function()
+        except BaseException as exception:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    thread = threading.Thread(target=_run, name=f'diagnostics-{index}',
+                              daemon=True)
+    thread.start()
+
+
+def diagnose_components(components: Iterable) -> list[DiagnosticCheck]:
+    """Run diagnostic checks of app components in parallel.
+
+    Results are returned in the order of the components. If checks of a
+    component raise an exception, it is raised again.
+    """
+    with_checks = [
+        component for component in components if component.has_diagnostics()
+    ]
+    results: list[DiagnosticCheck] = []
+    futures = run_in_parallel(
+        [component.diagnose for component in with_checks], check_timeout)
+    for component, future in zip(with_checks, futures):
+        if future:
+            results.extend(future.result())
+            continue
+
+        description = gettext_noop(
+            'Diagnostic checks finish within {timeout} seconds')
+        parameters: DiagnosticCheckParameters = {'timeout': check_timeout}
+        results.append(
+            DiagnosticCheck(f'diagnostics-timeout-{component.component_id}',
+                            description, Result.ERROR, parameters,
+                            component.component_id))
+
+    return results
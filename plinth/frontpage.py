@@ -7,7 +7,7 @@ import pathlib
 from typing import ClassVar
 
 from plinth import app, cfg
-from plinth.modules.users import privileged as users_privileged
+from plinth.modules import users
 
 logger = logging.getLogger(__name__)
 
@@ -118,8 +118,7 @@ class Shortcut(app.FollowerComponent):
         if not username:
             return cls._all_shortcuts
 
-        # XXX: Turn this into an API call in users module and cache
-        user_groups = set(users_privileged.get_user_groups(username))
+        user_groups = set(users.get_user_groups(username))
 
         if 'admin' in user_groups:  # Admin has access to all services
             return cls._all_shortcuts
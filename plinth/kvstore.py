@@ -1,35 +1,115 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 """
 Simple key/value store using Django models
+
+Recently used values are kept in memory. Values are written to the database
+immediately. All changes to the store must be made using this module for the
+values in memory to remain current.
 """
 
+import collections
+import json
+import threading
+from typing import Any
+
 from . import db
 
+# Maximum number of keys kept in memory
+cache_size = 1024
+
+_IMMUTABLE_TYPES = (type(None), bool, int, float, str)
+_NOT_DECODED = object()
+
+# Key -> (JSON value, decoded value or _NOT_DECODED) or None if key is not in
+# the store.
+_cache: collections.OrderedDict[str, tuple[str, Any] | None] = \
+    collections.OrderedDict()
+_cache_lock = threading.Lock()
+
 
 def get(key):
     """Return the value of a key"""
     from plinth.models import KVStore
 
-    with db.lock:
-        # pylint: disable-msg=E1101
-        return KVStore.objects.get(pk=key).value
+    values = get_many([key])
+    try:
+        return values[key]
+    except KeyError:
+        raise KVStore.DoesNotExist(f'Key not found: {key}')
 
 
 def get_default(key, default_value):
     """Return the value of the key if key exists else return default_value"""
+    try:
+        return get_many([key]).get(key, default_value)
+    except Exception:
+        return default_value
+
+
+def get_many(keys: list[str]) -> dict[str, Any]:
+    """Return the values of the keys that exist, in a single query."""
+    from plinth.models import KVStore
+
+    values = {}
+    keys_to_load = []
+    with _cache_lock:
+        for key in keys:
+            if key not in _cache:
+                keys_to_load.append(key)
+                continue
+
+            _cache.move_to_end(key)
+            entry = _cache[key]
+            if entry:
+                values[key] = _decode(entry)
+
+    if not keys_to_load:
+        return values
+
+    # Values in memory are updated only while holding the database lock so
+    # that an older value is not remembered.
     with db.lock:
-        try:
-            return get(key)
-        except Exception:
-            return default_value
+        stores = KVStore.objects.filter(key__in=keys_to_load)
+        loaded = {store.key: store.value_json for store in stores}
+        with _cache_lock:
+            for key in keys_to_load:
+                entry = None
+                if key in loaded:
+                    entry = _make_entry(loaded[key])
+                    values[key] = _decode(entry)
+
+                _remember(key, entry)
+
+    return values
 
 
 def set(key, value):  # pylint: disable-msg=W0622
     """Store the value of a key"""
+    set_many({key: value})
+
+
+def set_many(values: dict[str, Any]):
+    """Store the values of multiple keys in a single query."""
     from plinth.models import KVStore
+
+    stores = []
+    for key, value in values.items():
+        store = KVStore(key=key)
+        store.value = value
+        stores.append(store)
+
     with db.lock:
-        store = KVStore(key=key, value=value)
-        store.save()
+        try:
+            KVStore.objects.bulk_create(stores, update_conflicts=True,
+                                        unique_fields=['key'],
+                                        update_fields=['value_json'])
+        except Exception:
+            invalidate(values.keys())
+            raise
+
+        with _cache_lock:
+            for store in stores:
+                _remember(store.key, _make_entry(store.value_json))
 
 
 def delete(key, ignore_missing=False):
@@ -41,3 +121,43 @@ def delete(key, ignore_missing=False):
         except KVStore.DoesNotExist:
             if not ignore_missing:
                 raise
+        finally:
+            invalidate([key])
+
+
+def invalidate(keys=None):
+    """Forget values in memory for given keys or all keys if None."""
+    with _cache_lock:
+        if keys is None:
+            _cache.clear()
+            return
+
+        for key in keys:
+            _cache.pop(key, None)
+
+
+def _make_entry(value_json: str) -> tuple[str, Any]:
+    """Return an entry for remembering a value."""
+    value = json.loads(value_json)
+    if not isinstance(value, _IMMUTABLE_TYPES):
+        # Callers may modify the value, return a fresh copy every time
+        value = _NOT_DECODED
+
+    return (value_json, value)
+
+
+def _decode(entry: tuple[str, Any]) -> Any:
+    """Return the value from a remembered entry."""
+    value_json, value = entry
+    if value is _NOT_DECODED:
+        return json.loads(value_json)
+
+    return value
+
+
+def _remember(key: str, entry: tuple[str, Any] | None):
+    """Remember an entry for a key, forgetting the least recently used."""
+    _cache[key] = entry
+    _cache.move_to_end(key)
+    while len(_cache) > cache_size:
+        _cache.popitem(last=False)
@@ -5,6 +5,7 @@ Common Django middleware.
 
 import logging
 import re
+import time
 
 from django import urls
 from django.conf import settings
@@ -52,12 +53,14 @@ class SetupMiddleware(MiddlewareMixin):
         if user_requests_login:
             return
 
-        # Perform a URL resolution. This is slightly inefficient as
-        # Django will do this resolution again.
-        try:
-            resolver_match = urls.resolve(request.path_info)
-        except urls.Resolver404:
-            return
+        # Django resolves the URL before calling the view middleware. Resolve
+        # again only when called outside of request handling.
+        resolver_match = request.resolver_match
+        if not resolver_match:
+            try:
+                resolver_match = urls.resolve(request.path_info)
+            except urls.Resolver404:
+                return
 
         non_app_namespaces = {'oauth2_provider'}
         if (not resolver_match.namespaces or not len(resolver_match.namespaces)
@@ -200,6 +203,44 @@ class CommonErrorMiddleware(MiddlewareMixin):
         return list(breadcrumbs.keys())[parent_index]
 
 
+class RequestTimingMiddleware:
+    """Django middleware to report time spent on each part of a request.
+
+    Used only in development mode as the first middleware. The time taken by
+    middleware while processing the request, by the view middleware and the
+    view (including rendering) and by the whole request is sent in the
+    Server-Timing header to be shown by browser developer tools.
+    """
+
+    def __init__(self, get_response):
+        """Initialize the middleware object."""
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Measure the time taken for handling a request."""
+        start_time = time.perf_counter()
+        request.timing_view_start = None
+        response = self.get_response(request)
+        end_time = time.perf_counter()
+
+        timings = {'total': end_time - start_time}
+        if request.timing_view_start:
+            timings['middleware'] = request.timing_view_start - start_time
+            timings['view'] = end_time - request.timing_view_start
+
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={seconds * 1000:.1f}'
+            for name, seconds in timings.items())
+        logger.debug('Request %s %s took %s', request.method, request.path,
+                     response['Server-Timing'])
+        return response
+
+    @staticmethod
+    def process_view(request, view_func, view_args, view_kwargs):
+        """Note the time when middleware is done and view is called."""
+        request.timing_view_start = time.perf_counter()
+
+
 class CSPDict(dict):
     """A dictionary to store Content Security Policy.
 
@@ -4,27 +4,35 @@ Discover, load and manage FreedomBox applications.
 """
 
 import importlib
+import importlib.machinery
+import importlib.util
 import logging
 import pathlib
 import re
+import time
 import types
 
-import django
+import django.urls
 
-from plinth import cfg
+from plinth import cfg, profiler
 from plinth.signals import pre_module_loading
 
 logger = logging.getLogger(__name__)
 
 loaded_modules: dict[str, types.ModuleType] = dict()
 _modules_to_load = None
+_module_import_paths: dict[str, str | None] | None = None
+
+# Seconds after which importing a URLconf that failed is tried again
+urls_retry_interval = 60
 
 
 def include_urls():
     """Include the URLs of the modules into main Django project."""
     for module_import_path in get_modules_to_load():
         module_name = module_import_path.split('.')[-1]
-        _include_module_urls(module_import_path, module_name)
+        with profiler.record('urls', module_name):
+            _include_module_urls(module_import_path, module_name)
 
 
 def load_modules():
@@ -39,7 +47,9 @@ def load_modules():
     for module_import_path in get_modules_to_load():
         module_name = module_import_path.split('.')[-1]
         try:
-            module = importlib.import_module(module_import_path)
+            with profiler.record('import', module_name):
+                module = importlib.import_module(module_import_path)
+
             loaded_modules[module_name] = module
         except Exception as exception:
             logger.exception('Could not import %s: %s', module_import_path,
@@ -49,18 +59,91 @@ def load_modules():
 
 
 def _include_module_urls(module_import_path, module_name):
-    """Include the module's URLs in global project URLs list"""
+    """Include the module's URLs in global project URLs list.
+
+    The module's URLconf, along with its views and forms, is imported only
+    when Django first needs it to resolve or reverse a URL. Reversing any URL
+    needs the URLconfs of all the modules.
+    """
     from plinth import urls
     url_module = module_import_path + '.urls'
-    try:
-        urls.urlpatterns += [
-            django.urls.re_path(r'',
-                                django.urls.include((url_module, module_name)))
-        ]
-    except ImportError:
+    if not _has_submodule(module_import_path, 'urls'):
         logger.debug('No URLs for %s', module_name)
         if cfg.develop:
-            raise
+            raise ImportError(f'No module named {url_module}')
+
+        return
+
+    if cfg.develop:
+        # Find errors in URLconfs at startup
+        importlib.import_module(url_module)
+
+    urls.urlpatterns += [_LazyURLResolver(url_module, module_name)]
+
+
+class _LazyURLResolver(django.urls.URLResolver):
+    """Resolver for a module's URLconf that is imported when first needed.
+
+    If the URLconf can't be imported, the module has no URLs so that URLs of
+    all other modules can still be resolved and reversed. Importing is tried
+    again when resolving URLs after urls_retry_interval seconds.
+    """
+
+    def __init__(self, import_path: str, module_name: str):
+        """Initialize the resolver."""
+        super().__init__(django.urls.resolvers.RegexPattern(r''), import_path,
+                         app_name=module_name, namespace=module_name)
+        self._urlpatterns: list | None = None
+        self._import_failed_at: float | None = None
+
+    @property  # type: ignore[override]
+    def url_patterns(self) -> list:
+        """Return the URL patterns, importing the URLconf if needed."""
+        if self._urlpatterns is None:
+            self._import()
+
+        return self._urlpatterns or []
+
+    def _import(self):
+        """Import the URLconf unless it has failed very recently."""
+        failed_at = self._import_failed_at
+        now = time.monotonic()
+        if failed_at is not None and now - failed_at < urls_retry_interval:
+            return
+
+        try:
+            module = importlib.import_module(self.urlconf_name)
+        except Exception as exception:
+            if cfg.develop:
+                raise
+
+            if failed_at is None:
+                logger.exception('Could not import URLs %s: %s',
+                                 self.urlconf_name, exception)
+
+            self._import_failed_at = now
+            return
+
+        self._urlpatterns = module.urlpatterns
+        if failed_at is not None:
+            logger.info('Imported URLs %s', self.urlconf_name)
+            # Forget the URLs that were collected without this module
+            django.urls.clear_url_caches()
+
+
+def _has_submodule(module_import_path: str, submodule_name: str) -> bool:
+    """Return whether a package has a submodule without importing either."""
+    try:
+        spec = importlib.util.find_spec(module_import_path)
+    except ImportError:
+        return False
+
+    if not spec or not spec.submodule_search_locations:
+        return False
+
+    return bool(
+        importlib.machinery.PathFinder.find_spec(
+            submodule_name, list(spec.submodule_search_locations)))
 
 
 def _get_modules_enabled_paths():
@@ -115,8 +198,34 @@ def get_modules_to_load():
     return modules
 
 
+def _get_module_import_paths() -> dict[str, str | None]:
+    """Return an index of module names to import paths.
+
+    The index is built once from the modules-enabled files and kept for the
+    lifetime of the process.
+    """
+    global _module_import_paths
+    if _module_import_paths is not None:
+        return _module_import_paths
+
+    import_paths = {}
+    for file_ in _get_modules_enabled_files_to_read():
+        import_paths[file_.name] = _read_module_import_paths_from_file(file_)
+
+    _module_import_paths = import_paths
+    return import_paths
+
+
 def get_module_import_path(module_name: str) -> str:
     """Return the import path for a module."""
+    import_paths = _get_module_import_paths()
+    if module_name in import_paths:
+        import_path = import_paths[module_name]
+        if not import_path:
+            raise ValueError('Module disabled')
+
+        return import_path
+
     import_path_file = None
     for path in _get_modules_enabled_paths():
         file_ = path / module_name
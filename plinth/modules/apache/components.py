@@ -1,6 +1,7 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 """App component for other apps to use Apache configuration functionality."""
 
+import functools
 import re
 import subprocess
 
@@ -11,12 +12,14 @@ from plinth.diagnostic_check import (DiagnosticCheck,
                                      DiagnosticCheckParameters, Result)
 from plinth.privileged import service as service_privileged
 
-from . import privileged
+from . import privileged, prober
 
 
 class Webserver(app.LeaderComponent):
     """Component to enable/disable Apache configuration."""
 
+    resources = ['apache-config']
+
     def __init__(self, component_id: str, web_name: str, kind: str = 'config',
                  urls: list[str] | None = None, expect_redirects: bool = False,
                  last_updated_version: int | None = None):
@@ -120,6 +123,8 @@ class WebserverRoot(app.FollowerComponent):
     the domain changes, the change must be notified using domain_set().
     """
 
+    resources = ['apache-config']
+
     def __init__(self, component_id: str, web_name: str,
                  expect_redirects: bool = False,
                  last_updated_version: int | None = None):
@@ -244,18 +249,18 @@ def diagnose_url_on_all(url: str, expect_redirects: bool = False,
                         component_id: str | None = None,
                         **kwargs) -> list[DiagnosticCheck]:
     """Run a diagnostic on whether a URL is accessible."""
-    results = []
+    checks = []
     for address in action_utils.get_addresses():
         current_url = url.format(host=address['url_address'])
         diagnose_kwargs = dict(kwargs)
         if not expect_redirects:
             diagnose_kwargs.setdefault('kind', address['kind'])
 
-        results.append(
-            diagnose_url(current_url, component_id=component_id,
-                         **diagnose_kwargs))
+        checks.append(
+            functools.partial(diagnose_url, current_url,
+                              component_id=component_id, **diagnose_kwargs))
 
-    return results
+    return prober.run_concurrently(checks)
 
 
 def check_url(url: str, kind: str | None = None,
@@ -264,7 +269,14 @@ def check_url(url: str, kind: str | None = None,
               extra_options: list[str] | None = None,
               wrapper: str | None = None,
               expected_output: str | None = None) -> bool:
-    """Check whether a URL is accessible."""
+    """Check whether a URL is accessible.
+
+    Checks are made without running cURL unless an environment, extra cURL
+    options or a wrapper such as torsocks are needed.
+    """
+    if not env and not extra_options and not wrapper:
+        return prober.check_url(url, kind, check_certificate, expected_output)
+
     # When testing a URL with cURL, following any redirections with --location.
     # During those follows, store cookies that have been set and use them for
     # later requests. mod_auth_openidc will set a cookie 'x_csrf' to prevent
@@ -0,0 +1,212 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""Check whether URLs are accessible without running an external program.
+
+Behaves like 'curl --location --cookie "" --fail'. Redirects are followed and
+cookies set during the redirects are sent back in later requests of the same
+check. Connections are kept open for a short while and reused by later checks
+to the same server.
+"""
+
+import concurrent.futures
+import http.client
+import http.cookiejar
+import logging
+import re
+import socket
+import ssl
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+# Seconds to wait for connecting and for data from the server
+timeout = 30
+
+# Maximum number of redirects followed during a check
+max_redirects = 50
+
+# Seconds for which an idle connection may be reused
+idle_timeout = 2
+
+# Maximum number of checks run at the same time by run_concurrently()
+max_workers = 8
+
+logger = logging.getLogger(__name__)
+
+_idle_connections: dict[tuple, list[tuple[float,
+                                          http.client.HTTPConnection]]] = {}
+_idle_connections_lock = threading.Lock()
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                  thread_name_prefix='prober')
+
+_REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+_FAMILIES = {None: socket.AF_UNSPEC, '4': socket.AF_INET, '6': socket.AF_INET6}
+
+
+class _ConnectionMixin:
+    """Connect using only the given address family."""
+
+    def _set_family(self, family: int):
+        """Use only the given address family when connecting."""
+        self.family = family
+        self._create_connection = self._create_family_connection
+
+    def _create_family_connection(self, address, timeout, source_address=None):
+        """Connect to the first reachable address of the host."""
+        host, port = address
+        error = None
+        for family, type_, proto, _, sockaddr in socket.getaddrinfo(
+                host, port, self.family, socket.SOCK_STREAM):
+            sock = socket.socket(family, type_, proto)
+            try:
+                sock.settimeout(timeout)
+                sock.connect(sockaddr)
+                return sock
+            except OSError as exception:
+                error = exception
+                sock.close()
+
+        raise error or OSError(f'Unable to resolve {host}')
+
+
+class _HTTPConnection(_ConnectionMixin, http.client.HTTPConnection):
+    """HTTP connection that uses a single address family."""
+
+    def __init__(self, host, port, family, **kwargs):
+        super().__init__(host, port, **kwargs)
+        self._set_family(family)
+
+
+class _HTTPSConnection(_ConnectionMixin, http.client.HTTPSConnection):
+    """HTTPS connection that uses a single address family."""
+
+    def __init__(self, host, port, family, **kwargs):
+        super().__init__(host, port, **kwargs)
+        self._set_family(family)
+
+    def connect(self):
+        """Connect and start TLS without the IPv6 zone in server name."""
+        http.client.HTTPConnection.connect(self)
+        self.sock = self._context.wrap_socket(
+            self.sock, server_hostname=self.host.partition('%')[0])
+
+
+def check_url(url: str, kind: str | None = None,
+              check_certificate: bool = True,
+              expected_output: str | None = None) -> bool:
+    """Return whether a URL is accessible.
+
+    Kind can be '4' for IPv4 or '6' for IPv6. Link local IPv6 addresses may
+    contain a zone index such as in 'https://[fe80::1%eth0]/'. Responses with
+    status 401 and 405 count as success.
+    """
+    family = _FAMILIES[kind]
+    cookie_jar = http.cookiejar.CookieJar()
+    try:
+        for _ in range(max_redirects + 1):
+            response, body = _request(url, family, check_certificate,
+                                      cookie_jar)
+            location = response.headers.get('Location')
+            if response.status not in _REDIRECT_STATUSES or not location:
+                break
+
+            url = urllib.parse.urljoin(url, location)
+        else:
+            logger.info('Too many redirects while checking URL %s', url)
+            return False
+    except (OSError, ValueError, http.client.HTTPException) as exception:
+        logger.debug('Unable to access URL %s: %s', url, exception)
+        return False
+
+    if response.status >= 400:
+        # Authorization failed is a success
+        return response.status in (401, 405)
+
+    if expected_output and expected_output not in body.decode(
+            errors='replace'):
+        return False
+
+    return True
+
+
+def run_concurrently(functions: list) -> list:
+    """Run checks at the same time and return their results in order."""
+    futures = [_executor.submit(function) for function in functions]
+    return [future.result() for future in futures]
+
+
+def _request(url: str, family: int, check_certificate: bool,
+             cookie_jar: http.cookiejar.CookieJar):
+    """Make a GET request and return the response and its body."""
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise ValueError(f'Unsupported URL {url}')
+
+    request = urllib.request.Request(url)
+    cookie_jar.add_cookie_header(request)
+    # IPv6 zone index is only meaningful locally
+    host = re.sub(r'%[^\]]*', '', parts.netloc.rpartition('@')[2])
+    headers = {'Host': host, 'User-Agent': 'FreedomBox', 'Accept': '*/*'}
+    if request.has_header('Cookie'):
+        headers['Cookie'] = request.get_header('Cookie')
+
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    key = (parts.scheme, parts.hostname, port, family, check_certificate)
+    while True:
+        connection, reused = _get_connection(key)
+        try:
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            body = response.read()
+            break
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            if not reused:
+                raise
+
+            # Server may have closed the idle connection, try a new one.
+
+    cookie_jar.extract_cookies(response, request)  # type: ignore[arg-type]
+    if response.will_close:
+        connection.close()
+    else:
+        _put_connection(key, connection)
+
+    return response, body
+
+
+def _get_connection(key: tuple) -> tuple[http.client.HTTPConnection, bool]:
+    """Return an idle connection or a new one and whether it is reused."""
+    now = time.monotonic()
+    with _idle_connections_lock:
+        connections = _idle_connections.get(key, [])
+        while connections:
+            idle_since, connection = connections.pop()
+            if now - idle_since < idle_timeout:
+                return connection, True
+
+            connection.close()
+
+    scheme, host, port, family, check_certificate = key
+    if scheme == 'http':
+        return _HTTPConnection(host, port, family, timeout=timeout), False
+
+    context = ssl.create_default_context()
+    if not check_certificate:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+
+    return _HTTPSConnection(host, port, family, timeout=timeout,
+                            context=context), False
+
+
+def _put_connection(key: tuple, connection: http.client.HTTPConnection):
+    """Keep a connection for reuse by later requests."""
+    with _idle_connections_lock:
+        _idle_connections.setdefault(key, []).append(
+            (time.monotonic(), connection))
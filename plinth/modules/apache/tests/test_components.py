@@ -394,42 +394,51 @@ def test_diagnose_url(get_addresses, check):
     ]
 
 
+@patch('plinth.modules.apache.prober.check_url')
 @patch('subprocess.run')
-def test_check_url(run):
+def test_check_url(run, prober_check_url):
     """Test checking whether a URL is accessible."""
     url = 'http://localhost/test'
     basic_command = [
         'curl', '--location', '--cookie', '', '--fail', '--write-out',
         '%{response_code}'
     ]
-    extra_args = {'env': None, 'check': True, 'stdout': -1, 'stderr': -1}
+    env = {'https_proxy': 'http://localhost:8118/'}
+    extra_args = {'env': env, 'check': True, 'stdout': -1, 'stderr': -1}
+
+    # Without cURL
+    prober_check_url.return_value = True
+    assert check_url(url, kind='6', check_certificate=False,
+                     expected_output='test-output')
+    prober_check_url.assert_called_with(url, '6', False, 'test-output')
+    assert not run.called
 
     # Basic
-    assert check_url(url)
+    assert check_url(url, env=env)
     run.assert_called_with(basic_command + [url], **extra_args)
 
     # Wrapper
-    check_url(url, wrapper='test-wrapper')
+    check_url(url, env=env, wrapper='test-wrapper')
     run.assert_called_with(['test-wrapper'] + basic_command + [url],
                            **extra_args)
 
     # No certificate check
-    check_url(url, check_certificate=False)
+    check_url(url, env=env, check_certificate=False)
     run.assert_called_with(basic_command + [url, '-k'], **extra_args)
 
     # Extra options
     check_url(url, extra_options=['test-opt1', 'test-opt2'])
     run.assert_called_with(basic_command + [url, 'test-opt1', 'test-opt2'],
-                           **extra_args)
+                           **dict(extra_args, env=None))
 
     # TCP4/TCP6
-    check_url(url, kind='4')
+    check_url(url, env=env, kind='4')
     run.assert_called_with(basic_command + [url, '-4'], **extra_args)
-    check_url(url, kind='6')
+    check_url(url, env=env, kind='6')
     run.assert_called_with(basic_command + [url, '-6'], **extra_args)
 
     # IPv6 Link Local URLs
-    check_url('https://[::2%eth0]/test', kind='6')
+    check_url('https://[::2%eth0]/test', env=env, kind='6')
     run.assert_called_with(
         basic_command + ['--interface', 'eth0', 'https://[::2]/test', '-6'],
         **extra_args)
@@ -438,16 +447,16 @@ def test_check_url(run):
     exception = subprocess.CalledProcessError(returncode=1, cmd=['curl'])
     run.side_effect = exception
     run.side_effect.stdout = b'500'
-    assert not check_url(url)
+    assert not check_url(url, env=env)
 
     # Return code 401, 405
     run.side_effect = exception
     run.side_effect.stdout = b' 401 '
-    assert check_url(url)
+    assert check_url(url, env=env)
     run.side_effect.stdout = b'405\n'
-    assert check_url(url)
+    assert check_url(url, env=env)
 
     # Error
     run.side_effect = FileNotFoundError()
     with pytest.raises(FileNotFoundError):
-        assert check_url(url)
+        assert check_url(url, env=env)
@@ -0,0 +1,100 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Test module for checking URLs without running cURL.
+"""
+
+import http.server
+import threading
+
+import pytest
+
+from plinth.modules.apache import prober
+
+
+class RequestHandler(http.server.BaseHTTPRequestHandler):
+    """Serve responses for testing URL checks."""
+
+    protocol_version = 'HTTP/1.1'
+    connections = 0
+
+    def setup(self):
+        """Count the connections made."""
+        super().setup()
+        RequestHandler.connections += 1
+
+    def do_GET(self):
+        """Respond to a GET request based on its path."""
+        headers = {}
+        body = b''
+        if self.path == '/ok':
+            status, body = 200, b'expected text'
+        elif self.path == '/redirect':
+            status = 302
+            headers = {'Location': '/cookie', 'Set-Cookie': 'test=1; Path=/'}
+        elif self.path == '/cookie':
+            status = 200 if self.headers.get('Cookie') == 'test=1' else 403
+        elif self.path == '/loop':
+            status, headers = 301, {'Location': '/loop'}
+        else:
+            status = int(self.path[1:])
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Don't log requests."""
+
+
+@pytest.fixture(name='url')
+def fixture_url():
+    """Start an HTTP server and return its URL."""
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), RequestHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_check_url(url):
+    """Test checking whether a URL is accessible."""
+    assert prober.check_url(url + '/ok')
+    assert prober.check_url(url + '/ok', kind='4')
+    assert not prober.check_url(url + '/ok', kind='6')
+    assert prober.check_url(url + '/ok', expected_output='expected')
+    assert not prober.check_url(url + '/ok', expected_output='unexpected')
+
+    # Redirects are followed with cookies that are set
+    assert prober.check_url(url + '/redirect')
+    assert not prober.check_url(url + '/cookie')
+    assert not prober.check_url(url + '/loop')
+
+    # Authorization failed is a success
+    assert prober.check_url(url + '/401')
+    assert prober.check_url(url + '/405')
+    assert not prober.check_url(url + '/404')
+    assert not prober.check_url(url + '/500')
+
+    assert not prober.check_url('ftp://127.0.0.1/')
+    assert not prober.check_url('http://127.0.0.1:1/')
+
+
+def test_connection_reuse(url):
+    """Test that connections to a server are reused."""
+    RequestHandler.connections = 0
+    prober._idle_connections.clear()
+    for _ in range(5):
+        assert prober.check_url(url + '/redirect')
+
+    assert RequestHandler.connections == 1
+
+
+def test_run_concurrently():
+    """Test running checks concurrently."""
+    assert prober.run_concurrently([lambda: 1, lambda: 2]) == [1, 2]
@@ -158,13 +158,7 @@ class BackupRestore(app.FollowerComponent):
             return
 
         from plinth import kvstore
-        data = {}
-        for key in self.settings:
-            try:
-                data[key] = kvstore.get(key)
-            except Exception:
-                pass
-
+        data = kvstore.get_many(self.settings)
         privileged.dump_settings(self.app_id, data)
 
     def _files_restore_pre(self):
@@ -182,5 +176,4 @@ class BackupRestore(app.FollowerComponent):
         data = privileged.load_settings(self.app_id)
 
         from plinth import kvstore
-        for key, value in data.items():
-            kvstore.set(key, value)
+        kvstore.set_many(data)
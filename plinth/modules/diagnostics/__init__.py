@@ -4,6 +4,7 @@ FreedomBox app for system diagnostics.
 """
 
 import collections
+import functools
 import json
 import logging
 import pathlib
@@ -17,7 +18,7 @@ from django.utils.translation import gettext_lazy as _
 from django.utils.translation import gettext_noop
 
 from plinth import app as app_module
-from plinth import cfg, glib, kvstore, menu
+from plinth import cfg, diagnostic_check, glib, kvstore, menu
 from plinth import operation as operation_module
 from plinth.daemon import RelatedDaemon, diagnose_port_listening
 from plinth.diagnostic_check import (CheckJSONDecoder, CheckJSONEncoder,
@@ -44,6 +45,12 @@ logger = logging.Logger(__name__)
 current_results: dict[str, Any] = {}
 results_lock = threading.Lock()
 
+# Maximum number of apps diagnosed at the same time
+max_parallel_apps = 4
+
+# Seconds after which an app still being diagnosed is reported as an error
+app_timeout = 600
+
 
 class DiagnosticsApp(app_module.App):
     """FreedomBox app for diagnostics."""
@@ -143,7 +150,7 @@ def _run_on_all_enabled_modules():
             apps.append((app.app_id, app))
             current_results['results'][app.app_id] = {'id': app.app_id}
 
-    for current_index, (app_id, app) in enumerate(apps):
+    def _diagnose_app(app_id, app):
         app_results = {
             'diagnosis': [],
             'exception': None,
@@ -162,10 +169,35 @@ def _run_on_all_enabled_modules():
                 app_results['show_repair'] = True
                 break
 
+        return app_results
+
+    finished_count = 0
+
+    def _on_app_done(index, future):
+        nonlocal finished_count
+        app_id = apps[index][0]
+        if future:
+            app_results = future.result()
+        else:
+            logger.error('Timeout running %s diagnostics', app_id)
+            app_results = {
+                'diagnosis': [],
+                'exception': f'Diagnostics did not finish within '
+                             f'{app_timeout} seconds',
+                'show_repair': False,
+            }
+
         with results_lock:
+            finished_count += 1
             current_results['results'][app_id].update(app_results)
             current_results['progress_percentage'] = \
-                int((current_index + 1) * 100 / len(apps))
+                int(finished_count * 100 / len(apps))
+
+    # Apps are diagnosed in parallel. Results are stored and progress is
+    # updated as each app finishes.
+    diagnostic_check.run_in_parallel(
+        [functools.partial(_diagnose_app, *app) for app in apps], app_timeout,
+        max_parallel_apps, _on_app_done)
 
 
 def _get_memory_info_from_cgroups():
@@ -279,12 +311,11 @@ def start_diagnostics():
     """Start full diagnostics as a background operation."""
     logger.info('Running full diagnostics')
     try:
-        operation_module.manager.new(op_id='diagnostics-full',
-                                     app_id='diagnostics',
-                                     name=gettext_noop('Running diagnostics'),
-                                     target=_run_diagnostics,
-                                     show_message=False,
-                                     show_notification=False)
+        operation_module.manager.new(
+            op_id='diagnostics-full', app_id='diagnostics',
+            name=gettext_noop('Running diagnostics'), target=_run_diagnostics,
+            show_message=False, show_notification=False,
+            resources=['app:diagnostics'])
     except KeyError:
         logger.warning('Diagnostics are already running')
 
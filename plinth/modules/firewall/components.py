@@ -22,6 +22,8 @@ _list_type: TypeAlias = list
 class Firewall(app.FollowerComponent):
     """Component to open/close firewall ports for an app."""
 
+    resources = ['firewall']
+
     _all_firewall_components: ClassVar[dict[str, 'Firewall']] = {}
 
     def __init__(self, component_id, name=None, ports=None, is_external=False):
@@ -186,6 +188,8 @@ class FirewallLocalProtection(app.FollowerComponent):
     and all other connections to these ports will be rejected.
     """
 
+    resources = ['firewall']
+
     def __init__(self, component_id: str, tcp_ports: list[str]):
         """Initialize the firewall component."""
         super().__init__(component_id)
@@ -71,10 +71,10 @@ def test_simple_help_pages(rf, view_name, view):
     assert _is_page(response)
 
 
-@patch('apt.Cache')
+@patch('plinth.package.get_cache')
 @patch('gzip.decompress')
 @patch('requests.get')
-def test_contribute_page(requests_get, decompress, apt_cache, rf):
+def test_contribute_page(requests_get, decompress, get_cache, rf):
     """Test the contribute page."""
     issues = [{
         'type': 'testing-autorm',
@@ -7,7 +7,6 @@ import mimetypes
 import os
 import pathlib
 
-import apt
 import requests
 from django.core.files.base import File
 from django.http import Http404, HttpResponse, HttpResponseRedirect
@@ -16,7 +15,7 @@ from django.urls import reverse
 from django.utils.translation import get_language_from_request
 from django.utils.translation import gettext as _
 
-from plinth import __version__, cfg, menu
+from plinth import __version__, cfg, menu, package
 from plinth.modules.upgrades import views as upgrades_views
 
 
@@ -40,34 +39,34 @@ def contribute(request):
     no_testing = []
     gift = []
     help_needed = []
-    cache = apt.Cache()
-    for issue in issues:
-        if issue['type'] == 'testing-autorm':
-            for package in issue['packages']:
+    with package.use_cache() as cache:
+        for issue in issues:
+            if issue['type'] == 'testing-autorm':
+                for package_name in issue['packages']:
+                    try:
+                        if cache[package_name].is_installed:
+                            testing_autorm.append(issue)
+                            break
+                    except KeyError:
+                        pass
+            elif issue['type'] == 'no-testing':
                 try:
-                    if cache[package].is_installed:
-                        testing_autorm.append(issue)
-                        break
+                    if cache[issue['package']].is_installed:
+                        no_testing.append(issue)
+                except KeyError:
+                    pass
+            elif issue['type'] == 'gift':
+                try:
+                    if cache[issue['package']].is_installed:
+                        gift.append(issue)
+                except KeyError:
+                    pass
+            elif issue['type'] == 'help':
+                try:
+                    if cache[issue['package']].is_installed:
+                        help_needed.append(issue)
                 except KeyError:
                     pass
-        elif issue['type'] == 'no-testing':
-            try:
-                if cache[issue['package']].is_installed:
-                    no_testing.append(issue)
-            except KeyError:
-                pass
-        elif issue['type'] == 'gift':
-            try:
-                if cache[issue['package']].is_installed:
-                    gift.append(issue)
-            except KeyError:
-                pass
-        elif issue['type'] == 'help':
-            try:
-                if cache[issue['package']].is_installed:
-                    help_needed.append(issue)
-            except KeyError:
-                pass
 
     return TemplateResponse(
         request, 'help_contribute.html', {
@@ -6,7 +6,7 @@ import pathlib
 import threading
 from typing import ClassVar
 
-from plinth import app
+from plinth import actions, app
 from plinth.modules.names.components import DomainName
 from plinth.privileged import service as service_privileged
 
@@ -174,11 +174,26 @@ class LetsEncrypt(app.FollowerComponent):
                 else:
                     self._copy_self_signed_certificates([domain])
 
-        for daemon in self.daemons:
-            if self.reload_daemons:
-                service_privileged.try_reload_or_restart(daemon)
-            else:
-                service_privileged.try_restart(daemon)
+        self._restart_daemons()
+
+    def _restart_daemons(self):
+        """Restart or reload all the daemons in a single privileged request.
+
+        All daemons are attempted even if one of them fails. The first failure
+        is then raised.
+        """
+        if self.reload_daemons:
+            method = service_privileged.try_reload_or_restart
+        else:
+            method = service_privileged.try_restart
+
+        with actions.Batch() as batch:
+            for daemon in self.daemons:
+                batch.call(method, daemon)
+
+        for result in batch.results:
+            if isinstance(result, Exception):
+                raise result
 
     def get_status(self):
         """Return the status of certificates for all interested domains.
@@ -222,11 +237,7 @@ class LetsEncrypt(app.FollowerComponent):
         if self.should_copy_certificates:
             self._copy_letsencrypt_certificates(interested_domains, lineage)
 
-        for daemon in self.daemons:
-            if self.reload_daemons:
-                service_privileged.try_reload_or_restart(daemon)
-            else:
-                service_privileged.try_restart(daemon)
+        self._restart_daemons()
 
     def on_certificate_renewed(self, domains, lineage):
         """Handle event when a certificate is renewed.
@@ -259,11 +270,7 @@ class LetsEncrypt(app.FollowerComponent):
         if self.should_copy_certificates:
             self._copy_self_signed_certificates(interested_domains)
 
-        for daemon in self.daemons:
-            if self.reload_daemons:
-                service_privileged.try_reload_or_restart(daemon)
-            else:
-                service_privileged.try_restart(daemon)
+        self._restart_daemons()
 
     def on_certificate_deleted(self, domains, lineage):
         """Handle event when a certificate is deleted.
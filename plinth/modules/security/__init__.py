@@ -10,13 +10,18 @@ from django.utils.translation import gettext_lazy as _
 from plinth import app as app_module
 from plinth import menu
 from plinth.config import DropinConfigs
-from plinth.daemon import Daemon, RelatedDaemon
+from plinth.daemon import Daemon, RelatedDaemon, get_units_state
 from plinth.modules.backups.components import BackupRestore
 from plinth.package import Packages
 from plinth.privileged import service as service_privileged
 
 from . import manifest, privileged
 
+_SANDBOX_PROPERTIES = [
+    'ProtectSystem', 'ProtectHome', 'PrivateTmp', 'PrivateDevices',
+    'PrivateNetwork', 'PrivateUsers', 'PrivateMounts'
+]
+
 
 class SecurityApp(app_module.App):
     """FreedomBox app for security."""
@@ -102,6 +107,7 @@ def get_apps_report():
             'vulns': 0,
         }
     }
+    app_services = {}
     for app_ in app_module.App.list():
         components = app_.get_components_of_type(Packages)
         packages = []
@@ -129,16 +135,25 @@ def get_apps_report():
 
         if services:
             apps[app_.app_id]['sandboxed'] = False
+            app_services[app_.app_id] = []
             for service in services:
                 # If an app lists a timer, work on the associated service
                 # instead
                 if service.rpartition('.')[-1] == 'timer':
                     service = service.rpartition('.')[0]
 
-                if _get_service_is_sandboxed(service):
-                    apps[app_.app_id]['sandboxed'] = True
-                    apps[app_.app_id][
-                        'sandbox_coverage'] = sandbox_coverage.get(service)
+                app_services[app_.app_id].append(service)
+
+    # Query the sandboxing properties of all the services at once
+    services_properties = get_units_state([
+        service for services in app_services.values() for service in services
+    ], _SANDBOX_PROPERTIES)
+    for app_id, services in app_services.items():
+        for service in services:
+            if _get_service_is_sandboxed(services_properties[service]):
+                apps[app_id]['sandboxed'] = True
+                apps[app_id]['sandbox_coverage'] = sandbox_coverage.get(
+                    service)
 
     for cve_packages in cves.values():
         for app_ in apps.values():
@@ -148,22 +163,8 @@ def get_apps_report():
     return apps
 
 
-def _get_service_is_sandboxed(service):
-    """Return whether service is sandboxed."""
-    lines = subprocess.check_output([
-        'systemctl',
-        'show',
-        service,
-        '--property=ProtectSystem',
-        '--property=ProtectHome',
-        '--property=PrivateTmp',
-        '--property=PrivateDevices',
-        '--property=PrivateNetwork',
-        '--property=PrivateUsers',
-        '--property=PrivateMounts',
-    ]).decode().strip().split('\n')
-    pairs = [line.partition('=')[::2] for line in lines]
-    properties = dict(pairs)
+def _get_service_is_sandboxed(properties: dict[str, str]) -> bool:
+    """Return whether service is sandboxed given its properties."""
     if properties.get('ProtectSystem') in ['yes', 'full', 'strict']:
         return True
 
@@ -53,7 +53,8 @@ class TorAppView(AppView):
                                      gettext_noop('Updating configuration'),
                                      _apply_changes,
                                      [form.initial, form.cleaned_data],
-                                     show_notification=False)
+                                     show_notification=False,
+                                     resources=self.app.get_resources())
         # Skip check for 'Settings unchanged' message by calling grandparent
         return super(FormView, self).form_valid(form)
 
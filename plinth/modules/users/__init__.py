@@ -3,6 +3,8 @@
 
 import grp
 import subprocess
+import threading
+import time
 
 import augeas
 from django.utils.text import format_lazy
@@ -22,6 +24,14 @@ from plinth.privileged import service as service_privileged
 from . import manifest, privileged
 from .components import UsersAndGroups
 
+# Seconds for which the groups of a user are remembered
+user_groups_timeout = 60
+
+# Username -> (time when retrieved, groups)
+_user_groups: dict[str, tuple[float, list[str]]] = {}
+_user_groups_generation = 0
+_user_groups_lock = threading.Lock()
+
 first_boot_steps = [
     {
         'id': 'users_firstboot',
@@ -203,6 +213,41 @@ def get_last_admin_user():
     return None
 
 
+def get_user_groups(username: str) -> list[str]:
+    """Return the groups of an LDAP user, remembered for a short while.
+
+    Groups of all the users are retrieved together with a single query.
+    """
+    now = time.monotonic()
+    with _user_groups_lock:
+        entry = _user_groups.get(username)
+        if entry and now - entry[0] < user_groups_timeout:
+            return list(entry[1])
+
+        generation = _user_groups_generation
+
+    all_user_groups = privileged.get_all_user_groups()
+    groups = all_user_groups.get(username, [])
+    with _user_groups_lock:
+        # Don't remember groups that may have changed while retrieving them
+        if generation == _user_groups_generation:
+            for name, user_groups in all_user_groups.items():
+                _user_groups[name] = (now, user_groups)
+
+            _user_groups[username] = (now, groups)
+
+    return list(groups)
+
+
+def invalidate_user_groups():
+    """Forget the remembered groups of all users."""
+    global _user_groups_generation
+
+    with _user_groups_lock:
+        _user_groups.clear()
+        _user_groups_generation += 1
+
+
 def _get_inactivated_users() -> list[str]:
     """Get list of inactivated usernames"""
     from django.contrib.auth.models import User
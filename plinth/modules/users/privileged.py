@@ -1,6 +1,8 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 """Configuration helper for the LDAP user directory."""
 
+import base64
+import functools
 import logging
 import os
 import pathlib
@@ -18,6 +20,24 @@ ACCESS_CONF = '/etc/security/access.conf'
 LDAPSCRIPTS_CONF = '/etc/ldapscripts/freedombox-ldapscripts.conf'
 
 
+def invalidates_user_groups(privileged_func):
+    """Decorator to forget remembered groups of users after changing them.
+
+    The groups are not forgotten when the method is called in a batch.
+    """
+
+    @functools.wraps(privileged_func)
+    def wrapper(*args, **kwargs):
+        """Run privileged method and forget the groups of all users."""
+        from plinth.modules.users import invalidate_user_groups
+        try:
+            return privileged_func(*args, **kwargs)
+        finally:
+            invalidate_user_groups()
+
+    return wrapper
+
+
 def _validate_user(username, password, must_be_admin=True):
     """Validate a user."""
     if must_be_admin:
@@ -359,6 +379,7 @@ def _get_user_home(username):
     return pathlib.Path(output.split(':')[5])
 
 
+@invalidates_user_groups
 @privileged
 def create_user(username: str, password: secret_str,
                 auth_user: str | None = None,
@@ -374,6 +395,7 @@ def create_user(username: str, password: secret_str,
     _set_samba_user(username, password)
 
 
+@invalidates_user_groups
 @privileged
 def remove_user(username: str, auth_user: str, auth_password: secret_str):
     """Remove an LDAP user."""
@@ -425,6 +447,7 @@ homeDirectory: {str(new_home)}
     _run(['ldapmodifyuser', new_username], input=input.encode())
 
 
+@invalidates_user_groups
 @privileged
 def rename_user(old_username: str, new_username: str):
     """Rename an LDAP user."""
@@ -489,60 +512,85 @@ def _get_admin_users():
 
     Raise an error if the slapd service is not running.
     """
-    admin_users = []
+    entries = _ldap_search('cn=admin,ou=groups,dc=thisbox', '(objectClass=*)',
+                           ['memberUid'], scope='base')
+    return sorted(user for entry in entries
+                  for user in entry.get('memberUid', []))
+
 
+def _ldap_search(base: str, search_filter: str, attributes: list[str],
+                 scope: str = 'sub') -> list[dict[str, list[str]]]:
+    """Return the entries found with a single search of the local directory.
+
+    Authenticate as the current user over the local socket. Each entry maps
+    attribute names to their list of values. Return an empty list if the base
+    does not exist.
+    """
     try:
-        output = action_utils.run([
+        process = action_utils.run([
             'ldapsearch', '-LLL', '-Q', '-Y', 'EXTERNAL', '-H', 'ldapi:///',
-            '-o', 'ldif-wrap=no', '-s', 'base', '-b',
-            'cn=admin,ou=groups,dc=thisbox', 'memberUid'
-        ], check=True).stdout.decode()
+            '-o', 'ldif-wrap=no', '-s', scope, '-b', base, search_filter
+        ] + attributes, check=True)
     except subprocess.CalledProcessError as error:
         if error.returncode == 32:
-            # no entries found
+            # no such object
             return []
         raise
 
-    for line in output.splitlines():
-        if line.startswith('memberUid: '):
-            user = line.split('memberUid: ', 1)[1].strip()
-            admin_users.append(user)
+    return _parse_ldif(process.stdout.decode())
 
-    return admin_users
 
+def _parse_ldif(output: str) -> list[dict[str, list[str]]]:
+    """Parse entries from the LDIF output of ldapsearch."""
+    entries = []
+    for block in output.split('\n\n'):
+        # Join lines that are continued with a leading space
+        block = block.replace('\n ', '')
+        entry: dict[str, list[str]] = {}
+        for line in block.splitlines():
+            if not line or line.startswith('#') or ':' not in line:
+                continue
 
-def _get_user_ids(username: str) -> str | None:
-    """Get user information in format like `id` command."""
-    try:
-        process = _run(['ldapid', username])
-    except subprocess.CalledProcessError as error:
-        if error.returncode == 1:
-            # User doesn't exist
-            return None
+            attribute, value = line.split(':', 1)
+            if value.startswith(':'):
+                value = base64.b64decode(value[1:].strip()).decode()
+            else:
+                value = value.strip()
 
-        raise
+            entry.setdefault(attribute, []).append(value)
+
+        if entry:
+            entries.append(entry)
+
+    return entries
 
-    return process.stdout.decode().strip()
+
+def _match_filter(object_class: str, attribute: str, value: str) -> str:
+    """Return a search filter for entries having an attribute value."""
+    value = re.sub(r'[\\*()\x00]', lambda match: f'\\{ord(match[0]):02x}',
+                   value)
+    return f'(&(objectClass={object_class})({attribute}={value}))'
 
 
 def _user_exists(username):
     """Return whether the user exists."""
-    return _get_user_ids(username) is not None
+    entries = _ldap_search('ou=users,dc=thisbox',
+                           _match_filter('posixAccount', 'uid', username),
+                           ['1.1'])
+    return bool(entries)
 
 
 def _get_group_users(groupname):
     """Return list of members in the group."""
     try:
-        process = _run(['ldapgid', '-P', groupname])
+        entries = _ldap_search('ou=groups,dc=thisbox',
+                               _match_filter('posixGroup', 'cn', groupname),
+                               ['memberUid'])
     except subprocess.CalledProcessError:
-        return []  # Group does not exist
-
-    output = process.stdout.decode()
-    # extract users from output, example: 'admin:*:10001:user1,user2'
-    users = output.rsplit(':')[-1].strip().split(',')
-    if users == ['']:
         return []
-    return users
+
+    return sorted(user for entry in entries
+                  for user in entry.get('memberUid', []))
 
 
 def _get_user_groups(username):
@@ -550,24 +598,41 @@ def _get_user_groups(username):
 
     Exclude the 'users' primary group from the returned list.
     """
-    output = _get_user_ids(username)
-    if output:
-        groups_part = output.split(' ')[2]
-        try:
-            groups = groups_part.split('=')[1]
-        except IndexError:
-            logging.warning('Could not read groups for user %s: \n%s',
-                            username, output)
-            return []
+    if not _user_exists(username):
+        logging.warning('User %s not found in LDAP', username)
+        return []
+
+    entries = _ldap_search('ou=groups,dc=thisbox',
+                           _match_filter('posixGroup', 'memberUid', username),
+                           ['cn'])
+    return sorted(group for entry in entries for group in entry.get('cn', [])
+                  if group != 'users')
 
-        group_names = [
-            user.strip('()') for user in re.findall(r'\(.*?\)', groups)
-        ]
-        group_names.remove('users')
-        return group_names
 
-    logging.warning('User %s not found in LDAP', username)
-    return []
+def _get_all_user_groups() -> dict[str, list[str]]:
+    """Return the supplementary groups of all users using a single search.
+
+    Groups of each user are sorted as the order of search results may vary.
+    """
+    entries = _ldap_search(
+        'dc=thisbox', '(|(objectClass=posixAccount)(objectClass=posixGroup))',
+        ['objectClass', 'uid', 'cn', 'memberUid'])
+    users: dict[str, list[str]] = {}
+    for entry in entries:
+        if 'posixAccount' in entry.get('objectClass', []):
+            for username in entry.get('uid', []):
+                users.setdefault(username, [])
+
+    for entry in entries:
+        if 'posixGroup' not in entry.get('objectClass', []):
+            continue
+
+        for group in entry.get('cn', []):
+            for username in entry.get('memberUid', []):
+                if username in users and group != 'users':
+                    users[username].append(group)
+
+    return {username: sorted(groups) for username, groups in users.items()}
 
 
 @privileged
@@ -576,10 +641,18 @@ def get_user_groups(username: str) -> list[str]:
     return _get_user_groups(username)
 
 
+@privileged
+def get_all_user_groups() -> dict[str, list[str]]:
+    """Return the groups of all the users."""
+    return _get_all_user_groups()
+
+
 def _group_exists(groupname):
     """Return whether a group already exits."""
-    process = _run(['ldapgid', groupname], check=False)
-    return process.returncode == 0
+    entries = _ldap_search('ou=groups,dc=thisbox',
+                           _match_filter('posixGroup', 'cn', groupname),
+                           ['1.1'])
+    return bool(entries)
 
 
 def _create_group(groupname):
@@ -595,6 +668,7 @@ def create_group(groupname: str):
     _flush_cache()
 
 
+@invalidates_user_groups
 @privileged
 def rename_group(old_groupname: str, new_groupname: str):
     """Rename an LDAP group.
@@ -609,6 +683,7 @@ def rename_group(old_groupname: str, new_groupname: str):
         _flush_cache()
 
 
+@invalidates_user_groups
 @privileged
 def remove_group(groupname: str):
     """Remove an LDAP group."""
@@ -626,6 +701,7 @@ def _add_user_to_group(username, groupname):
     _run(['ldapaddusertogroup', username, groupname])
 
 
+@invalidates_user_groups
 @privileged
 def add_user_to_group(username: str, groupname: str,
                       auth_user: str | None = None,
@@ -643,6 +719,7 @@ def _remove_user_from_group(username, groupname):
     _run(['ldapdeleteuserfromgroup', username, groupname])
 
 
+@invalidates_user_groups
 @privileged
 def remove_user_from_group(username: str, groupname: str, auth_user: str,
                            auth_password: secret_str):
@@ -662,6 +739,7 @@ def get_group_users(group_name: str) -> list[str]:
     return _get_group_users(group_name)
 
 
+@invalidates_user_groups
 @privileged
 def set_user_status(username: str, status: str, auth_user: str,
                     auth_password: secret_str):
@@ -393,8 +393,9 @@ def test_user_group_interactions():
     _cleanup_groups.add(group3)
 
     # The expected groups got created and the user is part of them.
-    expected_groups = [group1, group2, group3]
+    expected_groups = sorted([group1, group2, group3])
     assert expected_groups == privileged.get_user_groups(user1)
+    assert expected_groups == privileged.get_all_user_groups()[user1]
 
     # Remove user from group
     group_to_remove_from = random.choice(expected_groups)
@@ -4,14 +4,17 @@
 import copy
 import logging
 
+from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.db.models import Q
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
 from django.template.exceptions import TemplateDoesNotExist
 from django.template.response import SimpleTemplateResponse
 from django.utils import timezone
 from django.utils.translation import gettext
 
-from plinth import cfg
+from plinth import cache, cfg
 from plinth.utils import SafeFormatter
 
 from . import db, models
@@ -178,7 +181,21 @@ class Notification(models.StoredNotification):
         """
         self.dismissed = should_dismiss
         with db.lock:
-            super().save()
+            self.save()
+
+    def save(self, *args, **kwargs):
+        """Store the notification and stop using cached display context."""
+        try:
+            super().save(*args, **kwargs)
+        finally:
+            _invalidate_cache()
+
+    def delete(self, *args, **kwargs):
+        """Remove the notification and stop using cached display context."""
+        try:
+            return super().delete(*args, **kwargs)
+        finally:
+            _invalidate_cache()
 
     def clean(self):
         """Perform additional validations on the model."""
@@ -338,7 +355,26 @@ class Notification(models.StoredNotification):
 
     @staticmethod
     def get_display_context(request, user):
-        """Return a list of notifications meant for display to a user."""
+        """Return a list of notifications meant for display to a user.
+
+        Translated notifications are cached for each user and language until
+        a notification changes. Body templates are rendered for each request
+        as they may depend on it.
+        """
+        parts = ['user', user.get_username()] if user else ['all']
+        context = cache.get_or_set(
+            'notifications', parts,
+            lambda: Notification._get_display_context(user))
+        for note_context in context['notifications']:
+            body_template = note_context.pop('body_template')
+            note_context['body'] = Notification._render(
+                request, body_template, note_context)
+
+        return context
+
+    @staticmethod
+    def _get_display_context(user):
+        """Return the notifications for a user without rendered bodies."""
         notifications = Notification.list(user=user)
         max_severity = max(notifications, default=None,
                            key=lambda note: note.severity_value)
@@ -366,10 +402,19 @@ class Notification(models.StoredNotification):
                 'user': note.user,
                 'group': note.group,
                 'dismissed': note.dismissed,
+                'body_template': note.body_template,
             }
-            body = Notification._render(request, note.body_template,
-                                        note_context)
-            note_context['body'] = body
             notes.append(note_context)
 
         return {'notifications': notes, 'max_severity': max_severity}
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def _on_user_groups_changed(sender, **kwargs):
+    """Stop using cached notifications when group membership changes."""
+    _invalidate_cache()
+
+
+def _invalidate_cache():
+    """Stop using the cached display context of all users."""
+    cache.invalidate('notifications')
@@ -28,13 +28,21 @@ class Operation:
                  args: list | None = None, kwargs: dict | None = None,
                  show_message: bool = True, show_notification: bool = False,
                  thread_data: dict | None = None,
-                 on_complete: Callable | None = None):
-        """Initialize to no operation."""
+                 on_complete: Callable | None = None,
+                 resources: list[str] | None = None):
+        """Initialize to no operation.
+
+        'resources' is the list of shared resources, such as 'apt' or
+        'app:<app_id>', modified by the operation. Operations not sharing any
+        resources may run at the same time. None means that the operation may
+        modify anything and must run alone.
+        """
         self.op_id = op_id
         self.app_id = app_id
         self.name = name
         self.show_message = show_message
         self.show_notification = show_notification
+        self.resources = set(resources) if resources is not None else None
 
         self.target = target
         self.args = args or []
@@ -58,6 +66,13 @@ class Operation:
         """Return a string representation of the operation."""
         return f'Operation: {self.app_id}: {self.name}'
 
+    def conflicts_with(self, other: 'Operation') -> bool:
+        """Return whether the two operations can't run at the same time."""
+        if self.resources is None or other.resources is None:
+            return True
+
+        return bool(self.resources & other.resources)
+
     def _catch_thread_errors(self):
         """Collect exceptions when running in a thread."""
         self._update_notification()
@@ -180,7 +195,6 @@ class OperationsManager:
     def __init__(self) -> None:
         """Initialize the object."""
         self._operations: OrderedDict[str, Operation] = OrderedDict()
-        self._current_operation: Operation | None = None
 
         # Assume that operations manager will be called from various threads
         # including the callback called from the threads it creates. Ensure
@@ -213,7 +227,6 @@ class OperationsManager:
         """Trigger next operation. Called from within previous thread."""
         logger.debug('%s: on_complete called', operation)
         with self._lock:
-            self._current_operation = None
             if not operation.show_message:
                 # No need to keep it lingering for later collection
                 del self._operations[operation.op_id]
@@ -221,17 +234,35 @@ class OperationsManager:
             self._schedule_next()
 
     def _schedule_next(self) -> None:
-        """Schedule the next available operation."""
-        with self._lock:
-            if self._current_operation:
-                return
+        """Schedule all the waiting operations that can run now.
 
+        An operation starts when it does not conflict with any of the running
+        operations or with operations waiting ahead of it. Operations using a
+        resource therefore run in the order in which they were added.
+        """
+        with self._lock:
+            ahead = [
+                operation for operation in self._operations.values()
+                if operation.state == Operation.State.RUNNING
+            ]
             for operation in self._operations.values():
-                if operation.state == Operation.State.WAITING:
+                if operation.state != Operation.State.WAITING:
+                    continue
+
+                if not any(operation.conflicts_with(other) for other in ahead):
                     logger.debug('%s: scheduling', operation)
-                    self._current_operation = operation
                     operation.run()
-                    break
+
+                ahead.append(operation)
+
+    @property
+    def running_operations(self) -> list[Operation]:
+        """Return the list of operations currently running."""
+        with self._lock:
+            return [
+                operation for operation in self._operations.values()
+                if operation.state == Operation.State.RUNNING
+            ]
 
     def filter(self, app_id: str) -> list[Operation]:
         """Return operations matching a pattern."""
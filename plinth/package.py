@@ -1,13 +1,15 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 """Framework for installing and updating distribution packages."""
 
+import contextlib
 import enum
 import logging
+import os
 import pathlib
+import threading
 import time
 
 import apt
-import apt.cache
 from django.utils.translation import gettext as _
 from django.utils.translation import gettext_lazy, gettext_noop
 
@@ -24,6 +26,61 @@ from .errors import PackageNotInstalledError
 
 logger = logging.getLogger(__name__)
 
+# Files whose modification means that the apt cache snapshot is outdated
+cache_files = ['/var/cache/apt/pkgcache.bin', '/var/lib/dpkg/status']
+
+_cache: apt.Cache | None = None
+_cache_state: tuple | None = None
+# apt.Cache is not thread-safe. Held while the cache is being read.
+_cache_lock = threading.RLock()
+
+
+def get_cache() -> apt.Cache:
+    """Return a snapshot of apt cache shared by the whole process.
+
+    The snapshot is opened again if package lists or the list of installed
+    packages have changed since it was opened. It must only be read from and
+    only within use_cache().
+    """
+    global _cache, _cache_state
+
+    state = _get_cache_files_state()
+    with _cache_lock:
+        if _cache is None or state != _cache_state:
+            logger.debug('Opening apt cache')
+            _cache = apt.Cache()
+            _cache_state = state
+
+        return _cache
+
+
+@contextlib.contextmanager
+def use_cache():
+    """Yield the shared snapshot of apt cache while no other thread uses it."""
+    with _cache_lock:
+        yield get_cache()
+
+
+def invalidate_cache():
+    """Open apt cache again when it is next needed."""
+    global _cache, _cache_state
+
+    with _cache_lock:
+        _cache = None
+        _cache_state = None
+
+
+def _get_cache_files_state() -> tuple:
+    """Return the modification times of files underlying apt cache."""
+    state = []
+    for cache_file in cache_files:
+        try:
+            state.append(os.stat(cache_file).st_mtime_ns)
+        except OSError:
+            state.append(None)
+
+    return tuple(state)
+
 
 class PackageExpression:
 
@@ -68,13 +125,13 @@ class Package(PackageExpression):
         return [self.name]
 
     def actual(self) -> str:
-        cache = apt.Cache()
-        if self.name in cache and cache[self.name].candidate:
-            # cache[package].candidate returns installation candidate. If the
-            # package is not installable due to the available versions being of
-            # priority less than 0, then .candidate will be None. TODO: Also
-            # return version and suite to install from.
-            return self.name
+        with use_cache() as cache:
+            if self.name in cache and cache[self.name].candidate:
+                # cache[package].candidate returns installation candidate. If
+                # the package is not installable due to the available versions
+                # being of priority less than 0, then .candidate will be None.
+                # TODO: Also return version and suite to install from.
+                return self.name
 
         raise MissingPackageError(self.name)
 
@@ -113,6 +170,8 @@ class Packages(app_module.FollowerComponent):
         IGNORE = 'ignore'  # Proceed as if there are no conflicts
         REMOVE = 'remove'  # Remove the packages before installing the app
 
+    resources = ['apt']
+
     def __init__(self, component_id: str,
                  packages: list[str | PackageExpression],
                  skip_recommends: bool = False,
@@ -210,7 +269,6 @@ class Packages(app_module.FollowerComponent):
     def diagnose(self) -> list[DiagnosticCheck]:
         """Run diagnostics and return results."""
         results = super().diagnose()
-        cache = apt.Cache()
         for package_expression in self.package_expressions:
             try:
                 package_name = package_expression.actual()
@@ -228,12 +286,13 @@ class Packages(app_module.FollowerComponent):
 
             result = Result.WARNING
             latest_version = '?'
-            if package_name in cache:
-                package = cache[package_name]
-                if package.candidate:
-                    latest_version = package.candidate.version
-                    if package.candidate.is_installed:
-                        result = Result.PASSED
+            with use_cache() as cache:
+                if package_name in cache:
+                    package = cache[package_name]
+                    if package.candidate:
+                        latest_version = package.candidate.version
+                        if package.candidate.is_installed:
+                            result = Result.PASSED
 
             check_id = f'package-latest-{package_name}'
             description = gettext_noop('Package {package_name} is the latest '
@@ -326,27 +385,27 @@ class Packages(app_module.FollowerComponent):
 
         # Get list of all the dependencies of packages to keep.
         keep_packages_with_deps: set[str] = set()
-        cache = apt.Cache()
-        while keep_packages:
-            package_name = keep_packages.pop()
-            if package_name in keep_packages_with_deps:
-                continue  # Already processed
+        with use_cache() as cache:
+            while keep_packages:
+                package_name = keep_packages.pop()
+                if package_name in keep_packages_with_deps:
+                    continue  # Already processed
 
-            keep_packages_with_deps.add(package_name)
-            if package_name not in cache:
-                continue  # Package is not available in sources
+                keep_packages_with_deps.add(package_name)
+                if package_name not in cache:
+                    continue  # Package is not available in sources
 
-            if not cache[package_name].is_installed:
-                continue  # Package is not installed
+                if not cache[package_name].is_installed:
+                    continue  # Package is not installed
 
-            version = cache[package_name].installed
-            if not version:
-                continue
+                version = cache[package_name].installed
+                if not version:
+                    continue
 
-            dependencies = version.dependencies + version.recommends
-            for dependency in dependencies:
-                for or_dependency in dependency.or_dependencies:
-                    keep_packages.add(or_dependency.name)
+                dependencies = version.dependencies + version.recommends
+                for dependency in dependencies:
+                    for or_dependency in dependency.or_dependencies:
+                        keep_packages.add(or_dependency.name)
 
         # Filter out any packages that are to be kept or their dependencies.
         packages_set -= keep_packages_with_deps
@@ -477,28 +536,36 @@ def install(package_names, skip_recommends=False, force_configuration=None,
 
     if not operation.thread_data.get('allow_install', True):
         # Raise error if packages are not already installed.
-        cache = apt.Cache()
-        for package_name in package_names:
-            if not cache[package_name].is_installed:
-                raise PackageNotInstalledError(package_name)
+        with use_cache() as cache:
+            for package_name in package_names:
+                if not cache[package_name].is_installed:
+                    raise PackageNotInstalledError(package_name)
 
         return
 
-    start_time = time.time()
-    while is_package_manager_busy():
-        if time.time() - start_time >= 24 * 3600:  # One day
-            raise PackageException(_('Timeout waiting for package manager'))
-
-        time.sleep(3)  # seconds
+    # Packages may have been installed along with packages of other apps.
+    installed_packages = operation.thread_data.get('installed_packages', {})
+    if (set(package_names) <= installed_packages.get(skip_recommends, set())
+            and not (force_configuration or reinstall
+                     or force_missing_configuration)):
+        logger.info('Packages already installed for app - %s, packages - %s',
+                    operation.app_id, package_names)
+        mark_known(package_names)
+        return
 
+    _wait_for_package_manager()
     logger.info('Running install for app - %s, packages - %s',
                 operation.app_id, package_names)
 
     from . import package
     transaction = package.Transaction(operation.app_id, package_names)
     operation.thread_data['transaction'] = transaction
-    transaction.install(skip_recommends, force_configuration, reinstall,
-                        force_missing_configuration)
+    try:
+        transaction.install(skip_recommends, force_configuration, reinstall,
+                            force_missing_configuration)
+    finally:
+        invalidate_cache()
+
     mark_known(package_names)
 
 
@@ -510,23 +577,53 @@ def uninstall(package_names, purge):
         raise RuntimeError(
             'uninstall() must be called from within an operation.')
 
-    start_time = time.time()
-    while is_package_manager_busy():
-        if time.time() - start_time >= 24 * 3600:  # One day
-            raise PackageException(_('Timeout waiting for package manager'))
-
-        time.sleep(3)  # seconds
-
+    _wait_for_package_manager()
     logger.info('Running uninstall for app - %s, packages - %s',
                 operation.app_id, package_names)
 
     from . import package
     transaction = package.Transaction(operation.app_id, package_names)
     operation.thread_data['transaction'] = transaction
-    transaction.uninstall(purge)
+    try:
+        transaction.uninstall(purge)
+    finally:
+        invalidate_cache()
+
     unmark_known(package_names)
 
 
+def install_for_apps(app_packages: dict[str, list[str]],
+                     skip_recommends: bool = False):
+    """Install packages of multiple apps in a single transaction.
+
+    Package lists are not refreshed. 'app_packages' maps app IDs to the
+    packages to install for them.
+    """
+    package_names = sorted(set().union(*app_packages.values()))
+    _wait_for_package_manager()
+    logger.info('Running install for apps - %s, packages - %s',
+                list(app_packages), package_names)
+    try:
+        privileged.install_for_apps(app_packages, skip_recommends)
+    except Exception as exception:
+        logger.exception('Error installing packages: %s', exception)
+        raise
+    finally:
+        invalidate_cache()
+
+    mark_known(package_names)
+
+
+def _wait_for_package_manager():
+    """Wait until other package manager processes have finished."""
+    start_time = time.time()
+    while is_package_manager_busy():
+        if time.time() - start_time >= 24 * 3600:  # One day
+            raise PackageException(_('Timeout waiting for package manager'))
+
+        time.sleep(3)  # seconds
+
+
 def is_package_manager_busy():
     """Return whether a package manager is running."""
     try:
@@ -538,7 +635,10 @@ def is_package_manager_busy():
 def refresh_package_lists():
     """To be run in case apt package lists are outdated."""
     transaction = Transaction(None, None)
-    transaction.refresh_package_lists()
+    try:
+        transaction.refresh_package_lists()
+    finally:
+        invalidate_cache()
 
 
 def filter_conffile_prompt_packages(packages):
@@ -556,15 +656,15 @@ def packages_installed(candidates: list | tuple) -> list:
     :param candidates: A list of package names.
     :return: A list of installed Debian package names.
     """
-    cache = apt.cache.Cache()
     installed_packages = []
-    for package_name in candidates:
-        try:
-            package = cache[package_name]
-            if package.is_installed:
-                installed_packages.append(package_name)
-        except KeyError:
-            pass
+    with use_cache() as cache:
+        for package_name in candidates:
+            try:
+                package = cache[package_name]
+                if package.is_installed:
+                    installed_packages.append(package_name)
+            except KeyError:
+                pass
 
     return installed_packages
 
@@ -583,22 +683,23 @@ def get_known() -> dict[str, dict]:
 def mark_known(packages: list[str]):
     """Mark a given list of packages as known."""
     packages_known = get_known()
-    cache = apt.Cache()
-    for package_ in packages:
-        try:
-            cache_package = cache[package_]
-        except KeyError:
-            logger.warn('Package %s is not found when marking known', package_)
-            continue
+    with use_cache() as cache:
+        for package_ in packages:
+            try:
+                cache_package = cache[package_]
+            except KeyError:
+                logger.warn('Package %s is not found when marking known',
+                            package_)
+                continue
 
-        if not cache_package.installed:
-            logger.warn('Package %s is not installed when marking known',
-                        package_)
-            continue
+            if not cache_package.installed:
+                logger.warn('Package %s is not installed when marking known',
+                            package_)
+                continue
 
-        installed_version = cache_package.installed.version
-        package_known = packages_known.setdefault(package_, {})
-        package_known['version'] = installed_version
+            installed_version = cache_package.installed.version
+            package_known = packages_known.setdefault(package_, {})
+            package_known['version'] = installed_version
 
     kvstore.set('packages_known', packages_known)
 
@@ -0,0 +1,11 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""Report on the privileged daemon itself."""
+
+from plinth.actions import privileged
+
+
+@privileged
+def get_daemon_metrics() -> dict[str, int | float]:
+    """Return queueing statistics of the privileged daemon's worker pool."""
+    from plinth import privileged_daemon
+    return privileged_daemon.get_metrics()
@@ -60,6 +60,32 @@ def install(app_id: str, packages: list[str], skip_recommends: bool = False,
     if force_missing_configuration:
         extra_arguments += ['-o', 'Dpkg::Options::=--force-confmiss']
 
+    _install(packages, extra_arguments)
+
+
+@privileged
+def install_for_apps(apps: dict[str, list[str]],
+                     skip_recommends: bool = False):
+    """Install packages of multiple apps in a single apt-get transaction."""
+    packages: set[str] = set()
+    for app_id, app_packages in apps.items():
+        try:
+            _assert_managed_packages(app_id, app_packages)
+        except Exception:
+            raise PermissionError(
+                f'Packages are not managed by {app_id}: {app_packages}')
+
+        packages.update(app_packages)
+
+    extra_arguments = []
+    if skip_recommends:
+        extra_arguments.append('--no-install-recommends')
+
+    _install(sorted(packages), extra_arguments)
+
+
+def _install(packages: list[str], extra_arguments: list[str]):
+    """Run apt-get to install packages."""
     run(['dpkg', '--configure', '-a'], check=False)
     with action_utils.apt_hold_freedombox():
         run_apt_command(['--fix-broken', 'install'])
@@ -2,12 +2,15 @@
 """The main method for a daemon that runs privileged methods."""
 
 import argparse
+import collections
+import concurrent.futures
 import io
 import json
 import logging
 import os
 import pathlib
 import pwd
+import select
 import signal
 import socket
 import socketserver
@@ -36,23 +39,215 @@ idle_shutdown_time: int | None = 5 * 60  # 5 minutes
 
 freedombox_develop = False
 
+# Import the privileged module of an app only when a request for it is
+# received. Initialize all apps only if a privileged method looks them up.
+load_apps_lazily = True
+
 EXIT_SYNTAX = 10
 EXIT_PERM = 20
 
+# Maximum number of privileged calls running at the same time.
+max_workers = 8
+
+# Maximum number of calls waiting for a worker. When the queue is full, no
+# more requests are read from clients until there is space in the queue.
+max_queued_requests = 64
+
+# Maximum number of requests for a single concurrency group running at the
+# same time, unless the group has a limit in concurrency_limits.
+default_group_limit = 4
+
+# Concurrency group of a module ('module') or of one of its actions
+# ('module.action'). Actions of modules not listed here are grouped by module.
+concurrency_groups = {
+    'plinth.install': 'apt',
+    'plinth.install_for_apps': 'apt',
+    'plinth.remove': 'apt',
+    'plinth.update': 'apt',
+    'upgrades.activate_backports': 'apt',
+    'upgrades.activate_unstable': 'apt',
+    'upgrades.dist_upgrade': 'apt',
+    'upgrades.release_held_packages': 'apt',
+    'upgrades.run': 'apt',
+}
+
+# Maximum number of running requests for a concurrency group.
+concurrency_limits = {
+    'apt': 1,
+}
+
+_worker_pool: 'WorkerPool | None' = None
+
+
+class WorkerPool:
+    """Run privileged calls on a bounded number of threads.
+
+    Calls are queued in the order they are submitted. A call is started when a
+    worker is free and fewer than the allowed number of calls from its
+    concurrency group are running. Calls of other groups may overtake a call
+    waiting on its group, but order is preserved within a group. If the queue
+    is full, submit() blocks unless it is called by a worker, for example to
+    continue a batch of calls, as that could block all the workers.
+    """
+
+    def __init__(self):
+        """Initialize the pool. Workers are started on demand."""
+        self._condition = threading.Condition()
+        self._queue: collections.deque = collections.deque()
+        self._running: collections.Counter = collections.Counter()
+        self._workers = 0
+        self._idle_workers = 0
+        self._requests = 0
+        self._max_queue_depth = 0
+        self._total_wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._local = threading.local()
+
+    @staticmethod
+    def get_group(request: dict) -> str:
+        """Return the concurrency group of a call."""
+        module_name = request['module']
+        action_name = request['action']
+        return concurrency_groups.get(
+            f'{module_name}.{action_name}',
+            concurrency_groups.get(module_name, module_name))
+
+    def submit(self, request: dict) -> concurrent.futures.Future:
+        """Queue a call and return a future for its result."""
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        group = self.get_group(request)
+        with self._condition:
+            while len(self._queue) >= max_queued_requests and \
+                    not getattr(self._local, 'is_worker', False):
+                self._condition.wait()
+
+            self._queue.append((group, request, future, time.monotonic()))
+            self._requests += 1
+            self._max_queue_depth = max(self._max_queue_depth,
+                                        len(self._queue))
+            # Idle workers may be waiting for their group to have a free slot
+            # or may not have woken up yet to pick queued calls. Start a new
+            # worker unless there is an idle worker for each queued call.
+            if len(self._queue) > self._idle_workers and \
+               self._workers < max_workers:
+                self._workers += 1
+                threading.Thread(target=self._work, daemon=True).start()
+
+            self._condition.notify_all()
+
+        return future
+
+    def get_metrics(self) -> dict[str, int | float]:
+        """Return statistics about queueing of calls."""
+        with self._condition:
+            requests = self._requests
+            return {
+                'queue_depth':
+                    len(self._queue),
+                'max_queue_depth':
+                    self._max_queue_depth,
+                'running':
+                    sum(self._running.values()),
+                'workers':
+                    self._workers,
+                'requests':
+                    requests,
+                'average_wait_time':
+                    self._total_wait_time / requests if requests else 0.0,
+                'max_wait_time':
+                    self._max_wait_time,
+            }
+
+    def _pop_next(self) -> tuple | None:
+        """Remove and return the first call allowed to run now."""
+        for index, job in enumerate(self._queue):
+            group = job[0]
+            limit = concurrency_limits.get(group, default_group_limit)
+            if self._running[group] < limit:
+                del self._queue[index]
+                return job
+
+        return None
+
+    def _work(self):
+        """Run queued calls forever."""
+        self._local.is_worker = True
+        while True:
+            with self._condition:
+                job = self._pop_next()
+                while not job:
+                    self._idle_workers += 1
+                    self._condition.wait()
+                    self._idle_workers -= 1
+                    job = self._pop_next()
+
+                group, request, future, queued_time = job
+                self._running[group] += 1
+                wait_time = time.monotonic() - queued_time
+                self._total_wait_time += wait_time
+                self._max_wait_time = max(self._max_wait_time, wait_time)
+                self._condition.notify_all()  # Queue has space now
+
+            try:
+                future.set_result(actions.privileged_run_request(request))
+            except Exception as exception:
+                future.set_exception(exception)
+            finally:
+                with self._condition:
+                    self._running[group] -= 1
+                    self._condition.notify_all()
+
+
+def get_metrics() -> dict[str, int | float]:
+    """Return statistics about the worker pool of the running daemon."""
+    if not _worker_pool:
+        return {}
+
+    return _worker_pool.get_metrics()
+
+
+def _submit(request: dict) -> concurrent.futures.Future:
+    """Run a call on the worker pool if there is one, otherwise right away."""
+    if _worker_pool:
+        return _worker_pool.submit(request)
+
+    future: concurrent.futures.Future = concurrent.futures.Future()
+    future.set_result(actions.privileged_run_request(request))
+    return future
+
 
 class RequestHandler(socketserver.StreamRequestHandler):
     """Handle a single streaming request.
 
     It is instantiated once per connection to the server. The overridden
     handle() method implements communication with the newly connected client.
+
+    A connection either carries a single request terminated by EOF or, if it
+    starts with actions.MULTIPLEX_MAGIC, any number of length-prefixed request
+    frames that are served concurrently.
     """
 
-    def _read_request(self) -> str:
+    # Read directly from the socket so that select() on it is reliable.
+    rbufsize = 0
+
+    def _read_request(self, prefix: bytes) -> str:
         """Return a single request read from the client."""
-        request_data = self.rfile.read(MAX_REQUEST_LENGTH + 1)
+        request_data = bytearray(prefix)
+        while len(request_data) <= MAX_REQUEST_LENGTH:
+            chunk = self.rfile.read(MAX_REQUEST_LENGTH + 1 - len(request_data))
+            if not chunk:
+                break
+
+            request_data += chunk
+
         if len(request_data) > MAX_REQUEST_LENGTH:
             raise ValueError('Request too large')
 
+        return self._decode_request(request_data)
+
+    @staticmethod
+    def _decode_request(request_data: bytes | bytearray) -> str:
+        """Return the request as string after checking its encoding."""
         try:
             request = request_data.decode('utf-8')
         except UnicodeError:
@@ -70,9 +265,16 @@ class RequestHandler(socketserver.StreamRequestHandler):
 
     def handle(self) -> None:
         """Handle a new connection from a client."""
+        prefix = actions.recv_exactly(self.request,
+                                      len(actions.MULTIPLEX_MAGIC))
+        if prefix == actions.MULTIPLEX_MAGIC:
+            self._handle_multiplexed()
+            return
+
         try:
-            request = self._read_request()
-            response_string = actions.privileged_handle_json_request(request)
+            request = self._read_request(prefix)
+            response_string = actions.privileged_handle_json_request(
+                request, submit=_submit)
         except Exception as exception:
             logger.exception('Error running privileged request: %s', exception)
             response = actions.get_return_value_from_exception(exception)
@@ -80,6 +282,83 @@ class RequestHandler(socketserver.StreamRequestHandler):
 
         self._write_response(response_string)
 
+    def _handle_multiplexed(self) -> None:
+        """Serve framed requests on a long-lived connection.
+
+        Calls in each request are handed over to the worker pool and the
+        response is written back as soon as it is ready, tagged with the ID of
+        the request. No thread waits for a request to finish. The connection
+        is closed when the client closes it or when it has been idle for
+        actions.MULTIPLEX_IDLE_TIMEOUT seconds with no requests in flight.
+        """
+        write_lock = threading.Lock()
+        in_flight_condition = threading.Condition()
+        in_flight = 0
+
+        def _respond(request_id: int, response: concurrent.futures.Future):
+            nonlocal in_flight
+            try:
+                response_string = response.result()
+                with write_lock:
+                    actions.write_frame(self.request, request_id,
+                                        response_string.encode('utf-8'))
+            except OSError as exception:
+                logger.warning('Unable to send response, client gone: %s',
+                               exception)
+            finally:
+                with in_flight_condition:
+                    in_flight -= 1
+                    in_flight_condition.notify_all()
+
+        def _submit_request(request_id: int, request_data: bytes):
+            nonlocal in_flight
+            with in_flight_condition:
+                # Stop reading from a client that has too many requests in
+                # flight.
+                while in_flight >= max_queued_requests:
+                    in_flight_condition.wait()
+
+                in_flight += 1
+
+            try:
+                request = self._decode_request(request_data)
+                response = actions.privileged_submit_json_request(
+                    request, submit=_submit)
+            except Exception as exception:
+                logger.exception('Error running privileged request: %s',
+                                 exception)
+                response_value = actions.get_return_value_from_exception(
+                    exception)
+                response = concurrent.futures.Future()
+                response.set_result(json.dumps(response_value))
+
+            response.add_done_callback(
+                lambda response: _respond(request_id, response))
+
+        try:
+            while True:
+                readable, _, _ = select.select([self.request], [], [],
+                                               actions.MULTIPLEX_IDLE_TIMEOUT)
+                if not readable:
+                    with in_flight_condition:
+                        if in_flight:
+                            continue
+
+                    break  # Idle, client will reconnect when needed.
+
+                frame = actions.read_frame(self.request, MAX_REQUEST_LENGTH)
+                if not frame:
+                    break
+
+                self.server.last_request_time = time.time()
+                _submit_request(*frame)
+        except (OSError, ValueError) as exception:
+            logger.warning('Closing multiplexed connection: %s', exception)
+        finally:
+            with in_flight_condition:
+                while in_flight:
+                    in_flight_condition.wait()
+
 
 class Server(socketserver.ThreadingUnixStreamServer):
     """Server to handle privileged request.
@@ -220,6 +499,9 @@ def client_main() -> None:
                         help='Do not read arguments from stdin')
     args = parser.parse_args()
 
+    # A single call is made, pooled connections have no benefit.
+    actions.use_connection_pool = False
+
     try:
         try:
             arguments: dict = {'args': [], 'kwargs': {}}
@@ -267,6 +549,12 @@ def _shutdown_server() -> None:
     logger.info('Shutdown complete, some requests may be running.')
 
 
+def _load_apps() -> None:
+    """Import all the app modules and initialize the apps."""
+    module_loader.load_modules()
+    app_module.apps_init()
+
+
 def main() -> None:
     """Start the server, listen on socket, and serve forever."""
     global freedombox_develop, idle_shutdown_time
@@ -287,8 +575,13 @@ def main() -> None:
 
     signal.signal(signal.SIGTERM, _on_sigterm)
 
-    module_loader.load_modules()
-    app_module.apps_init()
+    if load_apps_lazily:
+        app_module.set_apps_loader(_load_apps)
+    else:
+        _load_apps()
+
+    global _worker_pool
+    _worker_pool = WorkerPool()
 
     with Server(str(address), RequestHandler) as server:
         global _server
@@ -301,7 +594,9 @@ def main() -> None:
         try:
             server.serve_forever()
         except TimeoutError:
-            logger.info('FreedomBox privileged daemon exiting on idle.')
+            logger.info(
+                'FreedomBox privileged daemon exiting on idle, '
+                'requests: %s', _worker_pool.get_metrics())
         except Exception as exception:
             logger.exception(
                 'FreedomBox privileged daemon exiting on error - %s',
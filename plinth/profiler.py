@@ -0,0 +1,98 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Record time and memory used by each phase of startup.
+
+Recording is enabled with the --profile-startup command line option. Work
+such as importing a module or running post initialization of an app is
+recorded separately for each module or app. Memory is measured for the whole
+process, so work done meanwhile in other threads is also counted.
+"""
+
+import atexit
+import contextlib
+import json
+import logging
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+_report_path: str | None = None
+_start_time = 0.0
+_records: list[dict] = []
+_records_lock = threading.Lock()
+_write_lock = threading.Lock()
+
+
+def start(report_path: str):
+    """Start recording and write the report to a file at exit."""
+    global _report_path, _start_time
+
+    _report_path = report_path
+    _start_time = time.perf_counter()
+    tracemalloc.start()
+    atexit.register(write_report)
+
+
+def is_enabled() -> bool:
+    """Return whether startup phases are being recorded."""
+    return _report_path is not None
+
+
+@contextlib.contextmanager
+def record(phase: str, name: str | None = None):
+    """Record wall time and memory allocated while running a block."""
+    if not is_enabled():
+        yield
+        return
+
+    memory = tracemalloc.get_traced_memory()[0]
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        entry = {
+            'phase': phase,
+            'name': name,
+            'seconds': time.perf_counter() - start_time,
+            'memory': tracemalloc.get_traced_memory()[0] - memory
+        }
+        with _records_lock:
+            _records.append(entry)
+
+
+def get_report() -> dict:
+    """Return the records and their totals for each phase."""
+    with _records_lock:
+        records = list(_records)
+
+    phases: dict[str, dict] = {}
+    for entry in records:
+        totals = phases.setdefault(entry['phase'], {
+            'seconds': 0.0,
+            'memory': 0
+        })
+        totals['seconds'] += entry['seconds']
+        totals['memory'] += entry['memory']
+
+    return {
+        'seconds': time.perf_counter() - _start_time,
+        'peak_memory': tracemalloc.get_traced_memory()[1],
+        'phases': phases,
+        'records': records
+    }
+
+
+def write_report():
+    """Write the records so far into the report file."""
+    if not _report_path:
+        return
+
+    report = get_report()
+    with _write_lock:
+        with open(_report_path, 'w', encoding='utf-8') as file_handle:
+            json.dump(report, file_handle, indent=2)
+
+    logger.info('Startup profile written to %s after %.2f seconds',
+                _report_path, report['seconds'])
@@ -68,7 +68,11 @@ AXES_VERBOSE = False
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'plinth',
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000
+        }
     }
 }
 
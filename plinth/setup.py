@@ -10,7 +10,6 @@ import time
 from collections import defaultdict
 from typing import Union
 
-import apt
 from django.utils.translation import gettext_noop
 
 import plinth
@@ -32,8 +31,14 @@ _is_shutting_down = False
 thread_local_storage = threading.local()
 
 
-def run_setup_on_app(app_id, allow_install=True, rerun=False):
-    """Execute the setup process in a thread."""
+def run_setup_on_app(app_id, allow_install=True, rerun=False,
+                     installed_packages=None):
+    """Execute the setup process in a thread.
+
+    installed_packages maps a value of skip_recommends to the set of packages
+    that have just been installed with that option. Installing these packages
+    again is skipped during setup.
+    """
     # App is already up-to-date
     app = app_module.App.get(app_id)
     current_version = app.get_setup_version()
@@ -48,11 +53,15 @@ def run_setup_on_app(app_id, allow_install=True, rerun=False):
     logger.debug('Creating operation to setup app: %s', app_id)
     show_notification = show_message = (current_version
                                         or not app.info.is_essential)
+    thread_data = {
+        'allow_install': allow_install,
+        'installed_packages': installed_packages or {}
+    }
     return operation_module.manager.new(
         f'{app_id}-setup', app_id, name, _run_setup_on_app,
         [app, current_version], show_message=show_message,
-        show_notification=show_notification,
-        thread_data={'allow_install': allow_install})
+        show_notification=show_notification, thread_data=thread_data,
+        resources=app.get_resources())
 
 
 def _run_setup_on_app(app, current_version, repair: bool = False):
@@ -114,7 +123,8 @@ def run_repair_on_app(app_id, create_operation=True):
                                             gettext_noop('Repairing app'),
                                             _run_repair_on_app, [app],
                                             show_message=True,
-                                            show_notification=True)
+                                            show_notification=True,
+                                            resources=app.get_resources())
 
     # Re-use existing operation.
     try:
@@ -203,7 +213,8 @@ def run_uninstall_on_app(app_id):
     return operation_module.manager.new(f'{app_id}-uninstall', app_id,
                                         gettext_noop('Uninstalling app'),
                                         _run_uninstall_on_app, [app],
-                                        show_notification=True)
+                                        show_notification=True,
+                                        resources=app.get_resources())
 
 
 def _run_uninstall_on_app(app):
@@ -245,6 +256,7 @@ def setup_apps(app_ids=None, essential=False, allow_install=True):
     logger.info(
         'Running setup for apps, essential - %s, '
         'selected apps - %s', essential, app_ids)
+    apps = []
     for app in app_module.App.list():
         if essential and not app.info.is_essential:
             continue
@@ -252,11 +264,82 @@ def setup_apps(app_ids=None, essential=False, allow_install=True):
         if app_ids and app.app_id not in app_ids:
             continue
 
-        operation = run_setup_on_app(app.app_id, allow_install=allow_install)
+        apps.append(app)
+
+    installed_packages = None
+    if allow_install:
+        installed_packages = _install_packages_for_apps(apps)
+
+    # Apps are listed in the order of their dependencies
+    for app in apps:
+        operation = run_setup_on_app(app.app_id, allow_install=allow_install,
+                                     installed_packages=installed_packages)
         if operation:
             operation.join()
 
 
+def _install_packages_for_apps(apps) -> dict[bool, set[str]]:
+    """Install the packages of all apps that are not yet installed at once.
+
+    Return the packages installed for each value of skip_recommends. Apps
+    install their packages separately if this fails.
+    """
+    app_packages: dict[bool, dict[str, list[str]]] = {False: {}, True: {}}
+    for app in apps:
+        if app.get_setup_version():
+            # Updates may need to handle configuration file prompts first
+            continue
+
+        for component in app.get_components_of_type(Packages):
+            if (component.find_conflicts() and component.conflicts_action
+                    not in (None, Packages.ConflictsAction.IGNORE)):
+                continue  # Conflicting packages are removed during setup
+
+            try:
+                packages = component.get_actual_packages()
+            except MissingPackageError:
+                continue  # Reported during setup
+
+            app_packages[component.skip_recommends].setdefault(
+                app.app_id, []).extend(packages)
+
+    app_ids = [
+        app.app_id for app in apps if app.app_id in app_packages[False]
+        or app.app_id in app_packages[True]
+    ]
+    if len(app_ids) < 2:
+        return {}
+
+    # Attach the operation to the first app being installed, in the order of
+    # dependencies, so that it is shown and looked up like its setup.
+    try:
+        operation = operation_module.manager.new(
+            f'{app_ids[0]}-setup-packages', app_ids[0],
+            gettext_noop('Installing packages'), _install_packages,
+            [app_packages], show_message=False, show_notification=False,
+            resources=['apt'])
+        return operation.join()
+    except Exception as exception:
+        logger.warning('Unable to install packages of apps together: %s',
+                       exception)
+        return {}
+
+
+def _install_packages(app_packages: dict) -> dict[bool, set[str]]:
+    """Refresh package lists once and install packages of many apps."""
+    package.refresh_package_lists()
+    for skip_recommends, packages in app_packages.items():
+        if packages:
+            package.install_for_apps(packages, skip_recommends)
+
+    # Packages installed with recommends are good for apps skipping them
+    with_recommends = set().union(*app_packages[False].values())
+    return {
+        False: with_recommends,
+        True: with_recommends.union(*app_packages[True].values())
+    }
+
+
 def list_dependencies(app_ids=None, essential=False):
     """Print list of packages required by selected or essential apps."""
     for app in app_module.App.list():
@@ -592,16 +675,16 @@ class ForceUpgrader():
                                                  app.app_id, name,
                                                  app.force_upgrade, [packages],
                                                  show_message=False,
-                                                 show_notification=False)
+                                                 show_notification=False,
+                                                 resources=app.get_resources())
         return operation.join()  # Wait for completion, raise Exception
 
     def _get_list_of_apps_to_force_upgrade(self):
         """Return a list of app on which to run force upgrade."""
-        packages = self._get_list_of_upgradable_packages()
-        if not packages:  # No packages to upgrade
+        package_names = self._get_list_of_upgradable_packages()
+        if not package_names:  # No packages to upgrade
             return {}
 
-        package_names = [package.name for package in packages]
         logger.info('Packages available for upgrade: %s',
                     ', '.join(package_names))
 
@@ -624,9 +707,12 @@ class ForceUpgrader():
 
     @staticmethod
     def _get_list_of_upgradable_packages():
-        """Return list of packages that can be upgraded."""
-        cache = apt.cache.Cache()
-        return [package for package in cache if package.is_upgradable]
+        """Return names of packages that can be upgraded."""
+        with package.use_cache() as cache:
+            return [
+                cache_package.name for cache_package in cache
+                if cache_package.is_upgradable
+            ]
 
     @staticmethod
     def _filter_managed_packages(packages):
@@ -663,6 +749,7 @@ class ForceUpgrader():
 
 def on_package_cache_updated():
     """Called by D-Bus service when apt package cache is updated."""
+    package.invalidate_cache()
     force_upgrader = ForceUpgrader.get_instance()
     force_upgrader.on_package_cache_updated()
 
@@ -820,24 +907,26 @@ class DpkgHandler:
                                packages: list[str]) -> bool:
         """Return whether an app needs an rerun."""
         packages_known = package.get_known()
-        cache = apt.Cache()
         for package_ in packages:
-            try:
-                cache_package = cache[package_]
-            except KeyError:
-                logger.warning('For installed app %s, package %s is not known',
-                               app.app_id, package_)
-                return False
-
-            if not cache_package.installed:
-                # App is installed but one of the needed packages is not
-                # installed. Don't know what to do. Don't rerun.
-                logger.warning(
-                    'For installed app %s, package %s is not installed',
-                    app.app_id, package_)
-                return False
-
-            installed_version = cache_package.installed.version
+            with package.use_cache() as cache:
+                try:
+                    cache_package = cache[package_]
+                except KeyError:
+                    logger.warning(
+                        'For installed app %s, package %s is not known',
+                        app.app_id, package_)
+                    return False
+
+                if not cache_package.installed:
+                    # App is installed but one of the needed packages is not
+                    # installed. Don't know what to do. Don't rerun.
+                    logger.warning(
+                        'For installed app %s, package %s is not installed',
+                        app.app_id, package_)
+                    return False
+
+                installed_version = cache_package.installed.version
+
             package_known = packages_known.get(package_, {})
             version_known = package_known.get('version')
             if installed_version != version_known:
@@ -857,6 +946,7 @@ class DpkgHandler:
 
 def on_dpkg_invoked():
     """Called by D-Bus service when dpkg has been invoked."""
+    package.invalidate_cache()
     dpkg_handler = DpkgHandler.get_instance()
     dpkg_handler.on_dpkg_invoked()
 
@@ -3,25 +3,84 @@
 Django signals emitted within FreedomBox.
 """
 
+import contextlib
+import threading
+
 from django.dispatch import Signal
 
+_deferred = threading.local()
+
+
+class DeferrableSignal(Signal):
+    """A signal that is only recorded when sent within defer()."""
+
+    def send(self, sender, **named):
+        """Send the signal to receivers or record it if deferred."""
+        if not _record(self, 'send', sender, named):
+            return super().send(sender, **named)
+
+        return []
+
+    def send_robust(self, sender, **named):
+        """Send the signal to receivers or record it if deferred."""
+        if not _record(self, 'send_robust', sender, named):
+            return super().send_robust(sender, **named)
+
+        return []
+
+
+def _record(signal: Signal, method: str, sender, named: dict) -> bool:
+    """Record a signal if signals are deferred in current thread."""
+    deferred = getattr(_deferred, 'signals', None)
+    if deferred is None:
+        return False
+
+    deferred.append((signal, method, sender, named))
+    return True
+
+
+@contextlib.contextmanager
+def defer():
+    """Record signals sent by the current thread instead of sending them.
+
+    Yield the list of recorded signals which may later be sent using
+    send_deferred().
+    """
+    _deferred.signals = []
+    try:
+        yield _deferred.signals
+    finally:
+        _deferred.signals = None
+
+
+def send_deferred(signals: list[tuple[Signal, str, object, dict]]):
+    """Send signals recorded earlier to their current receivers.
+
+    Signals are sent with the same method as they were originally sent with.
+    So, exceptions raised by receivers of signals sent with send() are raised
+    again.
+    """
+    for signal, method, sender, named in signals:
+        getattr(signal, method)(sender, **named)
+
+
 # Arguments: -
-pre_module_loading = Signal()
+pre_module_loading = DeferrableSignal()
 
 # Arguments: -
-post_app_loading = Signal()
+post_app_loading = DeferrableSignal()
 
 # Arguments: module_name
-post_setup = Signal()
+post_setup = DeferrableSignal()
 
 # Arguments: old_hostname, new_hostname
-pre_hostname_change = Signal()
+pre_hostname_change = DeferrableSignal()
 
 # Arguments: old_hostname, new_hostname
-post_hostname_change = Signal()
+post_hostname_change = DeferrableSignal()
 
 # Arguments: domain_type, name, description, services
-domain_added = Signal()
+domain_added = DeferrableSignal()
 
 # Arguments: domain_type, name
-domain_removed = Signal()
+domain_removed = DeferrableSignal()
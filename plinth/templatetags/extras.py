@@ -1,16 +1,28 @@
 # SPDX-License-Identifier: AGPL-3.0-or-later
 
+import collections
 import os
+import pathlib
+import threading
 from urllib.parse import urlparse
 
 from django import template
 from django.utils.safestring import mark_safe
 
+from plinth import cfg
 from plinth import clients as clients_module
 from plinth import utils, web_server
 
 register = template.Library()
 
+# Maximum number of icons kept in memory
+icon_cache_size = 256
+
+# Resolved path -> (modification time, icon text without XML header)
+_icon_cache: collections.OrderedDict[pathlib.Path, tuple[float, str]] = \
+    collections.OrderedDict()
+_icon_cache_lock = threading.Lock()
+
 
 def mark_active_menuitem(menu, path):
     """Mark the best-matching menu item with 'active'
@@ -115,15 +127,43 @@ def icon(url: str, *args, **kwargs):
 
     path = web_server.resolve_static_path(url)
     try:
-        icon_text = path.read_text()
+        icon_text = _read_icon(path)
     except FileNotFoundError:
         raise ValueError(f'Icon {url} not found.')
     else:
-        # Skip the line with <?xml> header.
-        if icon_text and icon_text.startswith('<?xml'):
-            icon_lines = icon_text.splitlines()
-            icon_text = '\n'.join(icon_lines[1:])
-
         icon_text = add_attributes(icon_text)
 
     return mark_safe(icon_text)
+
+
+def _read_icon(path: pathlib.Path) -> str:
+    """Return the text of an icon file, remembering recently used icons.
+
+    Icon files don't change unless in development mode. Only then, check if
+    the file has been modified since it was read.
+    """
+    with _icon_cache_lock:
+        entry = _icon_cache.get(path)
+        if entry:
+            _icon_cache.move_to_end(path)
+
+    if entry and not cfg.develop:
+        return entry[1]
+
+    modified_time = path.stat().st_mtime
+    if entry and entry[0] == modified_time:
+        return entry[1]
+
+    icon_text = path.read_text()
+    # Skip the line with <?xml> header.
+    if icon_text and icon_text.startswith('<?xml'):
+        icon_lines = icon_text.splitlines()
+        icon_text = '\n'.join(icon_lines[1:])
+
+    with _icon_cache_lock:
+        _icon_cache[path] = (modified_time, icon_text)
+        _icon_cache.move_to_end(path)
+        while len(_icon_cache) > icon_cache_size:
+            _icon_cache.popitem(last=False)
+
+    return icon_text
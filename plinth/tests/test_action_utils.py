@@ -16,7 +16,8 @@ from plinth.action_utils import (get_addresses, get_hostname,
                                  run_as_user, service_action, service_disable,
                                  service_enable, service_is_enabled,
                                  service_is_running, service_reload,
-                                 service_restart, service_start, service_stop,
+                                 service_restart, service_show_many,
+                                 service_start, service_stop,
                                  service_try_reload_or_restart,
                                  service_try_restart, service_unmask, umask)
 
@@ -174,6 +175,33 @@ def test_service_try_reload_or_restart(mock):
     ]
 
 
+@patch('subprocess.run')
+def test_service_show_many(subprocess_run):
+    """Test getting properties of many services at once."""
+    subprocess_run.return_value.stdout = (
+        b'LoadState=loaded\nActiveState=active\n\n'
+        b'LoadState=not-found\nActiveState=inactive\n')
+    properties = ['LoadState', 'ActiveState']
+    assert service_show_many(['a', 'b', 'c'], properties) == {
+        'a': {
+            'LoadState': 'loaded',
+            'ActiveState': 'active'
+        },
+        'b': {
+            'LoadState': 'not-found',
+            'ActiveState': 'inactive'
+        },
+        'c': {
+            'LoadState': '',
+            'ActiveState': ''
+        },
+    }
+    assert subprocess_run.call_args.args[0] == [
+        'systemctl', 'show', '--all', '--property=LoadState',
+        '--property=ActiveState', 'a', 'b', 'c'
+    ]
+
+
 @pytest.mark.usefixtures('needs_root')
 @systemd_installed
 def test_service_unmask():
@@ -7,7 +7,12 @@ description of the expectations.
 
 """
 
+import functools
+import json
 import os
+import socket
+import threading
+import time
 import typing
 from unittest.mock import Mock, call, patch
 
@@ -100,6 +105,7 @@ def test_privileged_argument_annotation_check():
     privileged(func2_valid)
 
 
+@patch('plinth.actions.use_connection_pool', False)
 @patch('plinth.actions._read_from_server')
 @patch('plinth.actions._request_to_server')
 @patch('plinth.actions._get_privileged_action_module_name')
@@ -129,6 +135,7 @@ def test_privileged_method_call(get_module_name, request_to_server,
     ]
 
 
+@patch('plinth.actions.use_connection_pool', False)
 @patch('plinth.actions._read_from_server')
 @patch('plinth.actions._request_to_server')
 @patch('plinth.actions._get_privileged_action_module_name')
@@ -156,6 +163,314 @@ def test_privileged_method_exceptions(get_module_name, request_to_server,
         wrapped_func()
 
 
+@pytest.fixture(name='multiplex_server')
+def fixture_multiplex_server(tmp_path):
+    """Run a server speaking the multiplexed protocol on a temporary socket.
+
+    Each request is answered after sleeping for args[0] seconds with args[1]
+    as the return value. So, responses may be sent out of order.
+    """
+    path = str(tmp_path / 'privileged.socket')
+    server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server_socket.bind(path)
+    server_socket.listen()
+    connections = []
+
+    def _respond(connection, write_lock, request_id, payload):
+        request = json.loads(payload)
+        time.sleep(request['args'][0])
+        response = {'result': 'success', 'return': request['args'][1]}
+        with write_lock:
+            actions.write_frame(connection, request_id,
+                                json.dumps(response).encode())
+
+    def _serve_connection(connection):
+        write_lock = threading.Lock()
+        magic = actions.recv_exactly(connection, len(actions.MULTIPLEX_MAGIC))
+        assert magic == actions.MULTIPLEX_MAGIC
+        try:
+            while frame := actions.read_frame(connection):
+                threading.Thread(target=_respond, args=(connection, write_lock,
+                                                        *frame)).start()
+        except OSError:
+            pass
+
+    def _serve():
+        while True:
+            try:
+                connection, _ = server_socket.accept()
+            except OSError:
+                break
+
+            connections.append(connection)
+            threading.Thread(target=_serve_connection, args=(connection, ),
+                             daemon=True).start()
+
+    threading.Thread(target=_serve, daemon=True).start()
+    pool = actions._ConnectionPool()
+    with patch('plinth.actions.socket_path', path), \
+            patch('plinth.actions._connection_pool', pool):
+        yield connections
+
+    pool.close()
+    server_socket.close()
+
+
+def test_multiplexed_calls(multiplex_server):
+    """Test that concurrent calls share pooled connections."""
+    results = {}
+
+    def _call(index):
+        delay = 0.1 if index % 2 else 0
+        results[index] = actions.run_privileged_method(None, 'tests', 'func',
+                                                       [delay, index], {})
+
+    threads = [
+        threading.Thread(target=_call, args=(index, )) for index in range(20)
+    ]
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert results == {index: index for index in range(20)}
+    assert 1 <= len(multiplex_server) <= actions.connection_pool_size
+
+    # Connections are reused by later calls
+    connections = len(multiplex_server)
+    assert actions.run_privileged_method(None, 'tests', 'func', [0, 'x'],
+                                         {}) == 'x'
+    assert len(multiplex_server) == connections
+
+
+def test_multiplexed_reconnect(multiplex_server):
+    """Test that a new connection is made if server closes the old one."""
+    assert actions.run_privileged_method(None, 'tests', 'func', [0, 1],
+                                         {}) == 1
+    for connection in multiplex_server:
+        connection.shutdown(socket.SHUT_RDWR)
+        connection.close()
+
+    time.sleep(0.1)
+    assert actions.run_privileged_method(None, 'tests', 'func', [0, 2],
+                                         {}) == 2
+    assert len(multiplex_server) == 2
+
+
+def test_frames():
+    """Test reading and writing frames on a socket."""
+    socket1, socket2 = socket.socketpair()
+    actions.write_frame(socket1, 7, b'foo')
+    actions.write_frame(socket1, 2**40, b'')
+    assert actions.read_frame(socket2) == (7, b'foo')
+    assert actions.read_frame(socket2) == (2**40, b'')
+
+    actions.write_frame(socket1, 1, b'x' * 11)
+    with pytest.raises(ValueError, match='Request too large'):
+        actions.read_frame(socket2, max_length=10)
+
+    socket1.sendall(b'\x00\x00')
+    socket1.close()
+    with pytest.raises(ConnectionError):
+        actions.read_frame(socket2)
+
+    socket2.close()
+
+
+def test_batch_skip_privileged_call():
+    """Test that batched calls to mocked privileged methods run directly."""
+
+    def func(value: int):
+        if value < 0:
+            raise ValueError('negative')
+
+        return value * 2
+
+    wrapped_func = privileged(func)
+    func._skip_privileged_call = True
+    with actions.Batch() as batch:
+        future1 = batch.call(wrapped_func, 2)
+        future2 = batch.call(wrapped_func, -1)
+
+    assert future1.result() == 4
+    with pytest.raises(ValueError, match='negative'):
+        future2.result()
+
+    assert batch.results[0] == 4
+    assert isinstance(batch.results[1], ValueError)
+
+    with pytest.raises(SyntaxError):
+        batch.call(lambda: None)
+
+    with pytest.raises(TypeError):
+        batch.call(wrapped_func, 1, _raw_output=True)
+
+
+def test_batch_skips_outer_decorators():
+    """Test that decorators on top of privileged methods don't run in batch."""
+    calls = []
+
+    def decorator(privileged_func):
+
+        @functools.wraps(privileged_func)
+        def wrapper(*args, **kwargs):
+            calls.append('wrapper')
+            return privileged_func(*args, **kwargs)
+
+        return wrapper
+
+    def func(value: int):
+        calls.append('func')
+        return value
+
+    wrapped_func = decorator(privileged(func))
+    func._skip_privileged_call = True
+    assert wrapped_func(1) == 1
+    assert calls == ['wrapper', 'func']
+
+    calls.clear()
+    with actions.Batch() as batch:
+        future = batch.call(wrapped_func, 2)
+
+    assert future.result() == 2
+    assert calls == ['func']
+
+
+@patch('plinth.actions._run_batch_on_server')
+@patch('plinth.actions._get_privileged_action_module_name')
+def test_batch_server_error(get_module_name, run_batch_on_server):
+    """Test that futures are resolved when sending the batch fails."""
+    get_module_name.return_value = 'test-module'
+    run_batch_on_server.side_effect = ConnectionError('server gone')
+
+    def func(value: int):
+        return value
+
+    wrapped_func = privileged(func)
+    with pytest.raises(ConnectionError, match='server gone'):
+        with actions.Batch() as batch:
+            future1 = batch.call(wrapped_func, 1)
+            future2 = batch.call(wrapped_func, 2)
+
+    for future in (future1, future2):
+        with pytest.raises(ConnectionError, match='server gone'):
+            future.result(timeout=0)
+
+
+@pytest.mark.parametrize('parallel', [False, True])
+@patch('plinth.actions._privileged_call')
+def test_privileged_batch_call(privileged_call, parallel):
+    """Test that the server runs each call in a batch independently."""
+
+    def _privileged_call(module_name, action_name, arguments, log_error):
+        if action_name == 'fail':
+            raise SyntaxError('Specified action not found')
+
+        return {'result': 'success', 'return': arguments['args']}
+
+    privileged_call.side_effect = _privileged_call
+    request = {'module': 'test-module', 'args': [], 'kwargs': {}}
+    requests = [
+        dict(request, action='func', args=[1]),
+        dict(request, action='fail'),
+        dict(request, action='func', args=[3])
+    ]
+    response = actions.privileged_handle_json_request(
+        json.dumps({
+            'batch': requests,
+            'parallel': parallel
+        }))
+    response = json.loads(response)
+    assert response['result'] == 'batch'
+    assert response['return'][0] == {'result': 'success', 'return': [1]}
+    assert response['return'][1]['result'] == 'exception'
+    assert response['return'][1]['exception']['name'] == 'SyntaxError'
+    assert response['return'][2] == {'result': 'success', 'return': [3]}
+
+    # Raw output is not allowed in a batch
+    response = actions.privileged_handle_json_request(
+        json.dumps({'batch': [dict(request, action='func', raw_output=True)]}))
+    response = json.loads(response)
+    assert response['result'] == 'exception'
+    assert response['exception']['name'] == 'TypeError'
+
+
+def test_read_from_server():
+    """Test reading a complete response from the server."""
+    socket1, socket2 = socket.socketpair()
+    socket1.close()
+    with pytest.raises(ConnectionError):
+        actions._read_from_server(socket2)
+
+    socket1, socket2 = socket.socketpair()
+    response = {'result': 'success', 'return': 'x' * 300_000}
+    thread = threading.Thread(target=_send_and_close,
+                              args=(socket1, json.dumps(response).encode()))
+    thread.start()
+    assert actions._read_from_server(socket2) == response
+    thread.join()
+    socket2.close()
+
+
+def test_clear_thread_storage():
+    """Test that output is not collected after a call is finished."""
+    actions._setup_thread_storage()
+    actions._clear_thread_storage()
+    assert not hasattr(actions.thread_storage, 'stdout')
+    assert not hasattr(actions.thread_storage, 'stderr')
+
+
+def _send_and_close(sock, data):
+    """Send all the data on a socket and close it."""
+    sock.sendall(data)
+    sock.close()
+
+
+def _send_frame_and_close(sock, data):
+    """Send data as a single frame on a socket and close it."""
+    actions.write_frame(sock, 1, data)
+    sock.close()
+
+
+def _read_frame_response(sock):
+    """Read a single frame from a socket and return the decoded response."""
+    _, payload = actions.read_frame(sock)
+    return json.loads(payload)
+
+
+def _get_read_throughput(send, read, size):
+    """Return the best throughput of reading a response of given size."""
+    response = {'result': 'success', 'return': 'x' * size}
+    data = json.dumps(response).encode()
+    durations = []
+    for _ in range(3):
+        socket1, socket2 = socket.socketpair()
+        thread = threading.Thread(target=send, args=(socket1, data))
+        start_time = time.perf_counter()
+        thread.start()
+        assert read(socket2) == response
+        durations.append(time.perf_counter() - start_time)
+        thread.join()
+        socket2.close()
+
+    return size / min(durations)
+
+
+@pytest.mark.heavy
+@pytest.mark.parametrize('send, read', [
+    (_send_and_close, actions._read_from_server),
+    (_send_frame_and_close, _read_frame_response),
+])
+def test_read_from_server_throughput(send, read):
+    """Test that reading responses takes time linear in their size."""
+    small_throughput = _get_read_throughput(send, read, 1_000_000)
+    large_throughput = _get_read_throughput(send, read, 50_000_000)
+    # Quadratic copying would be about 50 times slower for the large size.
+    # Allow for the small response fitting in CPU caches.
+    assert large_throughput > small_throughput / 8
+
+
 @patch('importlib.import_module')
 @patch('plinth.module_loader.get_module_import_path')
 @patch('os.getuid')
@@ -4,14 +4,18 @@ Test module for App, base class for all applications.
 """
 
 import collections
+import threading
+import time
 from unittest.mock import Mock, call, patch
 
 import pytest
 
+from plinth import app as app_module
 from plinth import log
 from plinth.app import (App, Component, EnableState, FollowerComponent, Info,
                         LeaderComponent, apps_init)
 from plinth.diagnostic_check import DiagnosticCheck, Result
+from plinth.signals import DeferrableSignal
 
 # pylint: disable=protected-access
 
@@ -91,6 +95,25 @@ def test_app_list():
     assert list(App.list()) == [app]
 
 
+def test_app_lazy_loader():
+    """Test that apps are loaded lazily when first looked up."""
+    calls = []
+
+    def _loader():
+        calls.append(True)
+        AppTest()
+        # Lookups during loading don't recurse
+        assert list(App.list()) == [App.get('test-app')]
+        AppSetupTest()
+
+    app_module.set_apps_loader(_loader)
+    assert not calls
+    assert App.get('test-app-setup').app_id == 'test-app-setup'
+    assert len(calls) == 1
+    assert len(App.list()) == 2
+    assert len(calls) == 1
+
+
 def test_app_add():
     """Test adding a components to an App."""
     app = AppTest()
@@ -139,6 +162,20 @@ def test_get_components_of_type(app_with_components):
     assert list(components) == leader_components
 
 
+def test_get_resources(app_with_components):
+    """Test retrieving the resources modified by operations on an app."""
+    app = app_with_components
+    assert app.get_resources() == ['app:test-app']
+
+    component = FollowerComponent('test-follower-3')
+    component.resources = ['resource2', 'resource1']
+    app.add(component)
+    component = FollowerComponent('test-follower-4')
+    component.resources = ['resource1']
+    app.add(component)
+    assert app.get_resources() == ['app:test-app', 'resource1', 'resource2']
+
+
 def test_app_is_available(app_with_components):
     """Test checking if an app is available for setup."""
     for component in app_with_components.components.values():
@@ -208,6 +245,28 @@ def test_get_set_setup_version():
     assert app.get_setup_version() == 5
 
 
+@pytest.mark.django_db
+def test_get_setup_version_without_queries(django_assert_num_queries):
+    """Test that setup versions are not read from database every time."""
+    app = AppSetupTest()
+    app.set_setup_version(2)
+    other_app = AppTest()
+    with django_assert_num_queries(0):
+        assert app.get_setup_version() == 2
+        assert app.get_setup_state() == App.SetupState.NEEDS_UPDATE
+        assert other_app.get_setup_version() == 0
+
+    app.set_setup_version(3)
+    with django_assert_num_queries(0):
+        assert app.get_setup_state() == App.SetupState.UP_TO_DATE
+
+    # Versions are loaded again after clearing
+    app_module.clear_setup_versions()
+    with django_assert_num_queries(1):
+        assert app.get_setup_version() == 3
+        assert other_app.get_setup_version() == 0
+
+
 def test_app_enable(app_with_components):
     """Test that enabling an app enables components."""
     app_with_components.disable()
@@ -224,6 +283,21 @@ def test_app_disable(app_with_components):
         assert not component.is_enabled()
 
 
+@patch('plinth.cache.invalidate')
+def test_app_enable_invalidates_cache(invalidate, app_with_components):
+    """Test that enabling/disabling an app stops using cached values."""
+    app_with_components.enable()
+    invalidate.assert_called_with('apps')
+
+    invalidate.reset_mock()
+    app_with_components.disable()
+    invalidate.assert_called_with('apps')
+
+    invalidate.reset_mock()
+    app_with_components.set_enabled(True)
+    invalidate.assert_called_with('apps')
+
+
 def test_app_is_enabled(app_with_components):
     """Test checking for app enabled."""
     app = app_with_components
@@ -384,6 +458,7 @@ def test_component_initialization():
     component = Component('test-component')
     assert component.component_id == 'test-component'
     assert not component.is_leader
+    assert component.resources == []
 
 
 def test_component_app_property():
@@ -653,3 +728,126 @@ def test_apps_init_circular_depends(loaded_modules):
 
     apps_init()
     assert list(App._all_apps.keys()) == ['app3']
+
+
+@patch('plinth.app.App.needs_setup', return_value=True)
+@patch('plinth.module_loader.loaded_modules')
+def test_apps_post_init(loaded_modules, _needs_setup):
+    """Test that apps are initialized after the apps they depend on."""
+    loaded_modules.items.return_value = [('test1', ModuleTest1()),
+                                         ('test2', ModuleTest2())]
+    apps_init()
+
+    order = []
+
+    def _post_init(self):
+        if self.app_id == 'app3':
+            time.sleep(0.1)
+
+        order.append(self.app_id)
+
+    with patch('plinth.app.App.post_init', _post_init), \
+         patch('plinth.app.post_app_loading') as post_app_loading:
+        app_module.apps_post_init()
+
+    assert order == ['app2', 'app3', 'app1']
+    post_app_loading.send_robust.assert_called_once_with(sender='app')
+
+
+class ModuleParallelTest:
+    """A test module with apps not depending on each other."""
+
+    class App4(App):
+        """An app without dependencies."""
+        app_id = 'app4'
+
+        def __init__(self):
+            super().__init__()
+            self.add(Info('app4', version=1))
+
+    class App5(App):
+        """Another app without dependencies."""
+        app_id = 'app5'
+
+        def __init__(self):
+            super().__init__()
+            self.add(Info('app5', version=1))
+
+
+@patch('plinth.app.App.needs_setup', return_value=True)
+@patch('plinth.module_loader.loaded_modules')
+def test_apps_post_init_concurrently(loaded_modules, _needs_setup):
+    """Test that independent apps are initialized at the same time."""
+    loaded_modules.items.return_value = [('test', ModuleParallelTest())]
+    apps_init()
+
+    barrier = threading.Barrier(2, timeout=5)
+    initialized = []
+
+    def _post_init(self):
+        barrier.wait()
+        initialized.append(self.app_id)
+
+    with patch('plinth.app.App.post_init', _post_init):
+        app_module.apps_post_init()
+
+    assert sorted(initialized) == ['app4', 'app5']
+
+
+@patch('plinth.app.App.needs_setup', return_value=True)
+@patch('plinth.module_loader.loaded_modules')
+def test_apps_post_init_signals(loaded_modules, _needs_setup):
+    """Test that signals are delivered after all apps connect to them."""
+    loaded_modules.items.return_value = [('test', ModuleParallelTest())]
+    apps_init()
+
+    signal = DeferrableSignal()
+    received = []
+
+    def _receiver(sender, **kwargs):
+        received.append((sender, threading.current_thread()))
+
+    def _post_init(self):
+        if self.app_id == 'app4':
+            signal.send_robust(sender='app4')
+        else:
+            time.sleep(0.1)
+            signal.connect(_receiver, weak=False)
+
+    with patch('plinth.app.App.post_init', _post_init):
+        app_module.apps_post_init()
+
+    signal.disconnect(_receiver)
+    assert received == [('app4', threading.current_thread())]
+
+
+@patch('plinth.app.App.needs_setup', return_value=True)
+@patch('plinth.module_loader.loaded_modules')
+def test_apps_post_init_signal_errors(loaded_modules, _needs_setup):
+    """Test that errors in receivers of deferred signals are not hidden."""
+    loaded_modules.items.return_value = [('test', ModuleParallelTest())]
+    apps_init()
+
+    signal = DeferrableSignal()
+
+    def _receiver(sender, **kwargs):
+        raise RuntimeError('receiver failed')
+
+    signal.connect(_receiver, weak=False)
+
+    def _post_init(self):
+        if self.app_id == 'app4':
+            signal.send(sender='app4')
+
+    try:
+        with patch('plinth.app.App.post_init', _post_init):
+            with patch('plinth.cfg.develop', True):
+                with pytest.raises(RuntimeError, match='receiver failed'):
+                    app_module.apps_post_init()
+
+            with patch('plinth.app.logger') as logger:
+                app_module.apps_post_init()
+
+            logger.exception.assert_called_once()
+    finally:
+        signal.disconnect(_receiver)
@@ -0,0 +1,57 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for caching values computed while rendering pages.
+"""
+
+from unittest.mock import Mock
+
+import pytest
+from django.utils import translation
+
+from plinth import cache
+
+pytestmark = pytest.mark.usefixtures('local_memory_cache')
+
+
+def test_get_or_set():
+    """Test that values are computed only once."""
+    func = Mock(return_value=['value1'])
+    assert cache.get_or_set('test-kind', ['part1'], func) == ['value1']
+    assert cache.get_or_set('test-kind', ['part1'], func) == ['value1']
+    func.assert_called_once_with()
+
+    func.return_value = ['value2']
+    assert cache.get_or_set('test-kind', ['part2'], func) == ['value2']
+    assert func.call_count == 2
+
+
+def test_invalidate():
+    """Test that invalidating a kind of values recomputes them."""
+    func = Mock(return_value='value1')
+    other_func = Mock(return_value='value2')
+    cache.get_or_set('test-kind', ['part1'], func)
+    cache.get_or_set('other-kind', ['part1'], other_func)
+
+    version = cache.get_version('test-kind')
+    cache.invalidate('test-kind')
+    assert cache.get_version('test-kind') == version + 1
+
+    cache.get_or_set('test-kind', ['part1'], func)
+    cache.get_or_set('other-kind', ['part1'], other_func)
+    assert func.call_count == 2
+    assert other_func.call_count == 1
+
+
+def test_language():
+    """Test that values are cached separately for each language."""
+    with translation.override('en'):
+        assert cache.get_or_set('test-kind', [], lambda: 'Home') == 'Home'
+
+    with translation.override('de'):
+        assert cache.get_or_set('test-kind', [], lambda: 'Start') == 'Start'
+        assert cache.get_or_set('test-kind', [], lambda: 'Other') == 'Start'
+
+    with translation.override('en'):
+        assert cache.make_key('test-kind',
+                              'a') != cache.make_key('test-kind', 'b')
+        assert cache.get_or_set('test-kind', [], lambda: 'Other') == 'Home'
@@ -70,6 +70,47 @@ def test_read_dot_d_config_files(get_config_paths):
     assert cfg.box_name == 'FreedomBox02'
 
 
+@patch('plinth.cfg.get_config_paths')
+def test_read_cached(get_config_paths, tmp_path):
+    """Verify that files are parsed again only when they change."""
+    config_path = tmp_path / 'freedombox.config'
+    config_path_d = tmp_path / 'freedombox.config.d'
+    config_path.write_text('[Misc]\nbox_name = Box1\n')
+    get_config_paths.return_value = [str(config_path)]
+
+    cfg.read()
+    reload_count = cfg.reload_count
+    assert cfg.box_name == 'Box1'
+
+    cfg.read()
+    assert cfg.reload_count == reload_count
+
+    # File modified
+    config_path.write_text('[Misc]\nbox_name = Box02\n')
+    cfg.read()
+    assert cfg.reload_count == reload_count + 1
+    assert cfg.box_name == 'Box02'
+
+    # File added to .d directory
+    config_path_d.mkdir()
+    (config_path_d / '01.config').write_text('[Misc]\nbox_name = Box3\n')
+    cfg.read()
+    assert cfg.reload_count == reload_count + 2
+    assert cfg.box_name == 'Box3'
+
+    # File in .d directory modified
+    (config_path_d / '01.config').write_text('[Misc]\nbox_name = Box04\n')
+    cfg.read()
+    assert cfg.reload_count == reload_count + 3
+    assert cfg.box_name == 'Box04'
+
+    # Reading a single file directly invalidates the cache
+    cfg.read_file(CONFIG_FILE_WITH_MISSING_OPTIONS)
+    cfg.read()
+    assert cfg.reload_count == reload_count + 4
+    assert cfg.box_name == 'Box04'
+
+
 def test_read_develop_config_file():
     """Verify that the correct develop config file is used."""
     test_dir = os.path.dirname(os.path.realpath(__file__))
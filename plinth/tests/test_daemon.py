@@ -10,8 +10,11 @@ from unittest.mock import Mock, call, patch
 import pytest
 
 from plinth.app import App, FollowerComponent, Info
-from plinth.daemon import (Daemon, RelatedDaemon, SharedDaemon, app_is_running,
-                           diagnose_netcat, diagnose_port_listening)
+from plinth.daemon import (UNIT_STATE_PROPERTIES, Daemon, RelatedDaemon,
+                           SharedDaemon, UnitStateCache, app_is_running,
+                           diagnose_netcat, diagnose_port_listening,
+                           get_unit_full_name, get_unit_name,
+                           get_unit_object_path, get_units_state, gio, glib)
 from plinth.diagnostic_check import DiagnosticCheck, Result
 
 privileged_modules_to_mock = ['plinth.privileged.service']
@@ -143,31 +146,164 @@ def test_is_running(service_is_running, daemon):
     assert not daemon.is_running()
 
 
-@patch('plinth.app.apps_init')
+@pytest.mark.parametrize('unit,label', [
+    ('apache2.service', 'apache2_2eservice'),
+    ('1test@foo-bar.socket', '_31test_40foo_2dbar_2esocket'),
+    ('', '_'),
+])
+def test_unit_object_path(unit, label):
+    """Test converting between unit names and D-Bus object paths."""
+    object_path = get_unit_object_path(unit)
+    assert object_path == f'/org/freedesktop/systemd1/unit/{label}'
+    assert get_unit_name(object_path) == unit
+
+
+@pytest.fixture(name='unit_state_cache')
+def fixture_unit_state_cache():
+    """Return a unit state cache with a mock D-Bus connection."""
+
+    def call_sync(_bus_name, _object_path, _interface, method, parameters,
+                  *_args):
+        # Like systemd, reject unit names without a suffix and answer with
+        # the primary name of units named by an alias.
+        if method == 'GetUnitFileState':
+            unit = parameters.unpack()[0]
+            if '.' not in unit:
+                raise glib.Error.new_literal(gio.dbus_error_quark(),
+                                             'Invalid unit name',
+                                             gio.DBusError.INVALID_ARGS)
+
+            return glib.Variant('(s)', ('enabled', ))
+
+        units = parameters.unpack()[0]
+        aliases = {'test-alias.service': 'test-unit.service'}
+        return glib.Variant('(a(ssssssouso))',
+                            ([(aliases.get(unit, unit), '', 'loaded', 'active',
+                               'running', '', '/', 0, '', '/')
+                              for unit in units if '.' in unit], ))
+
+    cache = UnitStateCache()
+    cache._connection = Mock()
+    cache._connection.call_sync.side_effect = call_sync
+    cache._ready = True
+    with patch('plinth.daemon._unit_state_cache', cache):
+        yield cache
+
+
 @patch('plinth.action_utils.service_is_running')
-@patch('plinth.action_utils.service_show')
+@patch('plinth.action_utils.service_is_enabled')
+def test_unit_state_cache(service_is_enabled, service_is_running,
+                          unit_state_cache, daemon):
+    """Test that unit states are cached and invalidated by signals."""
+    connection = unit_state_cache._connection
+    assert daemon.is_enabled()
+    assert daemon.is_running()
+    assert daemon.is_enabled()
+    assert daemon.is_running()
+    assert connection.call_sync.call_count == 2
+    assert not service_is_enabled.called
+    assert not service_is_running.called
+
+    parameters = glib.Variant('(sa{sv}as)', ('org.freedesktop.systemd1.Unit', {
+        'ActiveState': glib.Variant('s', 'inactive')
+    }, []))
+    unit_state_cache._on_properties_changed(
+        None, None, get_unit_object_path('test-unit.service'), None,
+        'PropertiesChanged', parameters)
+    assert not daemon.is_running()
+    assert connection.call_sync.call_count == 2
+
+    unit_state_cache._on_manager_signal(None, None, None, None,
+                                        'UnitFilesChanged', None)
+    assert daemon.is_enabled()
+    assert not daemon.is_running()
+    assert connection.call_sync.call_count == 3
+
+    unit_state_cache._on_manager_signal(None, None, None, None, 'Reloading',
+                                        None)
+    assert daemon.is_running()
+    assert daemon.is_enabled()
+    assert connection.call_sync.call_count == 5
+
+    daemon.strict_check = True
+    unit_state_cache._unit_file_states['test-unit.service'] = 'static'
+    assert not daemon.is_enabled()
+
+    unit_state_cache._ready = False
+    service_is_enabled.return_value = True
+    assert daemon.is_enabled()
+    service_is_enabled.assert_called_with('test-unit', strict_check=True)
+
+
+def test_unit_state_cache_names(unit_state_cache):
+    """Test that units are looked up by full and primary names."""
+    assert get_unit_full_name('ssh') == 'ssh.service'
+    assert get_unit_full_name('ssh.socket') == 'ssh.socket'
+    assert get_unit_full_name('getty@tty1') == 'getty@tty1.service'
+
+    states = get_units_state(['test-unit', 'test-alias'])
+    expected_state = {
+        'LoadState': 'loaded',
+        'ActiveState': 'active',
+        'UnitFileState': 'enabled'
+    }
+    assert states == {
+        'test-unit': expected_state,
+        'test-alias': expected_state
+    }
+    assert unit_state_cache._unit_ids == {
+        'test-unit.service': 'test-unit.service',
+        'test-alias.service': 'test-unit.service'
+    }
+
+    # Signals for the primary unit update the state of its alias
+    parameters = glib.Variant('(sa{sv}as)', ('org.freedesktop.systemd1.Unit', {
+        'ActiveState': glib.Variant('s', 'inactive')
+    }, []))
+    unit_state_cache._on_properties_changed(
+        None, None, get_unit_object_path('test-unit.service'), None,
+        'PropertiesChanged', parameters)
+    call_count = unit_state_cache._connection.call_sync.call_count
+    states = get_units_state(['test-alias'])
+    assert states['test-alias']['ActiveState'] == 'inactive'
+    assert unit_state_cache._connection.call_sync.call_count == call_count
+
+    unit_state_cache.invalidate('test-alias')
+    assert get_units_state(['test-unit'])['test-unit']['ActiveState'] == \
+        'active'
+
+
+@patch('plinth.app.apps_init')
+@patch('plinth.action_utils.service_show_many')
 @patch('subprocess.run')
-def test_ensure_running(subprocess_run, service_show, service_is_running,
-                        apps_init, app_list, mock_privileged, daemon):
+def test_ensure_running(subprocess_run, service_show_many, apps_init, app_list,
+                        mock_privileged, daemon):
     """Test that checking that the daemon is running works."""
     common_args = dict(stdout=subprocess.PIPE, stderr=subprocess.PIPE,
                        check=False)
 
-    service_show.return_value = {'LoadState': 'not-found'}
+    def set_state(load_state, active_state):
+        service_show_many.return_value = {
+            'test-unit': {
+                'LoadState': load_state,
+                'ActiveState': active_state,
+                'UnitFileState': ''
+            }
+        }
+
+    set_state('not-found', 'inactive')
     with daemon.ensure_running() as starting_state:
         assert not starting_state
         assert subprocess_run.mock_calls == []
 
-    service_show.return_value = {'LoadState': 'loaded'}
-
-    service_is_running.return_value = True
+    set_state('loaded', 'active')
     with daemon.ensure_running() as starting_state:
         assert starting_state
         assert not subprocess_run.called
 
     assert not subprocess_run.called
 
-    service_is_running.return_value = False
+    set_state('loaded', 'inactive')
     with daemon.ensure_running() as starting_state:
         assert not starting_state
         assert subprocess_run.mock_calls == [
@@ -216,8 +352,8 @@ def test_diagnose(port_listening, service_is_running, daemon):
     assert results[0].result == Result.FAILED
 
 
-@patch('plinth.action_utils.service_is_running')
-def test_app_is_running(service_is_running):
+@patch('plinth.action_utils.service_show_many')
+def test_app_is_running(service_show_many):
     """Test that checking whether app is running works."""
     daemon1 = Daemon('test-daemon-1', 'test-unit-1')
     daemon2 = FollowerComponent('test-daemon-2', 'test-unit-2')
@@ -234,33 +370,75 @@ def test_app_is_running(service_is_running):
     app.add(daemon2)
     app.add(follower1)
 
-    service_is_running.return_value = True
+    def set_active_state(active_state):
+        service_show_many.return_value = {
+            'test-unit-1': {
+                'LoadState': 'loaded',
+                'ActiveState': active_state,
+                'UnitFileState': 'enabled'
+            }
+        }
+
+    set_active_state('active')
     daemon2.is_running.return_value = False
     assert not app_is_running(app)
 
-    service_is_running.return_value = False
+    set_active_state('inactive')
     daemon2.is_running.return_value = False
     assert not app_is_running(app)
 
-    service_is_running.return_value = True
+    set_active_state('active')
     daemon2.is_running.return_value = True
     assert app_is_running(app)
+    service_show_many.assert_called_with(['test-unit-1'],
+                                         UNIT_STATE_PROPERTIES)
 
 
+@patch('plinth.action_utils.service_is_enabled')
+@patch('plinth.action_utils.service_show_many')
+def test_app_is_enabled(service_show_many, service_is_enabled):
+    """Test that states of all daemons of an app are queried at once."""
+    daemon1 = Daemon('test-daemon-1', 'test-unit-1', alias='test-alias-1')
+    daemon2 = Daemon('test-daemon-2', 'test-unit-2', strict_check=True)
+
+    app = AppTest()
+    app.add(daemon1)
+    app.add(daemon2)
+
+    service_show_many.return_value = {
+        unit: {
+            'LoadState': 'loaded',
+            'ActiveState': 'active',
+            'UnitFileState': 'static'
+        }
+        for unit in ['test-unit-1', 'test-alias-1', 'test-unit-2']
+    }
+    assert not app.is_enabled()
+    service_show_many.assert_called_once_with(
+        ['test-unit-1', 'test-alias-1', 'test-unit-2'], UNIT_STATE_PROPERTIES)
+
+    service_show_many.return_value['test-unit-2']['UnitFileState'] = 'enabled'
+    assert app.is_enabled()
+    assert not service_is_enabled.called
+
+
+@patch('plinth.daemon._listening_sockets_time', None)
 @patch('psutil.net_connections')
 def test_diagnose_port_listening(connections):
     """Test running port listening diagnostics test."""
+    tcp, udp = socket.SOCK_STREAM, socket.SOCK_DGRAM
+    inet, inet6 = socket.AF_INET, socket.AF_INET6
     connections.return_value = [
-        Mock(status='LISTEN', laddr=('0.0.0.0', 1234), family=socket.AF_INET),
-        Mock(status='ESTABLISHED', laddr=('0.0.0.0', 2345),
-             family=socket.AF_INET),
-        Mock(raddr=(), laddr=('0.0.0.0', 3456), family=socket.AF_INET),
-        Mock(raddr=('1.1.1.1', 53), laddr=('0.0.0.0', 4567),
-             family=socket.AF_INET),
-        Mock(status='LISTEN', laddr=('::1', 5678), familiy=socket.AF_INET6),
-        Mock(status='LISTEN', laddr=('::', 6789), familiy=socket.AF_INET6),
-        Mock(raddr=(), laddr=('::1', 5678), familiy=socket.AF_INET6),
-        Mock(raddr=(), laddr=('::', 6789), familiy=socket.AF_INET6),
+        Mock(type=tcp, status='LISTEN', laddr=('0.0.0.0', 1234), family=inet),
+        Mock(type=tcp, status='ESTABLISHED', laddr=('0.0.0.0', 2345),
+             family=inet),
+        Mock(type=udp, raddr=(), laddr=('0.0.0.0', 3456), family=inet),
+        Mock(type=udp, raddr=('1.1.1.1', 53), laddr=('0.0.0.0', 4567),
+             family=inet),
+        Mock(type=tcp, status='LISTEN', laddr=('::1', 5678), family=inet6),
+        Mock(type=tcp, status='LISTEN', laddr=('::', 6789), family=inet6),
+        Mock(type=udp, raddr=(), laddr=('::1', 5678), family=inet6),
+        Mock(type=udp, raddr=(), laddr=('::', 6789), family=inet6),
     ]
 
     # Check that message is correct
@@ -297,20 +475,6 @@ def test_diagnose_port_listening(connections):
             'listen_address': '0.0.0.0'
         })
 
-    # Check if psutil call is being made with right argument
-    results = diagnose_port_listening(1234, 'tcp')
-    connections.assert_called_with('tcp')
-    results = diagnose_port_listening(1234, 'tcp4')
-    connections.assert_called_with('tcp')
-    results = diagnose_port_listening(1234, 'tcp6')
-    connections.assert_called_with('tcp6')
-    results = diagnose_port_listening(3456, 'udp')
-    connections.assert_called_with('udp')
-    results = diagnose_port_listening(3456, 'udp4')
-    connections.assert_called_with('udp')
-    results = diagnose_port_listening(3456, 'udp6')
-    connections.assert_called_with('udp6')
-
     # TCP
     assert diagnose_port_listening(1234).result == Result.PASSED
     assert diagnose_port_listening(1000).result == Result.FAILED
@@ -319,10 +483,12 @@ def test_diagnose_port_listening(connections):
                                    '0.0.0.0').result == Result.PASSED
     assert diagnose_port_listening(1234, 'tcp',
                                    '1.1.1.1').result == Result.FAILED
-    assert diagnose_port_listening(1234, 'tcp6').result == Result.PASSED
+    assert diagnose_port_listening(1234, 'tcp6').result == Result.FAILED
     assert diagnose_port_listening(1234, 'tcp4').result == Result.PASSED
+    assert diagnose_port_listening(5678, 'tcp6').result == Result.PASSED
     assert diagnose_port_listening(6789, 'tcp4').result == Result.PASSED
     assert diagnose_port_listening(5678, 'tcp4').result == Result.FAILED
+    assert diagnose_port_listening(3456, 'tcp').result == Result.FAILED
 
     # UDP
     assert diagnose_port_listening(3456, 'udp').result == Result.PASSED
@@ -332,10 +498,15 @@ def test_diagnose_port_listening(connections):
                                    '0.0.0.0').result == Result.PASSED
     assert diagnose_port_listening(3456, 'udp',
                                    '1.1.1.1').result == Result.FAILED
-    assert diagnose_port_listening(3456, 'udp6').result == Result.PASSED
+    assert diagnose_port_listening(3456, 'udp6').result == Result.FAILED
     assert diagnose_port_listening(3456, 'udp4').result == Result.PASSED
+    assert diagnose_port_listening(5678, 'udp6').result == Result.PASSED
     assert diagnose_port_listening(6789, 'udp4').result == Result.PASSED
     assert diagnose_port_listening(5678, 'udp4').result == Result.FAILED
+    assert diagnose_port_listening(1234, 'udp').result == Result.FAILED
+
+    # Sockets are listed only once for all the checks
+    connections.assert_called_once_with('inet')
 
 
 @patch('subprocess.Popen')
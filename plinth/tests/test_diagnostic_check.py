@@ -2,11 +2,15 @@
 """Tests for diagnostic check data type."""
 
 import json
+import threading
+from unittest.mock import patch
 
 import pytest
 
+from plinth.app import Component
 from plinth.diagnostic_check import (CheckJSONDecoder, CheckJSONEncoder,
-                                     DiagnosticCheck, Result)
+                                     DiagnosticCheck, Result,
+                                     diagnose_components, run_in_parallel)
 
 
 def test_result():
@@ -70,3 +74,79 @@ def test_json_encoder_decoder():
 
     decoded_check = json.loads(check_json, cls=CheckJSONDecoder)
     assert decoded_check == check
+
+
+def test_run_in_parallel():
+    """Test running functions in parallel with a timeout."""
+    event = threading.Event()
+    done = []
+    futures = run_in_parallel([lambda: 1, event.wait, lambda: 3], 0.2,
+                              on_done=lambda index, future: done.append(
+                                  (index, bool(future))))
+    event.set()
+    assert [future.result() if future else None
+            for future in futures] == [1, None, 3]
+    assert sorted(done) == [(0, True), (1, False), (2, True)]
+
+
+def test_run_in_parallel_abandoned():
+    """Test that abandoned functions don't hold up later runs."""
+    event = threading.Event()
+    assert run_in_parallel([event.wait], 0.1, workers=1) == [None]
+    futures = run_in_parallel([lambda: 1], 0.5, workers=1)
+    assert futures[0].result() == 1
+
+    # Abandoned functions don't prevent the process from exiting
+    threads = [
+        thread for thread in threading.enumerate()
+        if thread.name.startswith('diagnostics-')
+    ]
+    assert threads and all(thread.daemon for thread in threads)
+    event.set()
+
+
+class ComponentTest(Component):
+    """Component with diagnostic checks for testing."""
+
+    def __init__(self, component_id, delay=0):
+        super().__init__(component_id)
+        self.delay = delay
+
+    def diagnose(self):
+        """Return a diagnostic check after a delay."""
+        threading.Event().wait(self.delay)
+        return [
+            DiagnosticCheck(f'check-{self.component_id}', 'check',
+                            Result.PASSED, {}, self.component_id)
+        ]
+
+
+@patch('plinth.diagnostic_check.check_timeout', 0.2)
+def test_diagnose_components():
+    """Test diagnosing components in parallel."""
+    components = [
+        ComponentTest('test-1', 0.1),
+        Component('test-2'),
+        ComponentTest('test-3'),
+        ComponentTest('test-4', 2)
+    ]
+    assert diagnose_components(components) == [
+        DiagnosticCheck('check-test-1', 'check', Result.PASSED, {}, 'test-1'),
+        DiagnosticCheck('check-test-3', 'check', Result.PASSED, {}, 'test-3'),
+        DiagnosticCheck('diagnostics-timeout-test-4',
+                        'Diagnostic checks finish within {timeout} seconds',
+                        Result.ERROR, {'timeout': 0.2}, 'test-4')
+    ]
+
+
+@patch('plinth.diagnostic_check.check_timeout', 0.2)
+def test_diagnose_components_in_parallel_run():
+    """Test that checks time out when diagnosing in a parallel run."""
+    components = [ComponentTest('test-1'), ComponentTest('test-2', 2)]
+    futures = run_in_parallel([lambda: diagnose_components(components)], 5)
+    assert futures[0].result() == [
+        DiagnosticCheck('check-test-1', 'check', Result.PASSED, {}, 'test-1'),
+        DiagnosticCheck('diagnostics-timeout-test-2',
+                        'Diagnostic checks finish within {timeout} seconds',
+                        Result.ERROR, {'timeout': 0.2}, 'test-2')
+    ]
@@ -8,6 +8,7 @@ from unittest.mock import patch
 import pytest
 
 from plinth.frontpage import Shortcut, add_custom_shortcuts
+from plinth.modules import users
 
 # pylint: disable=protected-access
 
@@ -16,6 +17,7 @@ from plinth.frontpage import Shortcut, add_custom_shortcuts
 def fixture_clean_global_shortcuts():
     """Ensure that global list of shortcuts is clean."""
     Shortcut._all_shortcuts = {}
+    users.invalidate_user_groups()
 
 
 def test_shortcut_init_with_arguments():
@@ -106,37 +108,68 @@ def test_shortcut_list_web_apps_only(common_shortcuts):
     assert return_list == [cuts[0], cuts[1], cuts[2]]
 
 
-@patch('plinth.modules.users.privileged.get_user_groups')
-def test_shortcut_list_with_username(get_user_groups, common_shortcuts):
+@patch('plinth.modules.users.privileged.get_all_user_groups')
+def test_shortcut_list_with_username(get_all_user_groups, common_shortcuts):
     """Test listing for particular users."""
     cuts = common_shortcuts
 
     return_list = Shortcut.list()
     assert return_list == [cuts[0], cuts[1], cuts[2], cuts[3]]
 
-    get_user_groups.return_value = ['admin']
+    get_all_user_groups.return_value = {'admin': ['admin']}
     return_list = Shortcut.list(username='admin')
     assert return_list == [cuts[0], cuts[1], cuts[2], cuts[3]]
 
-    get_user_groups.return_value = ['group1']
+    get_all_user_groups.return_value = {'user1': ['group1']}
     return_list = Shortcut.list(username='user1')
     assert return_list == [cuts[0], cuts[1], cuts[3]]
 
-    get_user_groups.return_value = ['group1', 'group2']
+    get_all_user_groups.return_value = {'user2': ['group1', 'group2']}
     return_list = Shortcut.list(username='user2')
     assert return_list == [cuts[0], cuts[1], cuts[2], cuts[3]]
 
     cut = Shortcut('group2-web-app-component-1', 'name5', 'short2', url='url4',
                    login_required=False, allowed_groups=['group3'])
-    get_user_groups.return_value = ['group3']
+    get_all_user_groups.return_value = {'user3': ['group3']}
     return_list = Shortcut.list(username='user3')
     assert return_list == [cuts[0], cuts[3], cut]
 
-    get_user_groups.return_value = ['group4']
+    get_all_user_groups.return_value = {'user4': ['group4']}
     return_list = Shortcut.list(username='user4')
     assert return_list == [cuts[0], cuts[3], cut]
 
 
+@patch('plinth.modules.users.privileged.get_all_user_groups')
+def test_shortcut_list_remembers_groups(get_all_user_groups, common_shortcuts):
+    """Test that groups of a user are not retrieved for every listing."""
+    cuts = common_shortcuts
+
+    get_all_user_groups.return_value = {
+        'user1': ['group1'],
+        'user2': ['group2']
+    }
+    assert Shortcut.list(username='user1') == [cuts[0], cuts[1], cuts[3]]
+    get_all_user_groups.return_value = {'user1': ['group2']}
+    assert Shortcut.list(username='user1') == [cuts[0], cuts[1], cuts[3]]
+    assert Shortcut.list(username='user2') == [cuts[0], cuts[2], cuts[3]]
+    get_all_user_groups.assert_called_once_with()
+
+    users.invalidate_user_groups()
+    assert Shortcut.list(username='user1') == [cuts[0], cuts[2], cuts[3]]
+
+    # Changing groups through privileged actions forgets remembered groups
+    get_all_user_groups.return_value = {'user1': ['group1']}
+    with patch('plinth.actions.run_privileged_method') as run_method:
+        users.privileged.add_user_to_group('user1', 'group1')
+
+    run_method.assert_called_once()
+    assert Shortcut.list(username='user1') == [cuts[0], cuts[1], cuts[3]]
+
+    with patch('plinth.modules.users.user_groups_timeout', 0):
+        get_all_user_groups.return_value = {'user1': ['group2']}
+        assert Shortcut.list(username='user1') == [cuts[0], cuts[2], cuts[3]]
+
+
 def test_add_custom_shortcuts(shortcuts_file):
     """Test that adding custom shortcuts succeeds."""
     shortcuts_file('nextcloud.json')
@@ -3,6 +3,8 @@
 Test module for key/value store.
 """
 
+from unittest.mock import patch
+
 import pytest
 
 from plinth import kvstore
@@ -43,6 +45,11 @@ def test_get_default():
     actual = kvstore.get_default('bad_key', expected)
     assert expected == actual
 
+    kvstore.invalidate()
+    with patch('plinth.models.KVStore.objects.filter') as filter_:
+        filter_.side_effect = RuntimeError('Database error')
+        assert kvstore.get_default('bad_key', expected) == expected
+
 
 def test_delete():
     """Test that deleting key works."""
@@ -58,3 +65,64 @@ def test_delete():
     kvstore.delete('test-set-key')
     with pytest.raises(KVStore.DoesNotExist):
         kvstore.delete('test-set-key')
+
+
+def test_get_set_many():
+    """Test getting and setting multiple keys at once."""
+    kvstore.set_many({'key1': 'value1', 'key2': {'a': 1}})
+    assert kvstore.get_many(['key1', 'key2', 'key3']) == {
+        'key1': 'value1',
+        'key2': {
+            'a': 1
+        }
+    }
+
+    kvstore.set_many({'key2': 2, 'key3': [3]})
+    kvstore.invalidate()
+    assert kvstore.get_many(['key1', 'key2', 'key3']) == {
+        'key1': 'value1',
+        'key2': 2,
+        'key3': [3]
+    }
+
+
+def test_values_in_memory(django_assert_num_queries):
+    """Test that values are kept in memory after first read or write."""
+    kvstore.set('key1', True)
+    kvstore.set('key2', {'a': 1})
+    with django_assert_num_queries(1):
+        assert kvstore.get_many(['key1', 'key2', 'key3']) == {
+            'key1': True,
+            'key2': {
+                'a': 1
+            }
+        }
+
+    with django_assert_num_queries(0):
+        assert kvstore.get('key1')
+        assert kvstore.get_default('key3', 'default') == 'default'
+        value = kvstore.get('key2')
+        value['a'] = 2  # Modifying returned value does not affect store
+        assert kvstore.get('key2') == {'a': 1}
+
+    kvstore.delete('key1')
+    with pytest.raises(KVStore.DoesNotExist):
+        kvstore.get('key1')
+
+    kvstore.invalidate(['key2'])
+    with django_assert_num_queries(1):
+        assert kvstore.get('key2') == {'a': 1}
+
+
+def test_least_recently_used_values(django_assert_num_queries):
+    """Test that only a limited number of values are kept in memory."""
+    with patch('plinth.kvstore.cache_size', 2):
+        kvstore.set_many({'key1': 1, 'key2': 2})
+        kvstore.get('key1')
+        kvstore.set('key3', 3)
+        with django_assert_num_queries(0):
+            assert kvstore.get('key1') == 1
+            assert kvstore.get('key3') == 3
+
+        with django_assert_num_queries(1):
+            assert kvstore.get('key2') == 2
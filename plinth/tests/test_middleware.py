@@ -3,6 +3,7 @@
 Test module for custom middleware.
 """
 
+import functools
 from unittest.mock import MagicMock, Mock, call, patch
 
 import pytest
@@ -17,7 +18,7 @@ from stronghold.decorators import public
 
 from plinth import app as app_module
 from plinth.middleware import (AdminRequiredMiddleware, CommonErrorMiddleware,
-                               SetupMiddleware)
+                               RequestTimingMiddleware, SetupMiddleware)
 
 
 @pytest.fixture(name='kwargs')
@@ -88,6 +89,40 @@ class TestSetupMiddleware:
         response = middleware.process_view(request, **kwargs)
         assert response is None
 
+    @staticmethod
+    @patch('django.urls.resolve')
+    @patch('django.urls.reverse', return_value='users:login')
+    @pytest.mark.django_db
+    def test_module_is_up_to_date_without_queries(_reverse, resolve, app,
+                                                  middleware, kwargs,
+                                                  django_assert_num_queries):
+        """Test that checking setup state of app does not query database."""
+        resolve.return_value.namespaces = ['mockapp']
+        app.get_setup_state = functools.partial(app_module.App.get_setup_state,
+                                                app)
+        app.set_setup_version(1)
+
+        request = RequestFactory().get('/freedombox/mockapp')
+        request.user = AnonymousUser()
+        with django_assert_num_queries(0):
+            response = middleware.process_view(request, **kwargs)
+
+        assert response is None
+
+    @staticmethod
+    @patch('django.urls.resolve')
+    @patch('django.urls.reverse', return_value='users:login')
+    def test_resolver_match_reused(_reverse, resolve, app, middleware, kwargs):
+        """Test that URL resolved by Django is not resolved again."""
+        app.get_setup_state = lambda: app_module.App.SetupState.UP_TO_DATE
+
+        request = RequestFactory().get('/freedombox/mockapp')
+        request.resolver_match = Mock(namespaces=['mockapp'])
+        request.user = AnonymousUser()
+        response = middleware.process_view(request, **kwargs)
+        assert response is None
+        resolve.assert_not_called()
+
     @staticmethod
     @patch('plinth.views.SetupView')
     @patch('django.urls.resolve')
@@ -153,7 +188,7 @@ class TestSetupMiddleware:
 
         # Admin user can collect result
         request = RequestFactory().get('/freedombox/mockapp')
-        request.resolver_match = Mock()
+        request.resolver_match = resolve.return_value
         user = User(username='adminuser')
         user.save()
         group = Group(name='admin')
@@ -360,3 +395,24 @@ class TestCommonErrorMiddleware:
         assert isinstance(response, HttpResponseRedirect)
         assert response.url == '/apps/'
         messages_error.assert_not_called()
+
+
+def test_request_timing_middleware(kwargs):
+    """Test that time taken for parts of a request is reported."""
+
+    def get_response(request):
+        middleware.process_view(request, **kwargs)
+        return HttpResponse()
+
+    middleware = RequestTimingMiddleware(get_response)
+    request = RequestFactory().get('/freedombox/')
+    response = middleware(request)
+    timings = [
+        timing.split(';')[0]
+        for timing in response['Server-Timing'].split(', ')
+    ]
+    assert timings == ['total', 'middleware', 'view']
+
+    middleware = RequestTimingMiddleware(lambda request: HttpResponse())
+    response = middleware(request)
+    assert response['Server-Timing'].startswith('total;dur=')
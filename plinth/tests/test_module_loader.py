@@ -3,13 +3,119 @@
 Test module for module loading mechanism.
 """
 
+import importlib
+import pathlib
+import sys
 from unittest.mock import mock_open, patch
 
+import pytest
+from django.urls import URLResolver
+from django.urls.resolvers import RegexPattern
+
 from plinth import module_loader
 
 
+@pytest.fixture(autouse=True)
+def fixture_clear_import_paths():
+    """Clear the index of module import paths before and after test."""
+    module_loader._module_import_paths = None
+    yield
+    module_loader._module_import_paths = None
+
+
 @patch('pathlib.Path.open', mock_open(read_data='plinth.modules.apache\n'))
 def test_get_module_import_path():
     """Returning the module import path."""
     import_path = module_loader.get_module_import_path('apache')
     assert import_path == 'plinth.modules.apache'
+
+
+@patch('plinth.module_loader._get_modules_enabled_paths')
+def test_get_module_import_path_index(get_modules_enabled_paths, tmp_path):
+    """Test that import paths are read once from modules-enabled files."""
+    get_modules_enabled_paths.return_value = [tmp_path]
+    (tmp_path / 'foo').write_text('# comment\nplinth.modules.foo\n')
+    (tmp_path / 'bar').write_text('# Disabled\n')
+    (tmp_path / '.hidden').write_text('plinth.modules.hidden\n')
+    assert module_loader.get_module_import_path('foo') == 'plinth.modules.foo'
+    with pytest.raises(ValueError, match='Module disabled'):
+        module_loader.get_module_import_path('bar')
+
+    # Index is not read again
+    (tmp_path / 'foo').write_text('plinth.modules.foo2\n')
+    with patch('pathlib.Path.open') as open_:
+        assert module_loader.get_module_import_path('foo') == \
+            'plinth.modules.foo'
+        open_.assert_not_called()
+
+    # Modules not in the index are looked up in source directories
+    directory = pathlib.Path(module_loader.__file__).parent
+    assert (directory / 'modules/apache').exists()
+    assert module_loader.get_module_import_path('apache') == \
+        'plinth.modules.apache'
+
+
+@pytest.fixture(name='test_package')
+def fixture_test_package(tmp_path, monkeypatch):
+    """Create a package with a URLconf that can be imported."""
+    package = tmp_path / 'lazytestapp'
+    package.mkdir()
+    (package / '__init__.py').write_text('')
+    (package / 'urls.py').write_text(
+        'from django.urls import re_path\n'
+        'urlpatterns = [re_path(r"^lazy/$", lambda request: None, '
+        'name="index")]\n')
+    broken_package = tmp_path / 'brokentestapp'
+    broken_package.mkdir()
+    (broken_package / '__init__.py').write_text('')
+    (broken_package / 'urls.py').write_text('import brokentestapp.missing\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield package
+    for module_name in ('lazytestapp', 'lazytestapp.urls', 'brokentestapp',
+                        'brokentestapp.urls'):
+        sys.modules.pop(module_name, None)
+
+
+@patch('plinth.cfg.develop', False)
+def test_include_module_urls_lazily(test_package):
+    """Test that URLconfs are imported only when needed."""
+    from plinth import urls
+
+    urlpatterns = []
+    with patch.object(urls, 'urlpatterns', urlpatterns):
+        module_loader._include_module_urls('lazytestapp', 'lazytestapp')
+        module_loader._include_module_urls('plinth.tests', 'tests')
+
+    assert len(urlpatterns) == 1
+    assert 'lazytestapp' not in sys.modules
+    assert 'lazytestapp.urls' not in sys.modules
+
+    resolver = urlpatterns[0]
+    assert resolver.namespace == 'lazytestapp'
+    assert resolver.resolve('lazy/').url_name == 'index'
+    assert 'lazytestapp.urls' in sys.modules
+
+
+@patch('plinth.cfg.develop', False)
+def test_lazy_urlconf_import_error(test_package):
+    """Test that a broken URLconf does not break other URLs."""
+    broken_resolver = module_loader._LazyURLResolver('brokentestapp.urls',
+                                                     'brokentestapp')
+    resolver = URLResolver(RegexPattern(r'^'), [
+        broken_resolver,
+        module_loader._LazyURLResolver('lazytestapp.urls', 'lazytestapp')
+    ])
+    _, app_resolver = resolver.namespace_dict['lazytestapp']
+    assert app_resolver.reverse('index') == 'lazy/'
+    assert resolver.resolve('lazy/').namespaces == ['lazytestapp']
+    assert broken_resolver.url_patterns == []
+
+    # Importing is tried again later and works once the error is fixed
+    (test_package.parent / 'brokentestapp' / 'urls.py').write_text(
+        'from django.urls import re_path\n'
+        'urlpatterns = [re_path(r"^broken/$", lambda request: None, '
+        'name="index")]\n')
+    importlib.invalidate_caches()
+    assert broken_resolver.url_patterns == []
+    with patch('plinth.module_loader.urls_retry_interval', 0):
+        assert resolver.resolve('broken/').namespaces == ['brokentestapp']
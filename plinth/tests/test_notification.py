@@ -415,6 +415,38 @@ def test_display_context_body_template(note, user, load_cfg, rf):
         b'Test notification body /freedombox/help/about/\n'
 
 
+@pytest.mark.usefixtures('local_memory_cache')
+def test_display_context_cached(note, user, load_cfg, rf,
+                                django_assert_num_queries):
+    """Test that display context is cached until notifications change."""
+    request = rf.get('/freedombox/help/about/')
+    context = Notification.get_display_context(request, user)
+    assert len(context['notifications']) == 1
+
+    with django_assert_num_queries(0):
+        context = Notification.get_display_context(request, user)
+        assert context['notifications'][0]['title'] == 'Test Title'
+
+    note.title = 'Test Title 2'
+    note.save()
+    context = Notification.get_display_context(request, user)
+    assert context['notifications'][0]['title'] == 'Test Title 2'
+
+    note.dismiss()
+    assert not Notification.get_display_context(request, user)['notifications']
+
+    note.dismiss(should_dismiss=False)
+    note.group = 'other-group'
+    note.save()
+    assert not Notification.get_display_context(request, user)['notifications']
+
+    user.groups.add(Group.objects.create(name='other-group'))
+    assert Notification.get_display_context(request, user)['notifications']
+
+    note.delete()
+    assert not Notification.get_display_context(request, user)['notifications']
+
+
 @pytest.mark.django_db
 def test_last_update_time_updates_on_modify():
     """Test that last_update_time is updated on modify via update_or_create."""
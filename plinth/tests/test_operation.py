@@ -43,6 +43,7 @@ def test_operation_default_initialization(update_notification):
     assert operation._message is None
     assert operation.exception is None
     assert operation.thread_data == {}
+    assert operation.resources is None
     assert isinstance(operation.thread, threading.Thread)
     assert operation.thread._operation == operation
     update_notification.assert_has_calls([call()])
@@ -54,7 +55,8 @@ def test_operation_initialization(update_notification):
     on_complete = Mock()
     operation = Operation('testid', 'testapp', 'op1', Mock(), ['arg1'],
                           {'arg2': 'value2'}, False, True,
-                          {'data1': 'datavalue1'}, on_complete)
+                          {'data1': 'datavalue1'}, on_complete,
+                          ['resource1', 'resource2'])
     assert not operation.show_message
     assert operation.show_notification
     assert operation.args == ['arg1']
@@ -64,6 +66,7 @@ def test_operation_initialization(update_notification):
     assert operation._message is None
     assert operation.exception is None
     assert operation.thread_data == {'data1': 'datavalue1'}
+    assert operation.resources == {'resource1', 'resource2'}
     update_notification.assert_has_calls([call()])
 
 
@@ -73,6 +76,24 @@ def test_operation_str():
     assert str(operation) == 'Operation: testapp: op1'
 
 
+@pytest.mark.parametrize('resources1,resources2,conflicts', [
+    (None, None, True),
+    (None, ['apt'], True),
+    (None, [], True),
+    (['apt'], ['apt', 'firewall'], True),
+    (['apt'], ['firewall'], False),
+    ([], [], False),
+])
+def test_operation_conflicts_with(resources1, resources2, conflicts):
+    """Test checking whether two operations can run at the same time."""
+    operation1 = Operation('testid1', 'testapp', 'op1', Mock(),
+                           resources=resources1)
+    operation2 = Operation('testid2', 'testapp', 'op2', Mock(),
+                           resources=resources2)
+    assert operation1.conflicts_with(operation2) == conflicts
+    assert operation2.conflicts_with(operation1) == conflicts
+
+
 @patch('plinth.operation.Operation._update_notification')
 def test_successful_operation(update_notification):
     """Test running a operation that succeeds."""
@@ -243,7 +264,7 @@ def test_manager_init():
     """Test initializing operations manager."""
     manager = OperationsManager()
     assert manager._operations == {}
-    assert manager._current_operation is None
+    assert manager.running_operations == []
     assert isinstance(manager._lock, threading.RLock().__class__)
 
 
@@ -257,12 +278,12 @@ def test_manager_new():
 
     operation = manager.new('testop', 'testapp', 'op1', target)
     assert isinstance(operation, Operation)
-    assert manager._current_operation == operation
+    assert manager.running_operations == [operation]
     assert manager._operations == {'testop': operation}
 
     event.set()
     operation.join()
-    assert manager._current_operation is None
+    assert manager.running_operations == []
     assert manager._operations == OrderedDict(testop=operation)
 
 
@@ -278,7 +299,7 @@ def test_manager_new_without_show_message():
                             show_message=False)
     event.set()
     operation.join()
-    assert manager._current_operation is None
+    assert manager.running_operations == []
     assert manager._operations == {}
 
 
@@ -323,7 +344,7 @@ def test_manager_scheduling():
     operation3 = manager.new('testop3', 'testapp', 'op3', event3.wait)
 
     def _assert_is_running(current_operation):
-        assert manager._current_operation == current_operation
+        assert manager.running_operations == [current_operation]
         assert manager._operations == OrderedDict(testop1=operation1,
                                                   testop2=operation2,
                                                   testop3=operation3)
@@ -344,6 +365,51 @@ def test_manager_scheduling():
     operation3.join()
 
 
+def test_manager_scheduling_with_resources():
+    """Test running operations that don't share resources concurrently."""
+    manager = OperationsManager()
+    events = {op_id: threading.Event() for op_id in range(1, 6)}
+
+    def _new(op_id, resources):
+        return manager.new(f'testop{op_id}', 'testapp', f'op{op_id}',
+                           events[op_id].wait, resources=resources)
+
+    operation1 = _new(1, ['apt', 'app:app1'])
+    operation2 = _new(2, ['app:app2'])
+    operation3 = _new(3, ['apt', 'app:app3'])
+    operation4 = _new(4, ['app:app3'])
+    operation5 = _new(5, None)
+
+    # Operation 4 waits for operation 3 which is ahead of it and waiting for
+    # operation 1. Operation 5 may change anything and waits for all.
+    assert manager.running_operations == [operation1, operation2]
+
+    events[2].set()
+    operation2.join()
+    assert manager.running_operations == [operation1]
+
+    events[1].set()
+    operation1.join()
+    assert manager.running_operations == [operation3]
+
+    events[3].set()
+    operation3.join()
+    assert manager.running_operations == [operation4]
+
+    events[4].set()
+    operation4.join()
+    assert manager.running_operations == [operation5]
+
+    # Operations added later wait for the operation using all resources
+    operation6 = manager.new('testop6', 'testapp', 'op6', Mock(),
+                             resources=[])
+    assert manager.running_operations == [operation5]
+    events[5].set()
+    operation5.join()
+    operation6.join()
+    assert manager.running_operations == []
+
+
 def test_manager_filter():
     """Test returning filtered operations."""
     manager = OperationsManager()
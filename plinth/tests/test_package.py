@@ -3,12 +3,15 @@
 Test module for package module.
 """
 
+import os
+import threading
 import time
 import unittest
 from unittest.mock import Mock, call, patch
 
 import pytest
 
+from plinth import package as package_module
 from plinth.app import App
 from plinth.diagnostic_check import DiagnosticCheck, Result
 from plinth.errors import MissingPackageError
@@ -21,6 +24,14 @@ def fixture_clean_apps():
     App._all_apps = {}
 
 
+@pytest.fixture(autouse=True)
+def fixture_clean_cache():
+    """Fixture to ensure that apt cache is not shared between tests."""
+    package_module.invalidate_cache()
+    yield
+    package_module.invalidate_cache()
+
+
 class TestPackageExpressions(unittest.TestCase):
 
     def test_package(self):
@@ -354,7 +365,7 @@ def test_packages_find_conflicts(packages_installed_):
 
 
 @patch('plinth.package.refresh_package_lists')
-@patch('apt.Cache')
+@patch('plinth.package.get_cache')
 @patch('pathlib.Path')
 def test_packages_is_available(path_class, cache, refresh_package_lists):
     """Test checking for available packages."""
@@ -425,6 +436,79 @@ def test_packages_is_available(path_class, cache, refresh_package_lists):
     assert component.is_available()
 
 
+@patch('apt.Cache')
+def test_get_cache(cache, tmp_path):
+    """Test that apt cache is shared until it is outdated."""
+    cache_file = tmp_path / 'pkgcache.bin'
+    cache_file.touch()
+    cache.side_effect = lambda: Mock()
+    with patch('plinth.package.cache_files', [str(cache_file)]):
+        cache1 = package_module.get_cache()
+        assert package_module.get_cache() is cache1
+        assert cache.call_count == 1
+
+        package_module.invalidate_cache()
+        cache2 = package_module.get_cache()
+        assert cache2 is not cache1
+        assert package_module.get_cache() is cache2
+
+        os.utime(cache_file, ns=(0, 0))
+        assert package_module.get_cache() is not cache2
+        assert cache.call_count == 3
+
+        cache_file.unlink()
+        cache4 = package_module.get_cache()
+        assert package_module.get_cache() is cache4
+        assert cache.call_count == 4
+
+
+@patch('apt.Cache')
+def test_use_cache(cache):
+    """Test that apt cache is not replaced while it is being used."""
+    cache.side_effect = lambda: Mock()
+    with package_module.use_cache() as cache1:
+        with package_module.use_cache() as cache2:
+            assert cache2 is cache1
+
+        thread = threading.Thread(target=package_module.invalidate_cache)
+        thread.start()
+        thread.join(0.1)
+        assert thread.is_alive()
+        assert package_module.get_cache() is cache1
+
+    thread.join()
+    with package_module.use_cache() as cache3:
+        assert cache3 is not cache1
+
+
+@patch('plinth.package.mark_known')
+@patch('plinth.package.is_package_manager_busy')
+@patch('plinth.package.Transaction')
+@patch('plinth.operation.Operation.get_operation')
+def test_install_skips_installed_packages(get_operation, transaction,
+                                          is_package_manager_busy, mark_known):
+    """Test that packages installed along with other apps are skipped."""
+    is_package_manager_busy.return_value = False
+    get_operation.return_value.thread_data = {
+        'installed_packages': {
+            False: {'package1'},
+            True: {'package1', 'package2'}
+        }
+    }
+    package_module.install(['package1', 'package2'], skip_recommends=True)
+    transaction.assert_not_called()
+    mark_known.assert_called_once_with(['package1', 'package2'])
+
+    package_module.install(['package1', 'package2'])
+    transaction.return_value.install.assert_called_once_with(
+        False, None, False, False)
+
+    transaction.reset_mock()
+    package_module.install(['package1'], reinstall=True)
+    transaction.return_value.install.assert_called_once_with(
+        False, None, True, False)
+
+
 def test_packages_installed():
     """Test packages_installed()."""
     # list as input
@@ -0,0 +1,297 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Test module for the privileged daemon.
+"""
+
+import collections
+import json
+import socket
+import socketserver
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from plinth import actions, privileged_daemon
+
+
+@pytest.fixture(name='server')
+def fixture_server(tmp_path):
+    """Run the request handler on a temporary socket."""
+    path = str(tmp_path / 'privileged.socket')
+    server = socketserver.ThreadingUnixStreamServer(
+        path, privileged_daemon.RequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def _privileged_call(module_name, action_name, arguments, log_error):
+        if action_name == 'fail':
+            raise RuntimeError('failed')
+
+        return {
+            'result': 'success',
+            'return': [module_name, action_name, arguments['args']]
+        }
+
+    pool = actions._ConnectionPool()
+    with patch('plinth.actions.socket_path', path), \
+            patch('plinth.actions._connection_pool', pool), \
+            patch('plinth.actions._privileged_call', _privileged_call):
+        yield path
+
+    pool.close()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize('use_connection_pool', [False, True])
+def test_request(server, use_connection_pool):
+    """Test that one-shot and multiplexed requests are served."""
+    with patch('plinth.actions.use_connection_pool', use_connection_pool):
+        return_value = actions.run_privileged_method(None, 'test-module',
+                                                     'func', [1], {})
+        assert return_value == ['test-module', 'func', [1]]
+
+        with pytest.raises(RuntimeError, match='failed'):
+            actions.run_privileged_method(None, 'test-module', 'fail', [], {})
+
+
+def test_multiplexed_concurrent_requests(server):
+    """Test that many requests are served on a single connection."""
+    results = {}
+
+    def _call(index):
+        results[index] = actions.run_privileged_method(None, 'test-module',
+                                                       'func', [index], {})
+
+    threads = [
+        threading.Thread(target=_call, args=(index, )) for index in range(20)
+    ]
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert results == {
+        index: ['test-module', 'func', [index]]
+        for index in range(20)
+    }
+
+
+def test_multiplexed_raw_output_denied(server):
+    """Test that raw output requests are refused on multiplexed connection."""
+    request = {
+        'module': 'test-module',
+        'action': 'func',
+        'args': [],
+        'kwargs': {},
+        'raw_output': True
+    }
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client_socket:
+        client_socket.connect(server)
+        client_socket.sendall(actions.MULTIPLEX_MAGIC)
+        actions.write_frame(client_socket, 5, json.dumps(request).encode())
+        request_id, payload = actions.read_frame(client_socket)
+
+    response = json.loads(payload)
+    assert request_id == 5
+    assert response['result'] == 'exception'
+    assert response['exception']['name'] == 'TypeError'
+
+
+@pytest.mark.parametrize('parallel', [False, True])
+@pytest.mark.parametrize('use_connection_pool', [False, True])
+@patch('plinth.actions._get_privileged_action_module_name')
+def test_batch(get_module_name, server, use_connection_pool, parallel):
+    """Test that batched calls are sent together and results returned."""
+    get_module_name.return_value = 'test-module'
+
+    @actions.privileged
+    def func(value: int):
+        pass
+
+    @actions.privileged
+    def fail():
+        pass
+
+    with patch('plinth.actions.use_connection_pool', use_connection_pool):
+        with actions.Batch(parallel=parallel) as batch:
+            future1 = batch.call(func, 1)
+            future2 = batch.call(fail)
+            future3 = batch.call(func, value=3)
+
+    assert future1.result() == ['test-module', 'func', [1]]
+    with pytest.raises(RuntimeError, match='failed'):
+        future2.result()
+
+    assert future3.result() == ['test-module', 'func', []]
+    assert batch.results[0] == future1.result()
+    assert isinstance(batch.results[1], RuntimeError)
+    assert batch.results[2] == future3.result()
+
+
+@patch('plinth.privileged_daemon.max_workers', 3)
+@patch('plinth.actions.privileged_run_request')
+def test_worker_pool_limits(privileged_run_request):
+    """Test that worker pool limits concurrency overall and per group."""
+    lock = threading.Lock()
+    running = collections.Counter()
+    max_running = collections.Counter()
+    order = []
+
+    def _run_request(request):
+        group = privileged_daemon.WorkerPool.get_group(request)
+        with lock:
+            running[group] += 1
+            running['all'] += 1
+            for key in (group, 'all'):
+                max_running[key] = max(max_running[key], running[key])
+
+            order.append((request['module'], request['args'][0]))
+
+        # Calls of a group without limit overlap while others are done
+        time.sleep(0.1 if group == 'upgrades' else 0.02)
+        with lock:
+            running[group] -= 1
+            running['all'] -= 1
+
+        return {'result': 'success', 'return': request['args'][0]}
+
+    privileged_run_request.side_effect = _run_request
+    pool = privileged_daemon.WorkerPool()
+    futures = []
+    for index in range(10):
+        for module_name, action_name in [('plinth', 'install'),
+                                         ('upgrades', 'get_log'),
+                                         ('users', 'get_user_groups')]:
+            request = {
+                'module': module_name,
+                'action': action_name,
+                'args': [index],
+                'kwargs': {}
+            }
+            futures.append(pool.submit(request))
+
+    for index, future in enumerate(futures):
+        assert future.result()['return'] == index // 3
+
+    assert max_running['all'] <= 3
+    assert max_running['apt'] == 1
+    assert max_running['upgrades'] > 1
+
+    # Order is preserved within a group
+    install_order = [index for module, index in order if module == 'plinth']
+    assert install_order == list(range(10))
+
+    metrics = pool.get_metrics()
+    assert metrics['requests'] == 30
+    assert metrics['queue_depth'] == 0
+    assert metrics['running'] == 0
+    assert metrics['workers'] <= 3
+    assert metrics['max_queue_depth'] >= 1
+    assert metrics['max_wait_time'] >= metrics['average_wait_time'] > 0
+
+
+@patch('plinth.privileged_daemon.max_queued_requests', 2)
+@patch('plinth.actions.privileged_run_request')
+def test_worker_pool_backpressure(privileged_run_request):
+    """Test that submitting blocks when the queue is full."""
+    event = threading.Event()
+
+    def _run_request(request):
+        event.wait()
+        return {'result': 'success', 'return': None}
+
+    privileged_run_request.side_effect = _run_request
+    pool = privileged_daemon.WorkerPool()
+    request = {
+        'module': 'plinth',
+        'action': 'install',
+        'args': [],
+        'kwargs': {}
+    }
+    pool.submit(request)  # Running
+    time.sleep(0.05)
+    pool.submit(request)
+    pool.submit(request)  # Queue is full now
+
+    thread = threading.Thread(target=pool.submit, args=(request, ))
+    thread.start()
+    thread.join(0.1)
+    assert thread.is_alive()
+    assert pool.get_metrics()['queue_depth'] == 2
+
+    event.set()
+    thread.join()
+
+
+@patch('plinth.actions.privileged_run_request')
+def test_worker_pool_groups_independent(privileged_run_request):
+    """Test that a long call does not delay a call of another group."""
+    event = threading.Event()
+
+    def _run_request(request):
+        if request['action'] == 'install':
+            event.wait(3)
+
+        return {'result': 'success', 'return': None}
+
+    privileged_run_request.side_effect = _run_request
+    pool = privileged_daemon.WorkerPool()
+    request = {'module': 'users', 'action': 'func', 'args': [], 'kwargs': {}}
+    pool.submit(request).result()  # Leave an idle worker
+    time.sleep(0.05)
+
+    pool.submit({
+        'module': 'plinth',
+        'action': 'install',
+        'args': [],
+        'kwargs': {}
+    })
+    start_time = time.monotonic()
+    pool.submit(request).result(timeout=1)
+    assert time.monotonic() - start_time < 1
+    assert pool.get_metrics()['workers'] == 2
+    event.set()
+
+
+@patch('plinth.privileged_daemon.max_workers', 2)
+def test_multiplexed_bounded_threads(server):
+    """Test that requests on a connection don't need a thread each."""
+    thread_counts = []
+
+    def _run_request(request):
+        thread_counts.append(threading.active_count())
+        time.sleep(0.01)
+        return {'result': 'success', 'return': request['args'][0]}
+
+    request = {'module': 'test-module', 'action': 'func', 'kwargs': {}}
+    batch = {'batch': [dict(request, args=[-1]), dict(request, args=[-2])]}
+    initial_count = threading.active_count()
+    with patch('plinth.privileged_daemon._worker_pool',
+               privileged_daemon.WorkerPool()), \
+            patch('plinth.actions.privileged_run_request', _run_request), \
+            socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client_socket:
+        client_socket.connect(server)
+        client_socket.sendall(actions.MULTIPLEX_MAGIC)
+        for index in range(20):
+            actions.write_frame(
+                client_socket, index,
+                json.dumps(dict(request, args=[index])).encode())
+
+        actions.write_frame(client_socket, 20, json.dumps(batch).encode())
+        responses = dict(actions.read_frame(client_socket) for _ in range(21))
+
+    for index in range(20):
+        assert json.loads(responses[index])['return'] == index
+
+    assert json.loads(responses[20])['return'] == [{
+        'result': 'success',
+        'return': -1
+    }, {
+        'result': 'success',
+        'return': -2
+    }]
+    # Connection handler thread and workers
+    assert max(thread_counts) <= initial_count + 1 + 2
@@ -0,0 +1,86 @@
+# SPDX-License-Identifier: AGPL-3.0-or-later
+"""
+Tests for recording time and memory used during startup.
+"""
+
+import atexit
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import tracemalloc
+
+import pytest
+
+from plinth import profiler
+
+# Seconds allowed for each startup phase when loading all the apps. Set
+# FREEDOMBOX_STARTUP_BUDGET_FACTOR to scale them for slower machines.
+startup_budget = {'import': 30.0, 'init': 5.0}
+
+
+@pytest.fixture(name='profiling')
+def fixture_profiling(tmp_path):
+    """Record startup phases during the test and stop afterwards."""
+    report_path = tmp_path / 'report.json'
+    profiler.start(str(report_path))
+    yield report_path
+    atexit.unregister(profiler.write_report)
+    tracemalloc.stop()
+    profiler._report_path = None
+    profiler._records = []
+
+
+def test_record_disabled():
+    """Test that nothing is recorded unless started."""
+    assert not profiler.is_enabled()
+    with profiler.record('import', 'test-module'):
+        pass
+
+    assert not profiler._records
+
+
+def test_record(profiling):
+    """Test that phases are recorded and written in a report."""
+    assert profiler.is_enabled()
+    with profiler.record('import', 'test-module1'):
+        data = [0] * 100000
+
+    with profiler.record('import', 'test-module2'):
+        pass
+
+    with pytest.raises(RuntimeError):
+        with profiler.record('init', 'test-module1'):
+            raise RuntimeError
+
+    profiler.write_report()
+    report = json.loads(profiling.read_text())
+    assert [(entry['phase'], entry['name'])
+            for entry in report['records']] == [('import', 'test-module1'),
+                                                ('import', 'test-module2'),
+                                                ('init', 'test-module1')]
+    assert report['records'][0]['memory'] >= len(data) * 4
+    assert set(report['phases']) == {'import', 'init'}
+    import_phase = report['phases']['import']
+    assert import_phase['seconds'] == sum(entry['seconds']
+                                          for entry in report['records'][:2])
+    assert report['seconds'] >= import_phase['seconds']
+    assert report['peak_memory'] >= import_phase['memory']
+
+
+@pytest.mark.heavy
+def test_startup_budget(tmp_path):
+    """Test that loading all the apps takes no more than the budget."""
+    report_path = tmp_path / 'report.json'
+    root = pathlib.Path(__file__).parent.parent.parent
+    subprocess.run([
+        sys.executable, '-m', 'plinth', '--develop', '--list-apps',
+        '--profile-startup',
+        str(report_path)
+    ], cwd=root, check=True, stdout=subprocess.DEVNULL)
+
+    factor = float(os.getenv('FREEDOMBOX_STARTUP_BUDGET_FACTOR', '1'))
+    phases = json.loads(report_path.read_text())['phases']
+    for phase, seconds in startup_budget.items():
+        assert phases[phase]['seconds'] <= seconds * factor, phase
@@ -3,7 +3,38 @@
 Test module for setup module.
 """
 
-from plinth.setup import store_error_message, retrieve_error_messages
+from unittest.mock import Mock, call, patch
+
+import pytest
+
+from plinth.app import App, Info
+from plinth.operation import Operation
+from plinth.package import Packages
+from plinth.setup import (retrieve_error_messages, setup_apps,
+                          store_error_message)
+
+
+class AppTest(App):
+    """Sample app for testing setup of multiple apps."""
+
+    def __init__(self, app_id, packages, skip_recommends=False,
+                 setup_version=0):
+        self.app_id = app_id
+        super().__init__()
+        self.setup_version = setup_version
+        self.add(Info(app_id, 2))
+        self.add(
+            Packages(f'packages-{app_id}', packages,
+                     skip_recommends=skip_recommends))
+
+    def get_setup_version(self):
+        return self.setup_version
+
+
+@pytest.fixture(autouse=True)
+def fixture_clean_apps():
+    """Fixture to ensure clean set of global apps."""
+    App._all_apps = {}
 
 
 def test_store_retrieve_error_message():
@@ -17,3 +48,68 @@ def test_store_retrieve_error_message():
 
     # errors are cleared after retrieving
     assert retrieve_error_messages() == []
+
+
+@patch('plinth.setup.run_setup_on_app')
+@patch('plinth.package.install_for_apps')
+@patch('plinth.package.refresh_package_lists')
+@patch('plinth.package.get_cache')
+def test_setup_apps_installs_packages_together(cache, refresh_package_lists,
+                                               install_for_apps,
+                                               run_setup_on_app):
+    """Test that packages of multiple apps are installed together."""
+    run_setup_on_app.return_value = None
+    cache.return_value = {
+        package: Mock(candidate='1.0')
+        for package in ['package1', 'package2', 'package3', 'package4']
+    }
+    AppTest('app1', ['package1', 'package2'])
+    AppTest('app2', ['package2', 'package3'], skip_recommends=True)
+    AppTest('app3', ['package4'], setup_version=1)
+    AppTest('app4', ['missing-package'])
+
+    operation_app_ids = []
+    install_for_apps.side_effect = lambda *args: operation_app_ids.append(
+        Operation.get_operation().app_id)
+
+    setup_apps(['app1', 'app2', 'app3', 'app4'])
+    refresh_package_lists.assert_called_once_with()
+    assert operation_app_ids == ['app1', 'app1']
+    assert install_for_apps.mock_calls == [
+        call({'app1': ['package1', 'package2']}, False),
+        call({'app2': ['package2', 'package3']}, True)
+    ]
+    installed_packages = {
+        False: {'package1', 'package2'},
+        True: {'package1', 'package2', 'package3'}
+    }
+    assert run_setup_on_app.call_args_list == [
+        call(app_id, allow_install=True, installed_packages=installed_packages)
+        for app_id in ['app1', 'app2', 'app3', 'app4']
+    ]
+
+    # Packages are installed during setup of each app when there is only one
+    # app to install or when installing together fails.
+    refresh_package_lists.reset_mock()
+    run_setup_on_app.reset_mock()
+    setup_apps(['app1', 'app3'])
+    refresh_package_lists.assert_not_called()
+    run_setup_on_app.assert_has_calls([
+        call('app1', allow_install=True, installed_packages={}),
+    ])
+
+    run_setup_on_app.reset_mock()
+    install_for_apps.side_effect = RuntimeError()
+    setup_apps(['app1', 'app2'])
+    run_setup_on_app.assert_has_calls([
+        call('app1', allow_install=True, installed_packages={}),
+    ])
+
+    # Packages are not installed when not allowed
+    refresh_package_lists.reset_mock()
+    run_setup_on_app.reset_mock()
+    setup_apps(['app1', 'app2'], allow_install=False)
+    refresh_package_lists.assert_not_called()
+    run_setup_on_app.assert_has_calls([
+        call('app1', allow_install=False, installed_packages=None),
+    ])
@@ -5,9 +5,17 @@ Test module for custom Django template tags.
 
 from unittest.mock import patch
 
+import pytest
+
 from plinth.templatetags import extras
 
 
+@pytest.fixture(autouse=True)
+def fixture_clear_icon_cache():
+    """Forget icons read by earlier tests."""
+    extras._icon_cache.clear()
+
+
 def _assert_active_url(menu, url):
     """Verify that only the given url is set as 'active' in the menu"""
     for item in menu:
@@ -103,3 +111,41 @@ def test_icon_xml_stripping(resolve_static_path, tmp_path):
     return_value = extras.icon('icon2')
     assert return_value == ('<svg class="svg-icon" data-icon-name="icon2" >'
                             '<cirlcle></circle></svg>')
+
+
+@patch('plinth.utils.random_string')
+@patch('plinth.web_server.resolve_static_path')
+def test_icon_cache(resolve_static_path, random_string, tmp_path):
+    """Test that icons are read from files only when needed."""
+    random_string.side_effect = ['random1', 'random2', 'random3']
+    icon3 = tmp_path / 'icon3.svg'
+    icon3.write_text('<svg><path id="autoidmagic-foo"></path></svg>')
+    resolve_static_path.return_value = icon3
+    assert extras.icon('icon3') == ('<svg class="svg-icon" '
+                                    'data-icon-name="icon3" >'
+                                    '<path id="random1-foo"></path></svg>')
+
+    # Icon is not read again and IDs are still unique
+    icon3.write_text('<svg><path id="autoidmagic-bar"></path></svg>')
+    assert extras.icon('icon3') == ('<svg class="svg-icon" '
+                                    'data-icon-name="icon3" >'
+                                    '<path id="random2-foo"></path></svg>')
+
+    # In development mode, modified icons are read again
+    with patch('plinth.cfg.develop', True):
+        assert extras.icon('icon3') == ('<svg class="svg-icon" '
+                                        'data-icon-name="icon3" >'
+                                        '<path id="random3-bar"></path></svg>')
+
+
+@patch('plinth.templatetags.extras.icon_cache_size', 1)
+@patch('plinth.web_server.resolve_static_path')
+def test_icon_cache_size(resolve_static_path, tmp_path):
+    """Test that only a limited number of icons are kept in memory."""
+    for name in ('icon1', 'icon2'):
+        path = tmp_path / f'{name}.svg'
+        path.write_text('<svg></svg>')
+        resolve_static_path.return_value = path
+        extras.icon(name)
+
+    assert list(extras._icon_cache) == [tmp_path / 'icon2.svg']
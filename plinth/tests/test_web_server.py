@@ -65,10 +65,10 @@ def test_static_files_mount(mount, load_cfg):
 
 
 @patch('sys.modules')
-@patch('plinth.app.App.list')
-def test_resolve_static_path(app_list, sys_modules, tmp_path):
+@patch('plinth.app.App.get')
+def test_resolve_static_path(app_get, sys_modules, tmp_path):
     """Test that resolving a static path works as expected."""
-    app_list.return_value = []
+    app_get.side_effect = {}.__getitem__
     expected_path = (pathlib.Path(__file__).parent.parent.parent /
                      'static/theme/icons/test.svg')
     assert resolve_static_path('theme/icons/test.svg') == expected_path
@@ -76,7 +76,7 @@ def test_resolve_static_path(app_list, sys_modules, tmp_path):
     app = Mock()
     app.app_id = 'test-app'
     app.__module__ = 'test-module'
-    app_list.return_value = [app]
+    app_get.side_effect = {'test-app': app}.__getitem__
     expected_path = (pathlib.Path(__file__).parent.parent.parent /
                      'static/theme/icons/test.svg')
 
@@ -27,7 +27,7 @@ from django.views.generic.edit import FormView
 from stronghold.decorators import public
 
 from plinth import app as app_module
-from plinth import menu
+from plinth import cache, menu
 from plinth.daemon import app_is_running
 from plinth.modules.config import get_advanced_mode
 from plinth.modules.firewall.components import get_port_forwarding_info
@@ -254,8 +254,13 @@ def _pick_menu_items(menu_items, selected_tags):
     return sorted(filtered_menu_items, key=_sort_key)
 
 
-def _get_all_tags(menu_items: list[menu.Menu]) -> list[str]:
-    """Return a sorted list of all tags present in the given menu items."""
+def _get_all_tags(menu_items: list[menu.Menu],
+                  cache_parts: list[str]) -> list[str]:
+    """Return a sorted list of all tags present in the given menu items.
+
+    The list is cached until apps are enabled or disabled. cache_parts
+    identify the list of menu items.
+    """
 
     def get_tags(menu_items: list[menu.Menu]) -> set[str]:
         """Return a list of tags, unsorted."""
@@ -267,7 +272,8 @@ def _get_all_tags(menu_items: list[menu.Menu]) -> list[str]:
         return all_tags
 
     # Sort tags by localized string
-    return sorted(get_tags(menu_items), key=_)
+    return cache.get_or_set('apps', ['tags'] + cache_parts,
+                            lambda: sorted(get_tags(menu_items), key=_))
 
 
 def _get_tag_search_url(app: app_module.App) -> str:
@@ -318,7 +324,7 @@ class AppsView(TemplateView):
         ]
 
         context['tags'] = tags
-        context['all_tags'] = _get_all_tags(menu_items)
+        context['all_tags'] = _get_all_tags(menu_items, ['apps', 'enabled'])
         context['menu_items'] = _pick_menu_items(menu_items, tags)
 
         return context
@@ -344,7 +350,7 @@ class AppsAddView(TemplateView):
         ]
 
         context['tags'] = tags
-        context['all_tags'] = _get_all_tags(menu_items)
+        context['all_tags'] = _get_all_tags(menu_items, ['apps', 'disabled'])
         context['menu_items'] = _pick_menu_items(menu_items, tags)
 
         return context
@@ -360,7 +366,7 @@ def system_index(request):
             'advanced_mode': get_advanced_mode(),
             'menu_items': _pick_menu_items(menu_items, tags),
             'tags': tags,
-            'all_tags': _get_all_tags(menu_items)
+            'all_tags': _get_all_tags(menu_items, ['system'])
         })
 
 
@@ -57,6 +57,8 @@ def init():
             'django.template.loaders.filesystem.Loader',
             'django.template.loaders.app_directories.Loader',
         ]
+        settings.MIDDLEWARE = ('plinth.middleware.RequestTimingMiddleware',
+                               ) + settings.MIDDLEWARE
 
     kwargs = {}
     for setting in dir(settings):
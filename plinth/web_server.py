@@ -190,24 +190,22 @@ class StaticFiles(app_module.FollowerComponent):
 def resolve_static_path(url: str) -> pathlib.Path:
     """Convert a URL for static file into a file path."""
     url_parts = url.split('/')
-    for app in app_module.App.list():
-        if url_parts[0] != app.app_id:
-            continue
+    try:
+        app = app_module.App.get(url_parts[0])
+    except KeyError:
+        return pathlib.Path(cfg.file_root) / 'static' / url
 
-        try:
-            module = sys.modules[app.__module__]
-        except KeyError:
-            raise ValueError('Module for app not loaded')
-
-        if not hasattr(module, '__file__') or not module.__file__:
-            raise ValueError('Module file for app could not be found')
+    try:
+        module = sys.modules[app.__module__]
+    except KeyError:
+        raise ValueError('Module for app not loaded')
 
-        module_path = pathlib.Path(module.__file__).parent
-        static_dir = module_path / 'static'
-        if not static_dir.is_dir():
-            raise ValueError(
-                f'No static directory available for app {app.app_id}')
+    if not hasattr(module, '__file__') or not module.__file__:
+        raise ValueError('Module file for app could not be found')
 
-        return static_dir / '/'.join(url_parts[1:])
+    module_path = pathlib.Path(module.__file__).parent
+    static_dir = module_path / 'static'
+    if not static_dir.is_dir():
+        raise ValueError(f'No static directory available for app {app.app_id}')
 
-    return pathlib.Path(cfg.file_root) / 'static' / url
+    return static_dir / '/'.join(url_parts[1:])